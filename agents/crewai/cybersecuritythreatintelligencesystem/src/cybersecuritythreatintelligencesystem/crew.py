@@ -1,6 +1,6 @@
 from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
-from crewai_tools import SerperDevTool
+from cybersecuritythreatintelligencesystem.tools.custom_tool import CachedSerperDevTool
 from pydantic import BaseModel, Field
 from typing import Dict, List, Optional
 import json
@@ -72,13 +72,16 @@ class RecipeAppCrew():
         """Initialize with user inputs for dynamic agent configuration"""
         self.user_inputs = user_inputs or {}
         self.knowledge_path = Path("knowledge")
+        # One search tool for every agent; results are cached on disk and
+        # concurrent identical queries share a single Serper request
+        self.search_tool = CachedSerperDevTool()
         
     # Agent definitions with memory for key agents
     @agent
     def ingredient_suggester(self) -> Agent:
         return Agent(
             config=self.agents_config['ingredient_suggester'],
-            tools=[SerperDevTool()],
+            tools=[self.search_tool],
             verbose=True,
             memory=True  # Remember successful combinations
         )
@@ -87,7 +90,7 @@ class RecipeAppCrew():
     def ingredient_validator(self) -> Agent:
         return Agent(
             config=self.agents_config['ingredient_validator'],
-            tools=[SerperDevTool()],
+            tools=[self.search_tool],
             verbose=True,
             memory=True  # Remember validation patterns
         )
@@ -96,7 +99,7 @@ class RecipeAppCrew():
     def recipe_generator(self) -> Agent:
         return Agent(
             config=self.agents_config['recipe_generator'],
-            tools=[SerperDevTool()],
+            tools=[self.search_tool],
             verbose=True,
             memory=True  # Remember successful recipes
         )
@@ -105,7 +108,7 @@ class RecipeAppCrew():
     def nutritionist(self) -> Agent:
         return Agent(
             config=self.agents_config['nutritionist'],
-            tools=[SerperDevTool()],
+            tools=[self.search_tool],
             verbose=True
         )
     
@@ -113,7 +116,7 @@ class RecipeAppCrew():
     def cultural_validator(self) -> Agent:
         return Agent(
             config=self.agents_config['cultural_validator'],
-            tools=[SerperDevTool()],
+            tools=[self.search_tool],
             verbose=True,
             memory=True  # Remember cultural rules
         )
@@ -122,7 +125,7 @@ class RecipeAppCrew():
     def recipe_optimizer(self) -> Agent:
         return Agent(
             config=self.agents_config['recipe_optimizer'],
-            tools=[SerperDevTool()],
+            tools=[self.search_tool],
             verbose=True
         )
     
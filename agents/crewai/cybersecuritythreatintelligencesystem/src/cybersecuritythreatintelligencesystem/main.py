@@ -3,6 +3,7 @@ import sys
 import warnings
 from datetime import datetime
 from cybersecuritythreatintelligencesystem.crew import Cybersecuritythreatintelligencesystem
+from cybersecuritythreatintelligencesystem.tools.whatsapp_delivery import get_whatsapp_dispatcher
 
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
@@ -16,6 +17,9 @@ def run():
         Cybersecuritythreatintelligencesystem().crew().kickoff(inputs=inputs)
     except Exception as e:
         raise Exception(f"An error occurred while running the crew: {e}")
+    finally:
+        # WhatsApp parts are sent in the background; let them drain before exiting
+        get_whatsapp_dispatcher().wait_all(timeout=300)
 
 def train():
     inputs = {
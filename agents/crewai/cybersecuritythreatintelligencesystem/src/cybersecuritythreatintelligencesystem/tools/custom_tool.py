@@ -1,12 +1,14 @@
 # cybersecuritythreatintelligencesystem/tools/custom_tool.py
 
 import os
-import time
+import warnings
 from typing import Type, Any
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 from crewai.tools import BaseTool
-from twilio.rest import Client
+from crewai_tools import SerperDevTool
+from .search_cache import get_search_cache
+from .whatsapp_delivery import WHATSAPP_MAX_LENGTH, get_whatsapp_dispatcher, split_message
 
 load_dotenv()
 
@@ -33,38 +35,53 @@ class WhatsAppTool(BaseTool):
             return "❌ Error: WhatsApp credentials not found in environment variables."
 
         try:
-            client = Client(account_sid, auth_token)
-            
-            # WhatsApp message length limit
-            MAX_LENGTH = 4000
-            
-            if len(message) <= MAX_LENGTH:
-                # Send as single message
-                twilio_message = client.messages.create(
-                    from_=f'whatsapp:{from_number}',
-                    body=f"🔔 CrewAI Security Alert:\n\n{message}",
-                    to=f'whatsapp:{to_number}'
-                )
-                return f"✅ WhatsApp message sent successfully! SID: {twilio_message.sid}"
+            # Leave room for the part header
+            chunks = split_message(message, WHATSAPP_MAX_LENGTH - 60)
+            if len(chunks) == 1:
+                bodies = [f"🔔 CrewAI Security Alert:\n\n{chunks[0]}"]
             else:
-                # Split into multiple messages
-                chunks = [message[i:i + MAX_LENGTH] for i in range(0, len(message), MAX_LENGTH)]
-                sids = []
-                
-                for i, chunk in enumerate(chunks, 1):
-                    content = f"🔔 CrewAI Security Alert (Part {i}/{len(chunks)}):\n\n{chunk}"
-                    twilio_message = client.messages.create(
-                        from_=f'whatsapp:{from_number}',
-                        body=content,
-                        to=f'whatsapp:{to_number}'
-                    )
-                    sids.append(twilio_message.sid)
-                    
-                    # Rate limiting
-                    if i < len(chunks):
-                        time.sleep(2)
-                
-                return f"✅ WhatsApp bulletin sent in {len(chunks)} parts! SIDs: {', '.join(sids)}"
-                
+                bodies = [
+                    f"🔔 CrewAI Security Alert (Part {i}/{len(chunks)}):\n\n{chunk}"
+                    for i, chunk in enumerate(chunks, 1)
+                ]
+
+            # Parts are sent in order by a background worker; we return right away
+            delivery = get_whatsapp_dispatcher().submit(from_number, to_number, bodies)
+            return f"✅ WhatsApp bulletin queued in {len(bodies)} part(s). Delivery ID: {delivery.delivery_id}"
+
         except Exception as e:
-            return f"❌ Failed to send WhatsApp message: {str(e)}"
\ No newline at end of file
+            return f"❌ Failed to send WhatsApp message: {str(e)}"
+
+    async def _arun(self, message: str) -> str:
+        # Queuing only touches memory, so the async path does not need a thread
+        return self._run(message)
+
+
+# CachedSerperDevTool overrides SerperDevTool._make_api_request, a private method
+# (checked against crewai-tools 0.46.0, the version in uv.lock). If a release drops
+# it, searches still work but bypass the cache, so say so instead of failing quietly.
+if not hasattr(SerperDevTool, "_make_api_request"):
+    warnings.warn("crewai_tools.SerperDevTool has no _make_api_request; Serper results will not be cached")
+
+
+class CachedSerperDevTool(SerperDevTool):
+    """SerperDevTool that reads through the on-disk search cache shared with the research assistant"""
+
+    def _make_api_request(self, search_query: str, search_type: str) -> dict:
+        cache = get_search_cache()
+        if cache is None:
+            return super()._make_api_request(search_query, search_type)
+        params = {
+            "type": search_type,
+            "gl": self.country or "us",
+            "hl": self.locale or "en",
+            "num": self.n_results,
+        }
+        if self.location:
+            params["location"] = self.location
+        return cache.get_or_fetch(
+            "serper",
+            search_query,
+            lambda: super(CachedSerperDevTool, self)._make_api_request(search_query, search_type),
+            **params
+        )
@@ -0,0 +1,50 @@
+"""Loads the search cache from agents/langGraph/search_cache.py.
+
+The crew and the LangGraph research assistant read and write the same cache
+file, so they must agree on its schema and keys. Rather than keep a copy of
+the module here, this loads the one in the LangGraph project. Set
+SEARCH_CACHE_MODULE to its path when the crew runs outside this repository;
+if the file is not there, searches go straight to Serper without a cache.
+"""
+import importlib.util
+import os
+import sys
+import warnings
+from pathlib import Path
+
+# agents/crewai/<project>/src/<package>/tools/ -> agents/langGraph/ in a checkout of this repository
+_AGENTS_DIR = Path(__file__).resolve().parents[5] if len(Path(__file__).resolve().parents) > 5 else None
+SEARCH_CACHE_MODULE = os.getenv(
+    "SEARCH_CACHE_MODULE",
+    str(_AGENTS_DIR / "langGraph" / "search_cache.py") if _AGENTS_DIR else "",
+)
+
+# Private name, so the loaded module never shadows a top-level "search_cache"
+_MODULE_NAME = "_cybersecuritythreatintelligencesystem_search_cache"
+
+
+def _load():
+    module = sys.modules.get(_MODULE_NAME)
+    if module is not None:
+        return module
+    if not os.path.isfile(SEARCH_CACHE_MODULE):
+        warnings.warn(f"Search cache module not found at {SEARCH_CACHE_MODULE}; Serper results will not be cached")
+        return None
+    spec = importlib.util.spec_from_file_location(_MODULE_NAME, SEARCH_CACHE_MODULE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[_MODULE_NAME] = module
+    try:
+        spec.loader.exec_module(module)
+    except Exception as e:
+        del sys.modules[_MODULE_NAME]
+        warnings.warn(f"Could not load the search cache from {SEARCH_CACHE_MODULE} ({e}); Serper results will not be cached")
+        return None
+    return module
+
+
+_module = _load()
+
+
+def get_search_cache():
+    """The shared SearchCache, or None when the LangGraph module is not available"""
+    return _module.get_search_cache() if _module is not None else None
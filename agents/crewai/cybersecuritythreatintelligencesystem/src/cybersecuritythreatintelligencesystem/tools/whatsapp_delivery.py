@@ -0,0 +1,253 @@
+# cybersecuritythreatintelligencesystem/tools/whatsapp_delivery.py
+"""Background WhatsApp delivery for long bulletins.
+
+WhatsAppTool hands the bulletin to the dispatcher and returns a delivery id at
+once. A single worker thread sends the parts in order through one shared Twilio
+client, paced by a token bucket instead of a fixed sleep between parts.
+Finished deliveries are forgotten after WHATSAPP_DELIVERY_TTL seconds, or
+sooner once more than WHATSAPP_MAX_FINISHED have piled up.
+"""
+
+import itertools
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+# Twilio rejects WhatsApp bodies longer than 1600 characters
+WHATSAPP_MAX_LENGTH = int(os.getenv("WHATSAPP_MAX_LENGTH", "1600"))
+WHATSAPP_RATE_PER_SECOND = float(os.getenv("WHATSAPP_RATE_PER_SECOND", "1"))
+WHATSAPP_BURST = int(os.getenv("WHATSAPP_BURST", "2"))
+WHATSAPP_MAX_RETRIES = int(os.getenv("WHATSAPP_MAX_RETRIES", "3"))
+# Finished deliveries are kept this long for status lookups, and at most this many of them
+WHATSAPP_DELIVERY_TTL = float(os.getenv("WHATSAPP_DELIVERY_TTL", "3600"))
+WHATSAPP_MAX_FINISHED = int(os.getenv("WHATSAPP_MAX_FINISHED", "500"))
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_twilio_client():
+    """One Twilio client (and HTTP session) for the whole process"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from twilio.rest import Client
+            _client = Client(os.getenv("WHATSAPP_ACCOUNT_SID"), os.getenv("WHATSAPP_AUTH_TOKEN"))
+            if os.getenv("TWILIO_API_BASE_URL"):
+                # Point at a local stand-in such as the langGraph fake_twilio benchmark server
+                _client.api.base_url = os.getenv("TWILIO_API_BASE_URL")
+        return _client
+
+
+def split_message(message: str, max_length: int) -> List[str]:
+    """Split on paragraph, then line, then word boundaries so parts do not end mid-sentence"""
+    if len(message) <= max_length:
+        return [message]
+    separator = next((sep for sep in ("\n\n", "\n", " ") if sep in message), None)
+    if separator is None:
+        return [message[i:i + max_length] for i in range(0, len(message), max_length)]
+    chunks, current = [], ""
+    for piece in message.split(separator):
+        if len(piece) > max_length:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.extend(split_message(piece, max_length))
+            continue
+        candidate = f"{current}{separator}{piece}" if current else piece
+        if len(candidate) > max_length:
+            chunks.append(current)
+            current = piece
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+class TokenBucket:
+    """Allows `burst` sends at once, refilling at `rate` per second"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            time.sleep((1 - self.tokens) / self.rate)
+
+
+@dataclass
+class PartStatus:
+    index: int
+    body: str
+    status: str = "queued"
+    sid: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int = 0
+
+
+@dataclass
+class Delivery:
+    """Handle for one bulletin; poll status() for per-part progress"""
+    delivery_id: str
+    to_number: str
+    parts: List[PartStatus]
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def state(self) -> str:
+        statuses = {part.status for part in self.parts}
+        if statuses <= {"sent"}:
+            return "sent"
+        if "failed" in statuses and not statuses & {"queued", "sending"}:
+            return "failed" if statuses == {"failed"} else "partial"
+        return "sending" if statuses & {"sending", "sent"} else "queued"
+
+    def status(self) -> dict:
+        return {
+            "delivery_id": self.delivery_id,
+            "state": self.state,
+            "parts": [
+                {"part": part.index, "status": part.status, "sid": part.sid, "error": part.error}
+                for part in self.parts
+            ],
+        }
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self.done.wait(timeout)
+
+
+class WhatsAppDispatcher:
+    """Sends queued bulletins one part at a time, in order, from a worker thread"""
+
+    def __init__(self, rate: float = WHATSAPP_RATE_PER_SECOND, burst: int = WHATSAPP_BURST,
+                 max_retries: int = WHATSAPP_MAX_RETRIES, delivery_ttl: float = WHATSAPP_DELIVERY_TTL,
+                 max_finished: int = WHATSAPP_MAX_FINISHED):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.delivery_ttl = delivery_ttl
+        self.max_finished = max_finished
+        self.deliveries = {}
+        self._queue = queue.Queue()
+        self._ids = itertools.count(1)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.parts_sent = 0
+        self.parts_failed = 0
+        self.retries = 0
+
+    def submit(self, from_number: str, to_number: str, parts: List[str]) -> Delivery:
+        delivery = Delivery(
+            delivery_id=f"wa-{int(time.time())}-{next(self._ids)}",
+            to_number=to_number,
+            parts=[PartStatus(index=i, body=body) for i, body in enumerate(parts, 1)],
+        )
+        with self._lock:
+            self.deliveries[delivery.delivery_id] = delivery
+        self._queue.put((from_number, delivery))
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._work, name="whatsapp-dispatcher", daemon=True)
+                self._thread.start()
+        return delivery
+
+    def _work(self):
+        while True:
+            from_number, delivery = self._queue.get()
+            try:
+                self._send_delivery(from_number, delivery)
+            finally:
+                delivery.finished_at = time.time()
+                delivery.done.set()
+                self._evict_finished()
+                self._queue.task_done()
+
+    def _evict_finished(self):
+        """Forget finished deliveries past the TTL, and the oldest beyond max_finished"""
+        now = time.time()
+        with self._lock:
+            finished = sorted((d for d in self.deliveries.values() if d.finished_at is not None),
+                              key=lambda d: d.finished_at)
+            excess = len(finished) - self.max_finished
+            for i, delivery in enumerate(finished):
+                if i < excess or now - delivery.finished_at > self.delivery_ttl:
+                    del self.deliveries[delivery.delivery_id]
+
+    def _send_delivery(self, from_number: str, delivery: Delivery):
+        client = get_twilio_client()
+        for part in delivery.parts:
+            while part.status != "sent":
+                self.bucket.acquire()
+                part.status = "sending"
+                part.attempts += 1
+                try:
+                    message = client.messages.create(
+                        from_=f"whatsapp:{from_number}",
+                        body=part.body,
+                        to=f"whatsapp:{delivery.to_number}",
+                    )
+                    part.status, part.sid, part.error = "sent", message.sid, None
+                    self.parts_sent += 1
+                except Exception as e:
+                    part.error = str(e)
+                    if part.attempts > self.max_retries:
+                        part.status = "failed"
+                        break
+                    part.status = "queued"
+                    self.retries += 1
+                    time.sleep(min(2 ** part.attempts, 30))
+            if part.status == "failed":
+                # later parts would arrive out of context; stop here
+                for later in delivery.parts[part.index:]:
+                    later.status, later.error = "failed", "skipped after an earlier part failed"
+                self.parts_failed += len(delivery.parts) - part.index + 1
+                return
+
+    def get(self, delivery_id: str) -> Optional[Delivery]:
+        return self.deliveries.get(delivery_id)
+
+    def wait_all(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything submitted so far is delivered (call before the process exits)"""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._lock:
+            pending = list(self.deliveries.values())
+        for delivery in pending:
+            remaining = None if deadline is None else max(0, deadline - time.time())
+            if not delivery.wait(remaining):
+                return False
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "deliveries": len(self.deliveries),
+            "queued": self._queue.unfinished_tasks,
+            "parts_sent": self.parts_sent,
+            "parts_failed": self.parts_failed,
+            "retries": self.retries,
+        }
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_whatsapp_dispatcher() -> WhatsAppDispatcher:
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = WhatsAppDispatcher()
+        return _dispatcher
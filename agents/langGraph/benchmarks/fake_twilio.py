@@ -0,0 +1,160 @@
+"""Local stand-in for the Twilio Messages API.
+
+Accepts the same POST the Twilio SDK makes for messages.create and answers like
+Twilio does, with configurable latency, random server errors and 429s. It also
+enforces a per-recipient rate limit, like the real API. Point both WhatsApp
+senders at it with TWILIO_API_BASE_URL=http://127.0.0.1:<port>.
+
+Run standalone:
+    python benchmarks/fake_twilio.py --port 8765 --latency-ms 150 --error-rate 0.02
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+MESSAGES_PATH = re.compile(r"^/2010-04-01/Accounts/([^/]+)/Messages\.json$")
+
+
+class FakeTwilioState:
+    """Settings plus everything the server has received"""
+
+    def __init__(self, latency_ms: float = 100, jitter_ms: float = 50, error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, max_per_second: float = 0.0, seed: int = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.max_per_second = max_per_second
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.messages = []
+        self.responses = {}
+        self._last_accept = {}
+
+    def decide(self, to: str):
+        """Return (status, reason) for one request"""
+        with self.lock:
+            roll = self.random.random()
+            if roll < self.error_rate:
+                return 500, "Internal Server Error"
+            if roll < self.error_rate + self.throttle_rate:
+                return 429, "Too Many Requests"
+            if self.max_per_second:
+                now = time.monotonic()
+                if now - self._last_accept.get(to, 0) < 1 / self.max_per_second:
+                    return 429, "Too Many Requests"
+                self._last_accept[to] = now
+            return 201, "Created"
+
+    def record(self, status: int, message: dict = None):
+        with self.lock:
+            self.responses[status] = self.responses.get(status, 0) + 1
+            if message is not None:
+                self.messages.append(message)
+
+    def summary(self) -> dict:
+        with self.lock:
+            return {"received": len(self.messages), "responses": dict(self.responses)}
+
+
+class FakeTwilioHandler(BaseHTTPRequestHandler):
+    state: FakeTwilioState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/messages":
+            with self.state.lock:
+                return self._reply(200, {"messages": list(self.state.messages)})
+        self._reply(404, {"code": 20404, "message": "Not found", "status": 404})
+
+    def do_POST(self):
+        match = MESSAGES_PATH.match(self.path.split("?")[0])
+        length = int(self.headers.get("Content-Length") or 0)
+        form = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode()).items()}
+        if not match:
+            return self._reply(404, {"code": 20404, "message": "Not found", "status": 404})
+
+        state = self.state
+        delay = max(0.0, state.latency_ms + state.random.uniform(-state.jitter_ms, state.jitter_ms)) / 1000
+        time.sleep(delay)
+
+        status, reason = state.decide(form.get("To", ""))
+        if status != 201:
+            state.record(status)
+            code = 20429 if status == 429 else 20500
+            return self._reply(status, {"code": code, "message": reason, "status": status,
+                                        "more_info": f"https://www.twilio.com/docs/errors/{code}"})
+        if len(form.get("Body", "")) > 1600:
+            state.record(400)
+            return self._reply(400, {"code": 21617, "message": "The concatenated message body exceeds the 1600 character limit",
+                                     "status": 400})
+
+        sid = "SM" + uuid.uuid4().hex
+        message = {
+            "sid": sid,
+            "account_sid": match.group(1),
+            "from": form.get("From"),
+            "to": form.get("To"),
+            "body": form.get("Body"),
+            "status": "queued",
+            "num_segments": "1",
+            "direction": "outbound-api",
+            "api_version": "2010-04-01",
+            "received_at": time.time(),
+        }
+        state.record(201, message)
+        self._reply(201, message)
+
+
+def start_fake_twilio(port: int = 0, **settings):
+    """Start the server on a background thread; returns (server, state, base_url)"""
+    state = FakeTwilioState(**settings)
+    handler = type("BoundFakeTwilioHandler", (FakeTwilioHandler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-twilio", daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Twilio Messages API")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--max-per-second", type=float, default=0.0,
+                        help="Per-recipient rate limit; faster requests get 429 (0 = off)")
+    args = parser.parse_args()
+
+    server, state, base_url = start_fake_twilio(
+        args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, max_per_second=args.max_per_second,
+    )
+    print(f"Fake Twilio listening on {base_url} (export TWILIO_API_BASE_URL={base_url})")
+    try:
+        while True:
+            time.sleep(10)
+            print(json.dumps(state.summary()))
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
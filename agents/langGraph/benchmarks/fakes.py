@@ -0,0 +1,207 @@
+"""Fake chat models and tools for offline benchmarks.
+
+The fakes behave like the real ones as far as the graph can tell: the
+researcher model returns tool calls for a few steps and then an answer, the
+evaluator returns a ResearchEvaluatorOutput, the planner returns a SearchPlan,
+and tools return text after a delay. Sync calls block with time.sleep and async calls await asyncio.sleep,
+so sync and async code paths show their real concurrency behaviour.
+"""
+import asyncio
+import itertools
+import json
+import re
+import time
+import zlib
+from typing import List
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from langchain_core.tools import StructuredTool
+from pydantic import BaseModel, Field
+
+_call_ids = itertools.count(1)
+
+
+class FakeResearcherModel(BaseChatModel):
+    """Calls `tool_steps` rounds of tools, then answers; the round is read from the conversation"""
+
+    latency: float = 0.5
+    tool_steps: int = 2
+    tools_per_step: int = 2
+    tool_names: List[str] = ["research_web_search", "wikipedia"]
+    answer_words: int = 120
+    usage: bool = True
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-researcher"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _reply(self, messages) -> AIMessage:
+        # Tool rounds since the last user request decide what to do next
+        rounds = 0
+        for message in reversed(messages):
+            if isinstance(message, AIMessage) and message.tool_calls:
+                rounds += 1
+            elif message.type == "human":
+                break
+        usage = {"input_tokens": 200 * len(messages), "output_tokens": 40, "total_tokens": 200 * len(messages) + 40,
+                 "input_token_details": {"cache_read": 128 * (len(messages) - 1)}} if self.usage else None
+        if rounds < self.tool_steps:
+            calls = [
+                {"name": self.tool_names[i % len(self.tool_names)], "args": {"query": f"topic step {rounds} #{i}"},
+                 "id": f"call_{next(_call_ids)}"}
+                for i in range(self.tools_per_step)
+            ]
+            return AIMessage(content="", tool_calls=calls, usage_metadata=usage)
+        return AIMessage(content=" ".join(["finding"] * self.answer_words), usage_metadata=usage)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    def _chunks(self, message: AIMessage):
+        words = message.content.split(" ") if message.content else [""]
+        for i, word in enumerate(words):
+            last = i == len(words) - 1
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content=word + ("" if last else " "),
+                tool_call_chunks=[
+                    {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": n}
+                    for n, c in enumerate(message.tool_calls)
+                ] if last else [],
+                usage_metadata=message.usage_metadata if last else None,
+            ))
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        message = self._reply(messages)
+        chunks = list(self._chunks(message))
+        for chunk in chunks:
+            time.sleep(self.latency / len(chunks))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        message = self._reply(messages)
+        chunks = list(self._chunks(message))
+        for chunk in chunks:
+            await asyncio.sleep(self.latency / len(chunks))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+def fake_evaluator(output_model, latency: float = 0.3, complete: bool = True, verdicts=None):
+    """Stands in for llm.with_structured_output(output_model).
+
+    `verdicts` scripts research_complete call by call (e.g. [False, True] rejects
+    the first answer); after the script runs out every answer gets `complete`.
+    """
+    script = iter(verdicts or [])
+
+    def verdict():
+        passed = next(script, complete)
+        feedback = "Covers the topic with several sources." if passed else "Needs more sources and depth."
+        return output_model(feedback=feedback, research_complete=passed, user_input_needed=False)
+
+    def evaluate(messages):
+        time.sleep(latency)
+        return verdict()
+
+    async def aevaluate(messages):
+        await asyncio.sleep(latency)
+        return verdict()
+
+    return RunnableLambda(evaluate, afunc=aevaluate)
+
+
+def fake_summarizer(latency: float = 0.3):
+    def summarize(messages):
+        time.sleep(latency)
+        return AIMessage(content="- earlier findings summarized")
+
+    async def asummarize(messages):
+        await asyncio.sleep(latency)
+        return AIMessage(content="- earlier findings summarized")
+
+    return RunnableLambda(summarize, afunc=asummarize)
+
+
+def fake_planner(plan_model, item_model, latency: float = 0.3, searches: int = 5):
+    """Stands in for llm.with_structured_output(SearchPlan): always plans `searches` searches"""
+    def plan():
+        return plan_model(searches=[item_model(reason=f"Sub-question {i}", query=f"topic sub-question {i}")
+                                    for i in range(searches)])
+
+    def run(messages):
+        time.sleep(latency)
+        return plan()
+
+    async def arun(messages):
+        await asyncio.sleep(latency)
+        return plan()
+
+    return RunnableLambda(run, afunc=arun)
+
+
+class FakeEmbeddings:
+    """Bag-of-words embeddings (hashed words, sleeps for `latency`): shared words mean similar vectors"""
+
+    def __init__(self, latency: float = 0.1, dimensions: int = 512):
+        self.latency = latency
+        self.dimensions = dimensions
+
+    def _vector(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        for word in re.findall(r"\w+", text.lower()):
+            if len(word) > 2:
+                vector[zlib.crc32(word.encode()) % self.dimensions] += 1.0
+        return vector
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self.latency)
+        return self._vector(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await asyncio.sleep(self.latency)
+        return self._vector(text)
+
+
+class FakeQuery(BaseModel):
+    query: str = Field(description="query")
+
+
+def fake_tools(latency: float = 0.4, names=("research_web_search", "wikipedia"), async_impl: bool = True,
+               result_chars: int = 1500):
+    """Tools that sleep for `latency` and return filler text; sync-only when async_impl is False"""
+    tools = []
+    for name in names:
+        def run(query: str, name=name) -> str:
+            time.sleep(latency)
+            return f"{name} result for {query}: " + "x" * result_chars
+
+        async def arun(query: str, name=name) -> str:
+            await asyncio.sleep(latency)
+            return f"{name} result for {query}: " + "x" * result_chars
+
+        tools.append(StructuredTool.from_function(
+            func=run, coroutine=arun if async_impl else None, name=name,
+            description=f"Fake {name}", args_schema=FakeQuery,
+        ))
+    return tools
+
+
+def percentiles(samples) -> dict:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"p50": pick(0.5), "p95": pick(0.95), "max": ordered[-1], "count": len(ordered)}
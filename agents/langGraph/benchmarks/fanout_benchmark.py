@@ -0,0 +1,93 @@
+"""Wall-clock time per report: the researcher loop against fan-out mode.
+
+Both modes do the same amount of searching with the same fake latencies (see
+fakes.py), so the difference is how the work is scheduled:
+- loop: the researcher asks for one search per step, waits for it, and
+  reads the result before asking for the next (--searches steps)
+- fanout: a planner plans --searches searches, they run as parallel
+  branches (search + summary each, at most --concurrency at once), and a
+  writer merges them
+
+Usage (from agents/langGraph):
+    python benchmarks/fanout_benchmark.py --searches 5 --concurrency 1,5 --output fanout.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [BENCH_DIR, os.path.dirname(BENCH_DIR)]
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("LLM_USAGE_LOG", "0")
+os.environ.setdefault("RESEARCH_METRICS", "0")
+os.environ.setdefault("CHECKPOINT_BACKEND", "memory")
+os.environ.setdefault("LLM_MAX_IN_FLIGHT", "100000")
+os.environ.setdefault("LLM_IN_FLIGHT_CEILING", "100000")
+
+from fakes import FakeResearcherModel, fake_evaluator, fake_planner, fake_summarizer, fake_tools, percentiles
+from conversation_compactor import ConversationCompactor
+from research_assistant import ResearchAssistant, ResearchEvaluatorOutput, SearchItem, SearchPlan
+from research_evaluation import TieredEvaluator
+import research_assistant
+
+
+async def make_assistant(args) -> ResearchAssistant:
+    assistant = ResearchAssistant()
+    assistant.tools = fake_tools(args.tool_latency)
+    assistant.researcher_llm_with_tools = FakeResearcherModel(latency=args.llm_latency, tool_steps=args.searches,
+                                                              tools_per_step=1)
+    assistant.evaluator_llm_with_output = fake_evaluator(ResearchEvaluatorOutput, args.llm_latency)
+    assistant.compactor = ConversationCompactor(fake_summarizer(args.llm_latency))
+    assistant.planner_llm = fake_planner(SearchPlan, SearchItem, args.llm_latency, args.searches)
+    assistant.search_summarizer_llm = fake_summarizer(args.llm_latency)
+    assistant.writer_llm = fake_summarizer(args.llm_latency)
+    assistant.evaluation = TieredEvaluator(mode="llm")
+    await assistant.build_research_graph()
+    return assistant
+
+
+async def run_mode(mode: str, args) -> list:
+    assistant = await make_assistant(args)
+    samples = []
+    for i in range(args.requests):
+        started = time.perf_counter()
+        await assistant.conduct_research(f"Topic {i}", "", [], mode=mode)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--searches", type=int, default=5, help="Searches per report in both modes")
+    parser.add_argument("--concurrency", default="1,5", help="Fan-out branch limits to try")
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--tool-latency", type=float, default=0.5)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+    args.concurrency = [int(level) for level in args.concurrency.split(",")]
+
+    runs = {"loop": asyncio.run(run_mode("loop", args))}
+    for level in args.concurrency:
+        research_assistant.FANOUT_MAX_CONCURRENCY = level
+        runs[f"fanout-{level}"] = asyncio.run(run_mode("fanout", args))
+
+    results = {"settings": vars(args)}
+    baseline = statistics.median(runs["loop"])
+    for name, samples in runs.items():
+        median = statistics.median(samples)
+        results[name] = {"report_s": percentiles(samples), "speedup": baseline / median}
+        print(f"{name:<11} median {median:6.2f} s/report  {baseline / median:5.2f}x the loop")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""Offline benchmark suite for the research graph.
+
+Builds the real ResearchAssistant.build_research_graph() with scripted fake
+models and tools (see fakes.py), so it costs no API money. Suites:
+- step: graph overhead per step with zero-latency fakes; the evaluator
+  rejects the first --reject-rounds answers so requests loop
+- checkpoint: time spent in the checkpointer (put/get) and bytes stored per
+  checkpoint as one session's history grows, for MemorySaver and the SQLite
+  checkpointer
+- memory: Python heap held per session (tracemalloc) after each turn of a
+  growing conversation, for both checkpointers
+- throughput: requests/sec and latency with N concurrent sessions (the
+  async mode of load_test.py)
+
+Every number also goes into a flat "summary" so two result files can be
+compared with --compare.
+
+Usage (from agents/langGraph):
+    python benchmarks/graph_benchmark.py --output graph.json
+    python benchmarks/graph_benchmark.py --suites step,checkpoint --compare graph.json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [BENCH_DIR, os.path.dirname(BENCH_DIR)]
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("LLM_USAGE_LOG", "0")
+os.environ.setdefault("RESEARCH_METRICS", "0")
+os.environ.setdefault("LLM_MAX_IN_FLIGHT", "100000")
+os.environ.setdefault("LLM_IN_FLIGHT_CEILING", "100000")
+
+from fakes import FakeResearcherModel, fake_evaluator, fake_summarizer, fake_tools, percentiles
+from langgraph.checkpoint.memory import MemorySaver
+from checkpoint_store import SQLiteCheckpointSaver
+from conversation_compactor import ConversationCompactor
+from research_assistant import ResearchAssistant, ResearchEvaluatorOutput
+from research_evaluation import TieredEvaluator
+
+
+async def make_assistant(saver, llm_latency: float = 0.0, tool_latency: float = 0.0, tool_steps: int = 2,
+                         verdicts=None, result_chars: int = 1500) -> ResearchAssistant:
+    assistant = ResearchAssistant()
+    assistant.memory = saver
+    assistant.tools = fake_tools(tool_latency, result_chars=result_chars)
+    assistant.researcher_llm_with_tools = FakeResearcherModel(latency=llm_latency, tool_steps=tool_steps)
+    assistant.evaluator_llm_with_output = fake_evaluator(ResearchEvaluatorOutput, llm_latency, verdicts=verdicts)
+    assistant.compactor = ConversationCompactor(fake_summarizer(llm_latency))
+    # the scripted verdicts decide, not the local checks
+    assistant.evaluation = TieredEvaluator(mode="llm")
+    await assistant.build_research_graph()
+    return assistant
+
+
+def make_saver(kind: str, directory: str):
+    if kind == "memory":
+        return MemorySaver()
+    return SQLiteCheckpointSaver(os.path.join(directory, f"checkpoints-{time.monotonic_ns()}.sqlite3"))
+
+
+def saver_bytes(saver) -> int:
+    """Bytes the checkpointer holds: serialized blobs for MemorySaver, the file for SQLite"""
+    if isinstance(saver, SQLiteCheckpointSaver):
+        saver._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return os.path.getsize(saver.path)
+    total = 0
+    for value in saver.blobs.values():
+        total += len(value[1]) if isinstance(value, tuple) else 0
+    for namespaces in saver.storage.values():
+        for checkpoints in namespaces.values():
+            for checkpoint, metadata, _parent in checkpoints.values():
+                total += len(checkpoint[1]) + len(metadata[1])
+    return total
+
+
+class TimedSaver:
+    """Wraps a checkpointer's async methods to time them in place"""
+
+    def __init__(self, saver):
+        self.timings = {"aput": [], "aput_writes": [], "aget_tuple": []}
+        for name in self.timings:
+            setattr(saver, name, self._timed(name, getattr(saver, name)))
+
+    def _timed(self, name, method):
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                self.timings[name].append(time.perf_counter() - started)
+        return timed
+
+
+async def step_suite(args, directory: str) -> dict:
+    results = {}
+    for kind in args.checkpointers:
+        assistant = await make_assistant(make_saver(kind, directory), tool_steps=args.tool_steps,
+                                         verdicts=[False] * args.reject_rounds)
+        steps, durations = [], []
+        for i in range(args.requests):
+            # a fresh script per request so every request loops the same way
+            assistant.evaluator_llm_with_output = fake_evaluator(ResearchEvaluatorOutput, 0,
+                                                                 verdicts=[False] * args.reject_rounds)
+            started = time.perf_counter()
+            count = 0
+            async for _ in assistant.graph.astream(assistant.initial_state(f"Topic {i}", ""),
+                                                   config=assistant.research_config(), stream_mode="updates"):
+                count += 1
+            durations.append(time.perf_counter() - started)
+            steps.append(count)
+        per_step = sum(durations) / sum(steps)
+        results[kind] = {
+            "steps_per_request": statistics.mean(steps),
+            "request_ms": percentiles([d * 1000 for d in durations]),
+            "per_step_ms": per_step * 1000,
+        }
+        print(f"step        {kind:<7} {statistics.mean(steps):5.1f} steps/request  "
+              f"{per_step * 1000:7.3f} ms/step  p50 {results[kind]['request_ms']['p50']:7.2f} ms/request")
+    return results
+
+
+async def checkpoint_suite(args, directory: str) -> dict:
+    results = {}
+    for kind in args.checkpointers:
+        saver = make_saver(kind, directory)
+        timed = TimedSaver(saver)
+        assistant = await make_assistant(saver, tool_steps=args.tool_steps, result_chars=args.result_chars)
+        rows = []
+        for turn in range(1, args.turns + 1):
+            for timings in timed.timings.values():
+                timings.clear()
+            result = await assistant.graph.ainvoke(assistant.initial_state(f"Follow-up question {turn}", ""),
+                                                   config=assistant.research_config())
+            if turn in args.report_turns:
+                puts = len(timed.timings["aput"])
+                row = {
+                    "turn": turn,
+                    "messages": len(result["messages"]),
+                    "put_ms": statistics.mean(timed.timings["aput"]) * 1000 if puts else 0.0,
+                    "get_ms": statistics.mean(timed.timings["aget_tuple"] or [0]) * 1000,
+                    "checkpointer_ms_per_request": sum(sum(t) for t in timed.timings.values()) * 1000,
+                    "bytes_total": saver_bytes(saver),
+                }
+                rows.append(row)
+                print(f"checkpoint  {kind:<7} turn {turn:3d}  {row['messages']:5d} messages  "
+                      f"put {row['put_ms']:7.3f} ms  get {row['get_ms']:7.3f} ms  "
+                      f"{row['checkpointer_ms_per_request']:8.2f} ms/request  {row['bytes_total'] / 1024:9.1f} KiB")
+        results[kind] = rows
+    return results
+
+
+async def memory_suite(args, directory: str) -> dict:
+    results = {}
+    for kind in args.checkpointers:
+        gc.collect()
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        assistant = await make_assistant(make_saver(kind, directory), tool_steps=args.tool_steps,
+                                         result_chars=args.result_chars)
+        rows = []
+        for turn in range(1, args.turns + 1):
+            result = await assistant.graph.ainvoke(assistant.initial_state(f"Follow-up question {turn}", ""),
+                                                   config=assistant.research_config())
+            if turn in args.report_turns:
+                messages = len(result["messages"])
+                del result
+                gc.collect()
+                held = tracemalloc.get_traced_memory()[0] - baseline
+                rows.append({"turn": turn, "bytes_held": held})
+                print(f"memory      {kind:<7} turn {turn:3d}  {held / 1024:9.1f} KiB held ({messages} messages)")
+        tracemalloc.stop()
+        del assistant
+        results[kind] = rows
+    return results
+
+
+async def throughput_suite(args) -> dict:
+    from load_test import run_level
+    settings = argparse.Namespace(tool_latency=args.tool_latency, llm_latency=args.llm_latency,
+                                  tool_steps=args.tool_steps)
+    rows = []
+    for level in args.levels:
+        row = await run_level("async", level, settings)
+        rows.append(row)
+        print(f"throughput  {level:4d} sessions  p50 {row['latency']['p50']:6.2f}s  p95 {row['latency']['p95']:6.2f}s  "
+              f"{row['requests_per_second']:6.2f} req/s")
+    return {"levels": rows}
+
+
+def summarize(results: dict) -> dict:
+    """Flat name -> number map; the basis for --compare"""
+    summary = {}
+    for kind, row in results.get("step", {}).items():
+        summary[f"step.{kind}.per_step_ms"] = row["per_step_ms"]
+    for suite, key in (("checkpoint", "checkpointer_ms_per_request"), ("checkpoint", "bytes_total"),
+                       ("memory", "bytes_held")):
+        for kind, rows in results.get(suite, {}).items():
+            for row in rows:
+                summary[f"{suite}.{kind}.turn{row['turn']}.{key}"] = row[key]
+    for row in results.get("throughput", {}).get("levels", []):
+        summary[f"throughput.{row['concurrency']}.requests_per_second"] = row["requests_per_second"]
+        summary[f"throughput.{row['concurrency']}.p95_s"] = row["latency"]["p95"]
+    return summary
+
+
+def compare(summary: dict, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f).get("summary", {})
+    print(f"\nCompared with {baseline_path}:")
+    for name, value in summary.items():
+        if name in baseline and baseline[name]:
+            change = (value / baseline[name] - 1) * 100
+            print(f"  {name:<55} {baseline[name]:>14.3f} -> {value:>14.3f}  {change:+6.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suites", default="step,checkpoint,memory,throughput")
+    parser.add_argument("--checkpointers", default="memory,sqlite")
+    parser.add_argument("--requests", type=int, default=50, help="Requests for the step suite")
+    parser.add_argument("--reject-rounds", type=int, default=1, help="Evaluator rejections per request (step suite)")
+    parser.add_argument("--turns", type=int, default=40, help="Turns of one session (checkpoint and memory suites)")
+    parser.add_argument("--report-turns", default="1,5,10,20,40")
+    parser.add_argument("--tool-steps", type=int, default=2)
+    parser.add_argument("--result-chars", type=int, default=1500, help="Size of each fake tool result")
+    parser.add_argument("--levels", default="1,8,32")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Throughput suite only")
+    parser.add_argument("--tool-latency", type=float, default=0.2, help="Throughput suite only")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="A previous --output file to compare against")
+    args = parser.parse_args()
+    args.checkpointers = args.checkpointers.split(",")
+    args.report_turns = {int(turn) for turn in args.report_turns.split(",")}
+    args.levels = [int(level) for level in args.levels.split(",")]
+    suites = args.suites.split(",")
+
+    results = {"settings": {k: sorted(v) if isinstance(v, set) else v for k, v in vars(args).items()}}
+    with tempfile.TemporaryDirectory() as directory:
+        if "step" in suites:
+            results["step"] = asyncio.run(step_suite(args, directory))
+        if "checkpoint" in suites:
+            results["checkpoint"] = asyncio.run(checkpoint_suite(args, directory))
+        if "memory" in suites:
+            results["memory"] = asyncio.run(memory_suite(args, directory))
+    if "throughput" in suites:
+        results["throughput"] = asyncio.run(throughput_suite(args))
+    results["summary"] = summarize(results)
+
+    if args.compare:
+        compare(results["summary"], args.compare)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Concurrent-session load test for the research graph.
+
+Runs many research requests at once in one process with fake models and tools
+(see fakes.py), so it measures the graph and the event loop, not OpenAI.
+Two modes:
+- async: the current nodes, which await the models and tools
+- sync: the previous nodes, which called .invoke() and ran in the loop's
+  thread pool, with sync-only tools
+
+For each concurrency level it reports p50/p95 latency per research request
+and requests/sec. A level is "sustained" while p95 stays within --slo times the
+single-session p50.
+
+Usage (from agents/langGraph):
+    python benchmarks/load_test.py --levels 1,8,32,64 --output load.json
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [BENCH_DIR, os.path.dirname(BENCH_DIR)]
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("LLM_USAGE_LOG", "0")
+# This measures the graph and the event loop, so the fake models get no LLM concurrency cap
+os.environ.setdefault("LLM_MAX_IN_FLIGHT", "100000")
+os.environ.setdefault("LLM_IN_FLIGHT_CEILING", "100000")
+
+from fakes import FakeResearcherModel, fake_evaluator, fake_summarizer, fake_tools, percentiles
+from conversation_compactor import ConversationCompactor
+from research_evaluation import TieredEvaluator
+from research_assistant import ResearchAssistant, ResearchEvaluatorOutput, RESEARCHER_SYSTEM_MESSAGE
+
+
+class SyncNodeAssistant(ResearchAssistant):
+    """The graph as it was before the nodes became async"""
+
+    def researcher_agent(self, state):
+        messages = [RESEARCHER_SYSTEM_MESSAGE] + state["messages"] + [self.research_context(state)]
+        return {"messages": [self.researcher_llm_with_tools.invoke(messages)]}
+
+    def compact_conversation(self, state):
+        return {}
+
+    def research_evaluator(self, state):
+        result = self.evaluator_llm_with_output.invoke([RESEARCHER_SYSTEM_MESSAGE, state["messages"][-1]])
+        return {
+            "messages": [{"role": "assistant", "content": f"📊 Research Quality Evaluation:\n{result.feedback}"}],
+            "feedback_on_work": result.feedback,
+            "research_complete": result.research_complete,
+            "user_input_needed": result.user_input_needed,
+        }
+
+
+async def make_assistant(mode: str, args) -> ResearchAssistant:
+    assistant = (SyncNodeAssistant if mode == "sync" else ResearchAssistant)()
+    assistant.tools = fake_tools(args.tool_latency, async_impl=mode == "async")
+    assistant.researcher_llm_with_tools = FakeResearcherModel(latency=args.llm_latency, tool_steps=args.tool_steps)
+    assistant.evaluator_llm_with_output = fake_evaluator(ResearchEvaluatorOutput, args.llm_latency)
+    assistant.compactor = ConversationCompactor(fake_summarizer(args.llm_latency))
+    # every session pays for one evaluator call, as before the local checks
+    assistant.evaluation = TieredEvaluator(mode="llm")
+    await assistant.build_research_graph()
+    return assistant
+
+
+async def run_level(mode: str, concurrency: int, args) -> dict:
+    assistants = [await make_assistant(mode, args) for _ in range(concurrency)]
+
+    async def one(assistant):
+        start = time.perf_counter()
+        history = await assistant.conduct_research("Impact of AI on education", "", [])
+        failed = "error" in history[-1]["content"].lower()
+        return time.perf_counter() - start, failed
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(a) for a in assistants))
+    wall = time.perf_counter() - started
+    latencies = [r[0] for r in results]
+    return {
+        "concurrency": concurrency,
+        "latency": percentiles(latencies),
+        "requests_per_second": concurrency / wall,
+        "failures": sum(1 for r in results if r[1]),
+    }
+
+
+async def run_mode(mode: str, levels, args) -> dict:
+    rows = []
+    for level in levels:
+        row = await run_level(mode, level, args)
+        rows.append(row)
+        print(f"{mode:<5} {level:4d} sessions  p50 {row['latency']['p50']:6.2f}s  p95 {row['latency']['p95']:6.2f}s  "
+              f"{row['requests_per_second']:6.2f} req/s  failures {row['failures']}")
+    baseline = rows[0]["latency"]["p50"]
+    sustained = max((r["concurrency"] for r in rows if r["latency"]["p95"] <= args.slo * baseline), default=0)
+    return {"levels": rows, "sustained_sessions": sustained}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", default="1,4,16,32,64")
+    parser.add_argument("--modes", default="sync,async")
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--tool-latency", type=float, default=0.4)
+    parser.add_argument("--tool-steps", type=int, default=2)
+    parser.add_argument("--slo", type=float, default=1.5, help="Allowed p95 slowdown over one session's p50")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.levels.split(",")]
+    # asyncio's default thread pool, which sync nodes and sync tools run in
+    print(f"Default executor threads: {concurrent.futures.ThreadPoolExecutor()._max_workers}")
+    results = {"settings": vars(args)}
+    for mode in args.modes.split(","):
+        results[mode] = asyncio.run(run_mode(mode, levels, args))
+        print(f"{mode}: sustains {results[mode]['sustained_sessions']} concurrent sessions "
+              f"(p95 within {args.slo}x of single-session p50)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
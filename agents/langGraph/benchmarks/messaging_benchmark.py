@@ -0,0 +1,187 @@
+"""Messaging throughput benchmark against the local fake Twilio server.
+
+Pushes N bulletins of varying length through both WhatsApp senders:
+- outbox: send_whatsapp_notification's durable outbox (research assistant)
+- crew: the paced dispatcher behind the crew's WhatsAppTool
+
+Each sender gets its own fake_twilio server, so no credentials are needed and
+nothing leaves the machine. Reports messages/sec, end-to-end latency
+percentiles (queued until accepted by the API) and retry counts.
+
+Usage (from agents/langGraph):
+    python benchmarks/messaging_benchmark.py --bulletins 50 --latency-ms 150 --throttle-rate 0.05
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+LANGGRAPH_DIR = os.path.dirname(BENCH_DIR)
+CREW_TOOLS_DIR = os.path.join(
+    os.path.dirname(LANGGRAPH_DIR), "crewai", "cybersecuritythreatintelligencesystem", "src",
+    "cybersecuritythreatintelligencesystem", "tools",
+)
+sys.path[:0] = [BENCH_DIR, LANGGRAPH_DIR, CREW_TOOLS_DIR]
+
+from fake_twilio import start_fake_twilio
+
+# Fake credentials; every request goes to the local server
+os.environ.setdefault("WHATSAPP_ACCOUNT_SID", "AC" + "0" * 32)
+os.environ.setdefault("WHATSAPP_AUTH_TOKEN", "benchmark")
+os.environ.setdefault("WHATSAPP_FROM_NUMBER", "+14155238886")
+os.environ.setdefault("WHATSAPP_TO_NUMBER", "+15005550006")
+
+WORDS = ("threat actor ransomware patch advisory exploit vulnerability botnet phishing "
+         "campaign indicator mitigation zero-day disclosure vendor").split()
+
+
+def make_bulletin(rng: random.Random, length: int) -> str:
+    paragraphs, size = [], 0
+    while size < length:
+        paragraph = " ".join(rng.choice(WORDS) for _ in range(rng.randint(15, 60))).capitalize() + "."
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(paragraphs)[:length]
+
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99), "max": ordered[-1],
+            "mean": statistics.mean(ordered)}
+
+
+def throughput(state, started: float) -> float:
+    received = [m["received_at"] for m in state.messages]
+    if not received:
+        return 0.0
+    return len(received) / max(max(received) - started, 1e-9)
+
+
+def run_outbox(bulletins, server_settings, coalesce_seconds: float, timeout: float) -> dict:
+    server, state, base_url = start_fake_twilio(**server_settings)
+    os.environ["TWILIO_API_BASE_URL"] = base_url
+    import research_tools
+    from notification_outbox import NotificationOutbox
+
+    with tempfile.TemporaryDirectory() as tmp:
+        outbox = NotificationOutbox(
+            send=research_tools.deliver_whatsapp_message,
+            path=os.path.join(tmp, "outbox.sqlite3"),
+            coalesce_seconds=coalesce_seconds,
+            min_interval=0,
+            retry_base=0.2,
+        )
+        started = time.time()
+        enqueue_times = []
+        for bulletin in bulletins:
+            t = time.perf_counter()
+            outbox.enqueue(research_tools.WHATSAPP_TO_NUMBER, bulletin)
+            enqueue_times.append(time.perf_counter() - t)
+        drained = outbox.flush(timeout)
+        outbox.stop()
+        rows = outbox._conn.execute("SELECT sent_at - created_at FROM outbox WHERE status = 'sent'").fetchall()
+        stats = outbox.stats()
+    server.shutdown()
+    return {
+        "drained": drained,
+        "bulletins": len(bulletins),
+        "api_messages": len(state.messages),
+        "messages_per_second": throughput(state, started),
+        "enqueue_ms": percentiles([t * 1000 for t in enqueue_times]),
+        "latency_seconds": percentiles([r[0] for r in rows]),
+        "retries": stats["retries"],
+        "failed": stats["failed"],
+        "messages_per_digest": stats["messages_per_digest"],
+        "server": state.summary(),
+    }
+
+
+def run_crew(bulletins, server_settings, rate: float, burst: int, timeout: float) -> dict:
+    server, state, base_url = start_fake_twilio(**server_settings)
+    os.environ["TWILIO_API_BASE_URL"] = base_url
+    import whatsapp_delivery
+
+    dispatcher = whatsapp_delivery.WhatsAppDispatcher(rate=rate, burst=burst)
+    to_number = os.environ["WHATSAPP_TO_NUMBER"]
+    started = time.time()
+    submit_times, deliveries = [], []
+    for bulletin in bulletins:
+        t = time.perf_counter()
+        # Same splitting as WhatsAppTool._run
+        chunks = whatsapp_delivery.split_message(bulletin, whatsapp_delivery.WHATSAPP_MAX_LENGTH - 60)
+        bodies = [f"🔔 CrewAI Security Alert (Part {i}/{len(chunks)}):\n\n{chunk}"
+                  for i, chunk in enumerate(chunks, 1)]
+        deliveries.append(dispatcher.submit(os.environ["WHATSAPP_FROM_NUMBER"], to_number, bodies))
+        submit_times.append(time.perf_counter() - t)
+    drained = dispatcher.wait_all(timeout)
+    stats = dispatcher.stats()
+    server.shutdown()
+    return {
+        "drained": drained,
+        "bulletins": len(bulletins),
+        "api_messages": len(state.messages),
+        "messages_per_second": throughput(state, started),
+        "submit_ms": percentiles([t * 1000 for t in submit_times]),
+        "latency_seconds": percentiles([d.finished_at - d.created_at for d in deliveries if d.finished_at]),
+        "retries": stats["retries"],
+        "parts_failed": stats["parts_failed"],
+        "server": state.summary(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bulletins", type=int, default=30)
+    parser.add_argument("--min-length", type=int, default=200)
+    parser.add_argument("--max-length", type=int, default=6000)
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--max-per-second", type=float, default=0.0)
+    parser.add_argument("--coalesce-seconds", type=float, default=0.5, help="Outbox coalescing window")
+    parser.add_argument("--rate", type=float, default=20, help="Crew dispatcher token bucket rate")
+    parser.add_argument("--burst", type=int, default=5, help="Crew dispatcher token bucket size")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--senders", default="outbox,crew")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    bulletins = [make_bulletin(rng, rng.randint(args.min_length, args.max_length)) for _ in range(args.bulletins)]
+    server_settings = {
+        "latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "error_rate": args.error_rate,
+        "throttle_rate": args.throttle_rate, "max_per_second": args.max_per_second, "seed": args.seed,
+    }
+
+    results = {"settings": vars(args)}
+    senders = args.senders.split(",")
+    if "outbox" in senders:
+        results["outbox"] = run_outbox(bulletins, server_settings, args.coalesce_seconds, args.timeout)
+    if "crew" in senders:
+        results["crew"] = run_crew(bulletins, server_settings, args.rate, args.burst, args.timeout)
+
+    for name in senders:
+        r = results[name]
+        latency = r["latency_seconds"]
+        print(f"{name:<7} {r['api_messages']:4d} API messages  {r['messages_per_second']:7.2f} msg/s  "
+              f"latency p50 {latency.get('p50', 0):6.2f}s p95 {latency.get('p95', 0):6.2f}s  "
+              f"retries {r['retries']}  responses {r['server']['responses']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Cost of the metrics layer per research request.
+
+Runs the research graph with zero-latency fake models and tools (see
+fakes.py), so the time measured is the graph's own work. Each round runs the
+same requests three ways:
+- off: no metrics handler attached (RESEARCH_METRICS=0)
+- metrics: RequestMetrics attached, no trace files
+- traces: RequestMetrics attached and writing a JSON trace per request
+
+Usage (from agents/langGraph):
+    python benchmarks/metrics_overhead.py --requests 200 --output overhead.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [BENCH_DIR, os.path.dirname(BENCH_DIR)]
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("LLM_USAGE_LOG", "0")
+os.environ.setdefault("CHECKPOINT_BACKEND", "memory")
+
+from fakes import FakeResearcherModel, fake_evaluator, fake_summarizer, fake_tools
+from conversation_compactor import ConversationCompactor
+from research_assistant import ResearchAssistant, ResearchEvaluatorOutput
+from research_evaluation import TieredEvaluator
+import research_assistant
+import research_metrics
+
+
+async def make_assistant(args) -> ResearchAssistant:
+    assistant = ResearchAssistant()
+    assistant.tools = fake_tools(0, result_chars=200)
+    assistant.researcher_llm_with_tools = FakeResearcherModel(latency=0, tool_steps=args.tool_steps)
+    assistant.evaluator_llm_with_output = fake_evaluator(ResearchEvaluatorOutput, 0)
+    assistant.compactor = ConversationCompactor(fake_summarizer(0))
+    assistant.evaluation = TieredEvaluator(mode="llm")
+    await assistant.build_research_graph()
+    return assistant
+
+
+def handler_factory(mode: str, trace_dir: str):
+    if mode == "off":
+        return lambda session_id, objective: None
+    return lambda session_id, objective: research_metrics.RequestMetrics(
+        session_id, objective, trace_dir=trace_dir if mode == "traces" else None
+    )
+
+
+async def run_mode(mode: str, args, trace_dir: str) -> list:
+    research_assistant.start_request_metrics = handler_factory(mode, trace_dir)
+    assistant = await make_assistant(args)
+    samples = []
+    for i in range(args.requests):
+        started = time.perf_counter()
+        await assistant.conduct_research(f"Topic {i}", "", [])
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--tool-steps", type=int, default=2)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    modes = ["off", "metrics", "traces"]
+    samples = {mode: [] for mode in modes}
+    with tempfile.TemporaryDirectory() as trace_dir:
+        # interleave the modes so drift (warm-up, GC) hits them equally
+        for _ in range(args.rounds):
+            for mode in modes:
+                samples[mode] += asyncio.run(run_mode(mode, args, trace_dir))
+
+    results = {"settings": vars(args)}
+    baseline = statistics.median(samples["off"])
+    for mode in modes:
+        median = statistics.median(samples[mode])
+        results[mode] = {"median_ms": median * 1000, "overhead_ms": (median - baseline) * 1000,
+                         "overhead_pct": (median / baseline - 1) * 100}
+        print(f"{mode:<8} median {median * 1000:7.2f} ms/request  "
+              f"overhead {results[mode]['overhead_ms']:+6.2f} ms ({results[mode]['overhead_pct']:+5.1f}%)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Hit rate and time saved by the research index on near-duplicate requests.
+
+Replays a stream of research requests drawn from a few topics, each asked
+in several phrasings, against the research graph with fake models and tools
+(see fakes.py). The same stream runs twice:
+- off: no research index, every request runs the graph
+- on: a fresh ResearchIndex with bag-of-words fake embeddings; close
+  phrasings are answered from it, looser ones start warm
+
+Usage (from agents/langGraph):
+    python benchmarks/research_index_benchmark.py --requests 30 --output index.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [BENCH_DIR, os.path.dirname(BENCH_DIR)]
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("LLM_USAGE_LOG", "0")
+os.environ.setdefault("RESEARCH_METRICS", "0")
+os.environ.setdefault("CHECKPOINT_BACKEND", "memory")
+os.environ.setdefault("LLM_MAX_IN_FLIGHT", "100000")
+os.environ.setdefault("LLM_IN_FLIGHT_CEILING", "100000")
+
+from fakes import FakeEmbeddings, FakeResearcherModel, fake_evaluator, fake_summarizer, fake_tools, percentiles
+from conversation_compactor import ConversationCompactor
+from research_assistant import ResearchAssistant, ResearchEvaluatorOutput
+from research_evaluation import TieredEvaluator
+from research_index import ResearchIndex
+
+TOPICS = [
+    ["Impact of AI on education", "AI impact on education", "How does AI impact education?",
+     "Impact of artificial intelligence on education and schools"],
+    ["Electric vehicle battery recycling", "Recycling of electric vehicle batteries",
+     "How are EV batteries recycled?", "Electric vehicle battery recycling methods and costs"],
+    ["Remote work productivity research", "Research on remote work and productivity",
+     "Does remote work affect productivity?", "Remote work productivity studies since 2020"],
+    ["Microplastics in drinking water", "Drinking water microplastics",
+     "Health effects of microplastics in drinking water", "How much microplastic is in tap water?"],
+]
+
+
+def workload(requests: int, seed: int) -> list:
+    rng = random.Random(seed)
+    return [rng.choice(rng.choice(TOPICS)) for _ in range(requests)]
+
+
+async def run(index, args, stream: list) -> dict:
+    assistant = ResearchAssistant()
+    assistant.tools = fake_tools(args.tool_latency)
+    assistant.researcher_llm_with_tools = FakeResearcherModel(latency=args.llm_latency, tool_steps=args.tool_steps)
+    assistant.evaluator_llm_with_output = fake_evaluator(ResearchEvaluatorOutput, args.llm_latency)
+    assistant.compactor = ConversationCompactor(fake_summarizer(args.llm_latency))
+    assistant.evaluation = TieredEvaluator(mode="llm")
+    assistant.research_index = index
+    await assistant.build_research_graph()
+    samples = []
+    started = time.perf_counter()
+    for request in stream:
+        request_started = time.perf_counter()
+        await assistant.conduct_research(request, "", [])
+        samples.append(time.perf_counter() - request_started)
+    return {"total_s": time.perf_counter() - started, "request_s": percentiles(samples),
+            "mean_s": statistics.mean(samples), "index": index.stats() if index else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--tool-steps", type=int, default=2)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--tool-latency", type=float, default=0.3)
+    parser.add_argument("--embed-latency", type=float, default=0.1)
+    parser.add_argument("--answer-similarity", type=float, default=0.92)
+    parser.add_argument("--warm-similarity", type=float, default=0.80)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    stream = workload(args.requests, args.seed)
+    results = {"settings": vars(args), "off": asyncio.run(run(None, args, stream))}
+    with tempfile.TemporaryDirectory() as directory:
+        index = ResearchIndex(os.path.join(directory, "research_index.sqlite3"), FakeEmbeddings(args.embed_latency),
+                              answer_similarity=args.answer_similarity, warm_similarity=args.warm_similarity)
+        results["on"] = asyncio.run(run(index, args, stream))
+
+    for mode in ("off", "on"):
+        row = results[mode]
+        print(f"{mode:<4} {row['total_s']:7.2f} s total  {row['mean_s']:6.2f} s/request mean  "
+              f"p50 {row['request_s']['p50']:6.2f} s")
+    stats = results["on"]["index"]
+    print(f"index: {stats['answered']} answered, {stats['warm_starts']} warm starts, {stats['misses']} misses "
+          f"(hit rate {stats['hit_rate']:.0%}), {stats['seconds_saved']:.1f} s saved")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Startup benchmark for the research assistant.
+
+Measures, each in a fresh Python process:
+- import time of research_tools, research_assistant and research_app
+- ResearchAssistant.setup() time
+- per-session cost with --sessions sessions in one process: setup time and
+  Python heap held per session (tracemalloc), both for the shared graph
+  (setup()) and for a graph built per session (build(), as before)
+- time to first token: process start until the researcher LLM streams its first
+  chunk (only when OPENAI_API_KEY is set, since it makes one real API call)
+
+Usage (from agents/langGraph):
+    python benchmarks/startup_benchmark.py --runs 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+LANGGRAPH_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = """
+import time, json
+start = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - start}}))
+"""
+
+SETUP_SNIPPET = """
+import asyncio, os, time, json
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+start = time.perf_counter()
+from research_assistant import ResearchAssistant
+imported = time.perf_counter()
+
+async def main():
+    assistant = ResearchAssistant()
+    await assistant.setup()
+    ready = time.perf_counter()
+    await assistant.aclose()
+    return ready
+
+ready = asyncio.run(main())
+print(json.dumps({"import": imported - start, "setup": ready - imported, "total": ready - start}))
+"""
+
+SESSIONS_SNIPPET = """
+import asyncio, gc, os, time, json, tracemalloc
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("CHECKPOINT_BACKEND", "memory")
+from research_assistant import ResearchAssistant
+
+async def main():
+    setups, sessions = [], []
+    tracemalloc.start()
+    for i in range({sessions}):
+        if i == 1:
+            # the first session also pays for anything built once per process
+            gc.collect()
+            baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        assistant = ResearchAssistant()
+        await {setup}
+        setups.append(time.perf_counter() - started)
+        sessions.append(assistant)
+    gc.collect()
+    held = (tracemalloc.get_traced_memory()[0] - baseline) / max(1, len(sessions) - 1)
+    for assistant in sessions:
+        await assistant.aclose()
+    return {{"first": setups[0], "rest": sorted(setups[1:])[len(setups[1:]) // 2], "bytes_per_session": held}}
+
+print(json.dumps(asyncio.run(main())))
+"""
+
+SESSION_MODES = {"shared": "assistant.setup()", "per_session": "assistant.build()"}
+
+TTFT_SNIPPET = """
+import asyncio, time, json
+start = time.perf_counter()
+import research_app
+from langchain_core.messages import HumanMessage
+
+async def main():
+    assistant = await research_app.setup_research_assistant()
+    ready = time.perf_counter()
+    first = None
+    async for _ in assistant.researcher_llm_with_tools.astream([HumanMessage(content="Say hello in one word.")]):
+        first = time.perf_counter()
+        break
+    await assistant.aclose()
+    return ready, first
+
+ready, first = asyncio.run(main())
+print(json.dumps({"ready": ready - start, "first_token": first - start}))
+"""
+
+
+def run_snippet(code: str) -> dict:
+    """Run a snippet in a fresh interpreter and parse its JSON result line"""
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", code],
+        cwd=LANGGRAPH_DIR, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples):
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "max": max(samples),
+        "runs": len(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--skip-ttft", action="store_true", help="Skip the real LLM call")
+    parser.add_argument("--sessions", type=int, default=20, help="Sessions per process for the per-session cost")
+    args = parser.parse_args()
+
+    results = {"imports": {}}
+    for module in ("research_tools", "research_assistant", "research_app"):
+        samples = [run_snippet(IMPORT_SNIPPET.format(module=module))["seconds"] for _ in range(args.runs)]
+        results["imports"][module] = summarize(samples)
+        print(f"import {module:<20} median {results['imports'][module]['median'] * 1000:8.1f} ms")
+
+    setups = [run_snippet(SETUP_SNIPPET) for _ in range(args.runs)]
+    results["setup"] = {key: summarize([s[key] for s in setups]) for key in ("import", "setup", "total")}
+    print(f"assistant setup            median {results['setup']['setup']['median'] * 1000:8.1f} ms")
+
+    results["sessions"] = {}
+    for mode, setup in SESSION_MODES.items():
+        runs = [run_snippet(SESSIONS_SNIPPET.format(sessions=args.sessions, setup=setup)) for _ in range(args.runs)]
+        results["sessions"][mode] = {key: summarize([r[key] for r in runs]) for key in runs[0]}
+        row = results["sessions"][mode]
+        print(f"session setup {mode:<12} first {row['first']['median'] * 1000:8.1f} ms  "
+              f"then {row['rest']['median'] * 1000:8.2f} ms/session  "
+              f"{row['bytes_per_session']['median'] / 1024:8.1f} KiB/session")
+
+    if args.skip_ttft or not os.getenv("OPENAI_API_KEY"):
+        print("time to first token        skipped (set OPENAI_API_KEY to measure)")
+    else:
+        ttfts = [run_snippet(TTFT_SNIPPET) for _ in range(args.runs)]
+        results["time_to_first_token"] = {key: summarize([t[key] for t in ttfts]) for key in ("ready", "first_token")}
+        print(f"time to first token        median {results['time_to_first_token']['first_token']['median'] * 1000:8.1f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
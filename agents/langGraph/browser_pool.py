@@ -0,0 +1,294 @@
+"""Process-wide pool of headless Playwright browsers shared by all research sessions.
+
+Browsers are launched lazily. Each research session leases one lightweight
+BrowserContext, so sessions keep separate cookies and tabs without paying for a
+browser each. A browser is recycled once it has opened BROWSER_MAX_PAGES pages,
+and replaced if it crashes.
+"""
+import asyncio
+import os
+import time
+import uuid
+from langchain_community.tools.playwright import (
+    ClickTool, CurrentWebPageTool, ExtractHyperlinksTool, ExtractTextTool, GetElementsTool, NavigateBackTool,
+    NavigateTool,
+)
+import psutil
+from playwright.async_api import async_playwright
+
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+BROWSER_CONTEXTS_PER_BROWSER = int(os.getenv("BROWSER_CONTEXTS_PER_BROWSER", "8"))
+BROWSER_MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", "200"))
+BROWSER_HEADLESS = os.getenv("BROWSER_HEADLESS", "true").lower() != "false"
+
+
+class PooledBrowser:
+    """A browser in the pool plus the bookkeeping used for recycling"""
+
+    def __init__(self, browser, pool_id: str, pid=None):
+        self.browser = browser
+        self.pool_id = pool_id
+        # the browser's main process, for memory accounting; None if it could not be read
+        self.pid = pid
+        self.started_at = time.time()
+        self.active_contexts = 0
+        self.pages_opened = 0
+        self.draining = False
+        self.crashed = False
+
+    def memory_bytes(self):
+        """Resident memory of this browser's process tree, or None if its pid is unknown"""
+        if self.pid is None:
+            return None
+        try:
+            root = psutil.Process(self.pid)
+            procs = [root] + root.children(recursive=True)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return None
+        total = 0
+        for proc in procs:
+            try:
+                total += proc.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return total
+
+
+async def browser_pid(browser):
+    """Pid of a Chromium browser's main process, read over CDP (Playwright does not expose it)"""
+    try:
+        session = await browser.new_browser_cdp_session()
+        try:
+            info = await session.send("SystemInfo.getProcessInfo")
+        finally:
+            await session.detach()
+    except Exception as e:
+        print(f"Could not read the browser pid; its memory will not be reported: {e}")
+        return None
+    return next((p["id"] for p in info.get("processInfo", []) if p.get("type") == "browser"), None)
+
+
+# The tools PlayWrightBrowserToolkit hands out
+BROWSER_TOOL_CLASSES = (ClickTool, NavigateTool, NavigateBackTool, ExtractTextTool, ExtractHyperlinksTool,
+                        GetElementsTool, CurrentWebPageTool)
+
+
+class SessionBrowser:
+    """Browser stand-in that only exposes one session's leased context to the Playwright tools.
+
+    The tools always work on ``browser.contexts[0]``, so handing them the shared
+    browser directly would mix sessions together. They only use ``contexts`` and
+    ``new_context``, which is all this provides.
+    """
+
+    def __init__(self, pool, lease):
+        self._pool = pool
+        self._lease = lease
+
+    @property
+    def contexts(self):
+        # An empty list makes the tools call new_context, which moves the
+        # session onto a healthy browser after a crash or once recycling starts
+        if self._lease.context is None or self._lease.pooled.draining:
+            return []
+        return [self._lease.context]
+
+    async def new_context(self, **kwargs):
+        await self._pool.renew(self._lease)
+        return self._lease.context
+
+    async def close(self, **kwargs):
+        await self._pool.release(self._lease)
+
+
+class BrowserLease:
+    """One session's BrowserContext, leased from the pool"""
+
+    def __init__(self, session_id: str, pooled: PooledBrowser, context, wait_seconds: float):
+        self.session_id = session_id
+        self.pooled = pooled
+        self.context = context
+        self.wait_seconds = wait_seconds
+        self.released = False
+        self.browser = None
+
+    def get_tools(self):
+        """Playwright toolkit tools bound to this lease's context"""
+        # model_construct skips the fields' isinstance check against playwright's Browser
+        return [tool_class.model_construct(async_browser=self.browser) for tool_class in BROWSER_TOOL_CLASSES]
+
+
+class BrowserPool:
+    """Lazily started pool of headless browsers handing out per-session contexts"""
+
+    def __init__(self, size: int = BROWSER_POOL_SIZE,
+                 contexts_per_browser: int = BROWSER_CONTEXTS_PER_BROWSER,
+                 max_pages: int = BROWSER_MAX_PAGES, headless: bool = BROWSER_HEADLESS):
+        self.size = size
+        self.contexts_per_browser = contexts_per_browser
+        self.max_pages = max_pages
+        self.headless = headless
+        self._playwright = None
+        self._browsers = []
+        self._lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(size * contexts_per_browser)
+        self._pending_closes = set()
+        self._closing = False
+        self.leases_granted = 0
+        self.lease_wait_total = 0.0
+        self.lease_wait_max = 0.0
+        self.browsers_launched = 0
+        self.browsers_recycled = 0
+        self.browsers_crashed = 0
+
+    async def _launch(self) -> PooledBrowser:
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        browser = await self._playwright.chromium.launch(headless=self.headless)
+        pooled = PooledBrowser(browser, uuid.uuid4().hex, await browser_pid(browser))
+        browser.on("disconnected", lambda _: self._on_disconnected(pooled))
+        self._browsers.append(pooled)
+        self.browsers_launched += 1
+        return pooled
+
+    async def _pick_browser(self) -> PooledBrowser:
+        live = [b for b in self._browsers if not b.draining and not b.crashed]
+        available = [b for b in live if b.active_contexts < self.contexts_per_browser]
+        if available:
+            return min(available, key=lambda b: b.active_contexts)
+        return await self._launch()
+
+    async def _open_context(self, pooled: PooledBrowser):
+        context = await pooled.browser.new_context()
+        pooled.active_contexts += 1
+        context.on("page", lambda _: self._on_page(pooled))
+        return context
+
+    async def lease(self, session_id: str) -> BrowserLease:
+        """Lease a fresh BrowserContext for a session, waiting if the pool is full"""
+        start = time.perf_counter()
+        await self._slots.acquire()
+        try:
+            async with self._lock:
+                pooled = await self._pick_browser()
+                context = await self._open_context(pooled)
+        except BaseException:
+            self._slots.release()
+            raise
+        wait = time.perf_counter() - start
+        self.leases_granted += 1
+        self.lease_wait_total += wait
+        self.lease_wait_max = max(self.lease_wait_max, wait)
+        lease = BrowserLease(session_id, pooled, context, wait)
+        lease.browser = SessionBrowser(self, lease)
+        return lease
+
+    async def renew(self, lease: BrowserLease):
+        """Move a lease to a healthy browser after its context was lost"""
+        if lease.released:
+            raise RuntimeError(f"Browser lease for session {lease.session_id} was already released")
+        old_pooled, old_context = lease.pooled, lease.context
+        async with self._lock:
+            pooled = await self._pick_browser()
+            lease.context = await self._open_context(pooled)
+            lease.pooled = pooled
+        await self._detach(old_pooled, old_context)
+
+    async def release(self, lease: BrowserLease):
+        """Close a session's context and return its slot to the pool"""
+        if lease.released:
+            return
+        lease.released = True
+        self._slots.release()
+        await self._detach(lease.pooled, lease.context)
+        lease.context = None
+
+    def release_nowait(self, lease: BrowserLease):
+        """Release from sync code running on the event loop; the close is tracked until drained"""
+        if lease.released:
+            return
+        task = asyncio.get_running_loop().create_task(self.release(lease))
+        self._pending_closes.add(task)
+        task.add_done_callback(self._pending_closes.discard)
+
+    async def _detach(self, pooled: PooledBrowser, context):
+        if context is not None and not pooled.crashed:
+            try:
+                await context.close()
+            except Exception as e:
+                print(f"Browser context close failed: {e}")
+        pooled.active_contexts = max(0, pooled.active_contexts - 1)
+        if pooled.draining and pooled.active_contexts == 0 and pooled in self._browsers:
+            self._browsers.remove(pooled)
+            if not pooled.crashed:
+                self.browsers_recycled += 1
+                try:
+                    await pooled.browser.close()
+                except Exception as e:
+                    print(f"Browser close failed: {e}")
+
+    def _on_page(self, pooled: PooledBrowser):
+        pooled.pages_opened += 1
+        if pooled.pages_opened >= self.max_pages:
+            # stop handing out new contexts; closed once the last session leaves
+            pooled.draining = True
+
+    def _on_disconnected(self, pooled: PooledBrowser):
+        if self._closing or pooled not in self._browsers:
+            # closed by us, either on recycle or on shutdown
+            return
+        pooled.crashed = True
+        pooled.draining = True
+        self.browsers_crashed += 1
+        if pooled.active_contexts == 0:
+            self._browsers.remove(pooled)
+        print(f"Browser {pooled.pool_id[:8]} disconnected; sessions will move to a new browser")
+
+    async def close(self):
+        """Wait for pending releases, then stop every browser and Playwright itself"""
+        self._closing = True
+        if self._pending_closes:
+            await asyncio.gather(*self._pending_closes, return_exceptions=True)
+        for pooled in list(self._browsers):
+            try:
+                await pooled.browser.close()
+            except Exception:
+                pass
+        self._browsers.clear()
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+        self._closing = False
+
+    def stats(self) -> dict:
+        """Lease wait times and per-browser usage, including resident memory"""
+        return {
+            "browsers": [
+                {
+                    "id": b.pool_id[:8],
+                    "active_contexts": b.active_contexts,
+                    "pages_opened": b.pages_opened,
+                    "draining": b.draining,
+                    "uptime_seconds": time.time() - b.started_at,
+                    "memory_bytes": b.memory_bytes(),
+                }
+                for b in self._browsers
+            ],
+            "leases_granted": self.leases_granted,
+            "lease_wait_avg_seconds": self.lease_wait_total / self.leases_granted if self.leases_granted else 0.0,
+            "lease_wait_max_seconds": self.lease_wait_max,
+            "browsers_launched": self.browsers_launched,
+            "browsers_recycled": self.browsers_recycled,
+            "browsers_crashed": self.browsers_crashed,
+        }
+
+
+_browser_pool = None
+
+
+def get_browser_pool() -> BrowserPool:
+    """Return the process-wide browser pool"""
+    global _browser_pool
+    if _browser_pool is None:
+        _browser_pool = BrowserPool()
+    return _browser_pool
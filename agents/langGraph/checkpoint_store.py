@@ -0,0 +1,426 @@
+"""Durable, bounded LangGraph checkpointer on SQLite (WAL).
+
+MemorySaver keeps every checkpoint of every session in RAM, each with the full
+message list, until the process exits. SQLiteCheckpointSaver stores them on
+disk instead:
+- channel values are stored per version, like MemorySaver, so a checkpoint
+  only adds the channels that changed
+- list channels (the message history) are stored as references to
+  content-addressed items, so each message is written once no matter how
+  many checkpoints contain it
+- everything is zlib-compressed
+- only the last CHECKPOINT_KEEP_LAST checkpoints per thread are kept, and
+  threads idle for CHECKPOINT_THREAD_TTL seconds are deleted
+
+Nothing is cached in memory, so resident memory per session stays flat.
+It is opt-in with CHECKPOINT_BACKEND=sqlite: every conversation is then
+written to CHECKPOINT_PATH (~/.cache/agents/checkpoints.sqlite3) and kept
+there until its thread expires. The default stays MemorySaver, which keeps
+nothing on disk.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "memory").lower()
+CHECKPOINT_PATH = os.path.expanduser(os.getenv("CHECKPOINT_PATH", "~/.cache/agents/checkpoints.sqlite3"))
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "20"))
+CHECKPOINT_THREAD_TTL = int(os.getenv("CHECKPOINT_THREAD_TTL", str(7 * 24 * 3600)))
+# Orphaned items and idle threads are swept every this many checkpoints
+CHECKPOINT_GC_EVERY = int(os.getenv("CHECKPOINT_GC_EVERY", "50"))
+
+LIST_REFS = "__item_refs__"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS checkpoint_channels (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, channel)
+);
+CREATE INDEX IF NOT EXISTS checkpoint_channels_version
+    ON checkpoint_channels (thread_id, checkpoint_ns, channel, version);
+CREATE TABLE IF NOT EXISTS channel_values (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS items (
+    hash TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    value BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS item_refs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version, hash)
+);
+CREATE INDEX IF NOT EXISTS item_refs_hash ON item_refs (hash);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver[str]):
+    """Checkpointer with compressed, deduplicated storage and a retention policy"""
+
+    def __init__(self, path: str = CHECKPOINT_PATH, keep_last: int = CHECKPOINT_KEEP_LAST,
+                 thread_ttl: float = CHECKPOINT_THREAD_TTL, gc_every: int = CHECKPOINT_GC_EVERY, serde=None):
+        super().__init__(serde=serde)
+        self.path = path
+        self.keep_last = keep_last
+        self.thread_ttl = thread_ttl
+        self.gc_every = gc_every
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.items_written = 0
+        self.items_deduplicated = 0
+        self.bytes_written = 0
+        self.checkpoints_pruned = 0
+        self.threads_expired = 0
+
+    # Serialization
+
+    def _dump(self, value) -> Tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(value)
+        return type_, zlib.compress(data)
+
+    def _load(self, type_: str, data: bytes):
+        return self.serde.loads_typed((type_, zlib.decompress(data)))
+
+    def _store_value(self, thread_id: str, ns: str, channel: str, version: str, value):
+        """Write one channel version; lists become references to content-addressed items"""
+        if isinstance(value, list) and value:
+            hashes = []
+            for item in value:
+                type_, data = self.serde.dumps_typed(item)
+                digest = hashlib.sha256(type_.encode() + b"\0" + data).hexdigest()
+                hashes.append(digest)
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO items (hash, type, value) VALUES (?, ?, ?)",
+                    (digest, type_, zlib.compress(data)),
+                )
+                if cursor.rowcount:
+                    self.items_written += 1
+                    self.bytes_written += len(data)
+                else:
+                    self.items_deduplicated += 1
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO item_refs VALUES (?, ?, ?, ?, ?)",
+                [(thread_id, ns, channel, version, digest) for digest in set(hashes)],
+            )
+            row = (LIST_REFS, zlib.compress(json.dumps(hashes).encode()))
+        else:
+            row = self._dump(value)
+        self.bytes_written += len(row[1])
+        self._conn.execute(
+            "INSERT OR REPLACE INTO channel_values VALUES (?, ?, ?, ?, ?, ?)",
+            (thread_id, ns, channel, version, row[0], row[1]),
+        )
+
+    def _load_values(self, thread_id: str, ns: str, versions: ChannelVersions) -> Dict[str, Any]:
+        values = {}
+        for channel, version in versions.items():
+            row = self._conn.execute(
+                "SELECT type, value FROM channel_values WHERE thread_id = ? AND checkpoint_ns = ? "
+                "AND channel = ? AND version = ?",
+                (thread_id, ns, channel, str(version)),
+            ).fetchone()
+            if row is None or row[0] == "empty":
+                continue
+            if row[0] == LIST_REFS:
+                hashes = json.loads(zlib.decompress(row[1]))
+                items = {}
+                for digest in set(hashes):
+                    item = self._conn.execute("SELECT type, value FROM items WHERE hash = ?", (digest,)).fetchone()
+                    items[digest] = self._load(*item)
+                values[channel] = [items[digest] for digest in hashes]
+            else:
+                values[channel] = self._load(*row)
+        return values
+
+    def _tuple(self, thread_id: str, ns: str, row) -> CheckpointTuple:
+        checkpoint_id, parent_id, type_, checkpoint_blob, metadata_type, metadata_blob = row
+        checkpoint = self._load(type_, checkpoint_blob)
+        writes = self._conn.execute(
+            "SELECT task_id, channel, type, value FROM writes WHERE thread_id = ? AND checkpoint_ns = ? "
+            "AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint_id}},
+            checkpoint={**checkpoint,
+                        "channel_values": self._load_values(thread_id, ns, checkpoint["channel_versions"])},
+            metadata=self._load(metadata_type, metadata_blob),
+            pending_writes=[(task_id, channel, self._load(t, v)) for task_id, channel, t, v in writes],
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": parent_id}}
+                if parent_id else None
+            ),
+        )
+
+    # BaseCheckpointSaver API
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        query = ("SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata FROM checkpoints "
+                 "WHERE thread_id = ? AND checkpoint_ns = ?")
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._conn.execute(query + " AND checkpoint_id = ?", (thread_id, ns, checkpoint_id)).fetchone()
+            else:
+                row = self._conn.execute(query + " ORDER BY checkpoint_id DESC LIMIT 1", (thread_id, ns)).fetchone()
+            return self._tuple(thread_id, ns, row) if row else None
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        query = ("SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+                 "FROM checkpoints WHERE 1 = 1")
+        params = []
+        if config:
+            query += " AND thread_id = ?"
+            params.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                query += " AND checkpoint_ns = ?"
+                params.append(config["configurable"]["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                query += " AND checkpoint_id = ?"
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            query += " AND checkpoint_id < ?"
+            params.append(before_id)
+        query += " ORDER BY checkpoint_id DESC"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        for thread_id, ns, *row in rows:
+            with self._lock:
+                result = self._tuple(thread_id, ns, row)
+            if filter and not all(result.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                if limit <= 0:
+                    break
+                limit -= 1
+            yield result
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        stored = checkpoint.copy()
+        values = stored.pop("channel_values")
+        checkpoint_type, checkpoint_blob = self._dump(stored)
+        metadata_type, metadata_blob = self._dump(get_checkpoint_metadata(config, metadata))
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for channel, version in new_versions.items():
+                    if channel in values:
+                        self._store_value(thread_id, ns, channel, str(version), values[channel])
+                    else:
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO channel_values VALUES (?, ?, ?, ?, 'empty', NULL)",
+                            (thread_id, ns, channel, str(version)),
+                        )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (thread_id, ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                     checkpoint_type, checkpoint_blob, metadata_type, metadata_blob),
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO checkpoint_channels VALUES (?, ?, ?, ?, ?)",
+                    [(thread_id, ns, checkpoint["id"], channel, str(version))
+                     for channel, version in checkpoint["channel_versions"].items()],
+                )
+                self._conn.execute("INSERT OR REPLACE INTO threads VALUES (?, ?)", (thread_id, time.time()))
+                self._prune(thread_id, ns)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._puts += 1
+            if self.gc_every and self._puts % self.gc_every == 0:
+                self._collect_garbage()
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # Special channels (errors, interrupts) replace earlier writes; regular ones are written once
+        verb = "INSERT OR REPLACE" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "INSERT OR IGNORE"
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, blob = self._dump(value)
+            rows.append((thread_id, ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx),
+                         channel, type_, blob, task_path))
+        with self._lock:
+            self._conn.executemany(f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._delete_thread(thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # The graph runs async; SQLite calls are short, so they run in a worker thread
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        results = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for result in results:
+            yield result
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    # Retention
+
+    def _prune(self, thread_id: str, ns: str):
+        """Drop checkpoints beyond the newest keep_last, with their writes and unreferenced channel values"""
+        old = [row[0] for row in self._conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+            (thread_id, ns, self.keep_last),
+        ).fetchall()]
+        if not old:
+            return
+        marks = ",".join("?" * len(old))
+        for table in ("checkpoints", "checkpoint_channels", "writes"):
+            self._conn.execute(
+                f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id IN ({marks})",
+                [thread_id, ns] + old,
+            )
+        orphaned = (
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND NOT EXISTS ("
+            "SELECT 1 FROM checkpoint_channels c WHERE c.thread_id = {t}.thread_id "
+            "AND c.checkpoint_ns = {t}.checkpoint_ns AND c.channel = {t}.channel AND c.version = {t}.version)"
+        )
+        self._conn.execute("DELETE FROM channel_values " + orphaned.format(t="channel_values"), (thread_id, ns))
+        self._conn.execute("DELETE FROM item_refs " + orphaned.format(t="item_refs"), (thread_id, ns))
+        self.checkpoints_pruned += len(old)
+
+    def _delete_thread(self, thread_id: str):
+        for table in ("checkpoints", "checkpoint_channels", "channel_values", "item_refs", "writes", "threads"):
+            self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    def _collect_garbage(self):
+        """Expire idle threads and drop items no checkpoint refers to any more"""
+        if self.thread_ttl:
+            expired = [row[0] for row in self._conn.execute(
+                "SELECT thread_id FROM threads WHERE updated_at < ?", (time.time() - self.thread_ttl,)
+            ).fetchall()]
+            for thread_id in expired:
+                self._delete_thread(thread_id)
+            self.threads_expired += len(expired)
+        self._conn.execute("DELETE FROM items WHERE NOT EXISTS (SELECT 1 FROM item_refs r WHERE r.hash = items.hash)")
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {table: self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                      for table in ("threads", "checkpoints", "items")}
+        size = os.path.getsize(self.path) if self.path != ":memory:" and os.path.exists(self.path) else 0
+        return {
+            **counts,
+            "file_bytes": size,
+            "items_written": self.items_written,
+            "items_deduplicated": self.items_deduplicated,
+            "bytes_written": self.bytes_written,
+            "checkpoints_pruned": self.checkpoints_pruned,
+            "threads_expired": self.threads_expired,
+        }
+
+
+_checkpointer = None
+_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer():
+    """One checkpointer for every assistant in the process"""
+    global _checkpointer
+    with _checkpointer_lock:
+        if _checkpointer is None:
+            if CHECKPOINT_BACKEND == "sqlite":
+                _checkpointer = SQLiteCheckpointSaver()
+            else:
+                from langgraph.checkpoint.memory import MemorySaver
+                _checkpointer = MemorySaver()
+        return _checkpointer
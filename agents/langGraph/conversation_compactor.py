@@ -0,0 +1,131 @@
+"""Incremental compaction of the research conversation.
+
+Every researcher -> tools -> evaluator loop used to resend the whole message
+history, so prompt tokens grew quadratically over a session. The compactor
+keeps a running summary of older turns plus the last K turns verbatim. When
+the verbatim part goes over the token budget, only the messages that are not
+yet covered by the summary are folded into it, so each message is summarized
+once. The full history stays in the checkpoint; compaction only changes what
+is sent to the models.
+"""
+import json
+import os
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from llm_usage import count_tokens
+from llm_limiter import get_llm_limiter
+
+COMPACTION_TOKEN_BUDGET = int(os.getenv("COMPACTION_TOKEN_BUDGET", "8000"))
+COMPACTION_KEEP_TURNS = int(os.getenv("COMPACTION_KEEP_TURNS", "6"))
+# Tool output is cut to this many characters before it goes to the summarizer
+COMPACTION_TOOL_CHARS = int(os.getenv("COMPACTION_TOOL_CHARS", "1500"))
+
+SUMMARIZER_PROMPT = """You maintain a running summary of a research session for the researcher who is carrying it out.
+
+Merge the new messages into the existing summary. Keep every concrete finding: facts, figures, dates, names, \
+source URLs and the names of files written. Note which searches and pages were already used, what the user asked \
+for and any open questions. Drop chit-chat and repeated content. Write compact bullet points, at most about 600 words."""
+
+
+def message_tokens(message) -> int:
+    """Rough prompt cost of one message, including tool call arguments"""
+    tokens = 4 + count_tokens(message.content if isinstance(message.content, str) else json.dumps(message.content))
+    for call in getattr(message, "tool_calls", None) or []:
+        tokens += count_tokens(call["name"]) + count_tokens(json.dumps(call["args"]))
+    return tokens
+
+
+def turn_starts(messages, start: int = 0):
+    """Indexes where a turn begins; tool results stay with the call that produced them"""
+    return [i for i in range(start, len(messages)) if not isinstance(messages[i], ToolMessage)]
+
+
+def render_messages(messages) -> str:
+    lines = []
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            lines.append(f"User: {message.content}")
+        elif isinstance(message, AIMessage):
+            if message.content:
+                lines.append(f"Researcher: {message.content}")
+            for call in message.tool_calls or []:
+                lines.append(f"Researcher called {call['name']}({json.dumps(call['args'])[:300]})")
+        elif isinstance(message, ToolMessage):
+            content = str(message.content)
+            if len(content) > COMPACTION_TOOL_CHARS:
+                content = content[:COMPACTION_TOOL_CHARS] + " [...]"
+            lines.append(f"Tool {message.name or ''} returned: {content}")
+    return "\n\n".join(lines)
+
+
+def summary_message(summary: str) -> SystemMessage:
+    return SystemMessage(content=f"Summary of earlier work in this research session:\n{summary}")
+
+
+class ConversationCompactor:
+    """Keeps the conversation sent to the models under a token budget"""
+
+    def __init__(self, llm, token_budget: int = COMPACTION_TOKEN_BUDGET, keep_turns: int = COMPACTION_KEEP_TURNS):
+        self.llm = llm
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self.passes = 0
+        self.summarize_calls = 0
+        self.messages_summarized = 0
+        self.tokens_full_total = 0
+        self.tokens_sent_total = 0
+
+    def plan(self, messages, summarized: int):
+        """Where the verbatim part should start; returns `summarized` when nothing needs folding in"""
+        starts = turn_starts(messages, summarized)
+        if len(starts) <= 1:
+            return summarized
+        cut = starts[max(0, len(starts) - self.keep_turns)]
+        # Older turns go into the summary until the verbatim part fits; keep at least the last turn
+        while cut < starts[-1] and sum(message_tokens(m) for m in messages[cut:]) > self.token_budget * 3 // 4:
+            cut = next(i for i in starts if i > cut)
+        return cut if cut > summarized else summarized
+
+    async def _summarize(self, summary: str, new_messages) -> str:
+        existing = summary or "(none yet)"
+        prompt = [
+            SystemMessage(content=SUMMARIZER_PROMPT),
+            HumanMessage(content=f"EXISTING SUMMARY:\n{existing}\n\nNEW MESSAGES:\n{render_messages(new_messages)}"),
+        ]
+        response = await get_llm_limiter().call(lambda: self.llm.ainvoke(prompt))
+        self.summarize_calls += 1
+        self.messages_summarized += len(new_messages)
+        return response.content
+
+    async def compact(self, messages, summary: str = None, summarized: int = 0) -> dict:
+        """Fold older turns into the summary if the conversation is over budget.
+
+        Returns the state update (empty if nothing changed).
+        """
+        self.passes += 1
+        update = {}
+        verbatim = messages[summarized:]
+        current = sum(message_tokens(m) for m in verbatim) + (count_tokens(summary) if summary else 0)
+        if current > self.token_budget:
+            cut = self.plan(messages, summarized)
+            if cut > summarized:
+                summary = await self._summarize(summary, messages[summarized:cut])
+                summarized = cut
+                update = {"conversation_summary": summary, "summarized_count": summarized}
+
+        full = sum(message_tokens(m) for m in messages)
+        sent = sum(message_tokens(m) for m in messages[summarized:]) + (count_tokens(summary) if summary else 0)
+        self.tokens_full_total += full
+        self.tokens_sent_total += sent
+        print(f"📉 Conversation context: {full} tokens in full, {sent} sent"
+              + (f" (summary covers {summarized} messages)" if summarized else ""))
+        return update
+
+    def stats(self) -> dict:
+        return {
+            "passes": self.passes,
+            "summarize_calls": self.summarize_calls,
+            "messages_summarized": self.messages_summarized,
+            "tokens_full_total": self.tokens_full_total,
+            "tokens_sent_total": self.tokens_sent_total,
+            "tokens_saved": self.tokens_full_total - self.tokens_sent_total,
+        }
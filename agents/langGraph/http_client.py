@@ -0,0 +1,38 @@
+"""Shared keep-alive HTTP client for the async research tools"""
+import asyncio
+import os
+import httpx
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "20"))
+
+_client = None
+_client_loop = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the pooled AsyncClient for the running event loop, creating it on first use"""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    # httpx connections are tied to the loop that opened them
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            ),
+            follow_redirects=True,
+        )
+        _client_loop = loop
+    return _client
+
+
+async def close_http_client():
+    """Close the shared client, e.g. when the app shuts down"""
+    global _client, _client_loop
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+    _client_loop = None
@@ -0,0 +1,200 @@
+"""Opt-in on-disk cache of chat model responses.
+
+Re-running a research topic, or retrying after an error, repeats the same
+researcher and evaluator calls. LLMResponseCache is a LangChain BaseCache, so
+a model created with `cache=get_llm_cache()` looks its call up before going to
+OpenAI. The key is a hash of:
+- the model and its parameters, plus the call's bound tools or response
+  format (LangChain's llm_string)
+- the message list with volatile fields (message ids, response metadata,
+  token usage) removed
+
+Responses are stored zlib-compressed in SQLite and evicted least recently
+used once the file holds more than LLM_CACHE_MAX_BYTES. Structured output
+works too: the parsed object is stored as a dict and the output parser
+rebuilds it.
+
+Enable with LLM_CACHE=1. A request can skip lookups (and refresh the stored
+response) by running the graph with `configurable={"llm_cache_bypass": True}`;
+model calls made inside its nodes see the flag. Hits are marked with
+`response_metadata["llm_cache"] = "hit"`, so they show up in traces and in the
+usage log.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Optional
+from langchain_core.caches import BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+from langchain_core.runnables.config import ensure_config
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "0") == "1"
+LLM_CACHE_PATH = os.path.expanduser(os.getenv("LLM_CACHE_PATH", "~/.cache/agents/llm_cache.sqlite3"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Message fields that differ between identical calls
+VOLATILE_FIELDS = ("id", "response_metadata", "usage_metadata")
+
+
+def canonical_prompt(prompt: str) -> str:
+    """The serialized message list without ids, response metadata and token usage"""
+    try:
+        messages = json.loads(prompt)
+    except ValueError:
+        return prompt
+
+    def strip(node):
+        if isinstance(node, dict):
+            if node.get("type") == "constructor" and isinstance(node.get("kwargs"), dict):
+                node = {**node, "kwargs": {k: v for k, v in node["kwargs"].items() if k not in VOLATILE_FIELDS}}
+            return {k: strip(v) for k, v in node.items()}
+        if isinstance(node, list):
+            return [strip(v) for v in node]
+        return node
+
+    return json.dumps(strip(messages), sort_keys=True)
+
+
+def bypass_requested() -> bool:
+    """True when the current run was started with configurable llm_cache_bypass"""
+    return bool(ensure_config().get("configurable", {}).get("llm_cache_bypass"))
+
+
+class LLMResponseCache(BaseCache):
+    """SQLite-backed chat response cache with size-based LRU eviction"""
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_bytes: int = LLM_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_lru ON llm_cache(last_access)")
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.tokens_saved = 0
+
+    def make_key(self, prompt: str, llm_string: str) -> str:
+        payload = llm_string + "\0" + canonical_prompt(prompt)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _encode(self, generations) -> bytes:
+        stored = []
+        for generation in generations:
+            if isinstance(generation, ChatGeneration):
+                message = generation.message
+                parsed = message.additional_kwargs.get("parsed")
+                if hasattr(parsed, "model_dump"):
+                    # structured output: the parser accepts a dict as well
+                    message = message.model_copy(update={
+                        "additional_kwargs": {**message.additional_kwargs, "parsed": parsed.model_dump()}
+                    })
+                stored.append({"message": message_to_dict(message), "info": generation.generation_info})
+            else:
+                stored.append({"text": generation.text, "info": generation.generation_info})
+        return zlib.compress(json.dumps(stored, default=str).encode("utf-8"))
+
+    def _decode(self, key: str, value: bytes):
+        generations = []
+        for item in json.loads(zlib.decompress(value)):
+            if "message" in item:
+                (message,) = messages_from_dict([item["message"]])
+                message.response_metadata = {**message.response_metadata, "llm_cache": "hit", "llm_cache_key": key[:16]}
+                usage = getattr(message, "usage_metadata", None) or {}
+                self.tokens_saved += usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+                generations.append(ChatGeneration(message=message, generation_info=item["info"]))
+            else:
+                generations.append(Generation(text=item["text"], generation_info=item["info"]))
+        return generations
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Any]:
+        if bypass_requested():
+            self.bypassed += 1
+            return None
+        key = self.make_key(prompt, llm_string)
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+        self.hits += 1
+        print(f"💾 LLM cache hit {key[:12]} ({self.hits} hits, {self.misses} misses)")
+        return self._decode(key, row[0])
+
+    def update(self, prompt: str, llm_string: str, return_val) -> None:
+        key = self.make_key(prompt, llm_string)
+        value = self._encode(return_val)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?)", (key, value, len(value), now, now)
+            )
+            self._evict()
+
+    def _evict(self):
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries until the cache fits again
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM llm_cache ORDER BY last_access ASC"):
+            victims.append(key)
+            freed += size
+            if total - freed <= self.max_bytes:
+                break
+        self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", [(key,) for key in victims])
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, stored = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "tokens_saved": self.tokens_saved,
+            "entries": entries,
+            "bytes_stored": stored,
+        }
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """The process-wide response cache, or None unless LLM_CACHE=1"""
+    global _llm_cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMResponseCache()
+        return _llm_cache
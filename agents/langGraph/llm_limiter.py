@@ -0,0 +1,158 @@
+"""Process-wide, adaptive limit on in-flight LLM calls.
+
+Every session's researcher, evaluator and compactor calls go through one
+AdaptiveLimiter. The limit follows AIMD, like TCP congestion control:
+- each call that finishes under LLM_LATENCY_TARGET raises the limit by
+  1/limit, so it grows by about one per "window" of calls
+- a 429 from the provider, or a call slower than the target, halves it
+  (at most once per LLM_DECREASE_COOLDOWN seconds, so one burst of 429s
+  counts as one signal)
+
+Calls rejected with 429 or a transient error are retried here with
+exponential backoff, after the limit has been adjusted. Models called
+through the limiter must be built with max_retries=0: the OpenAI SDK would
+otherwise retry a 429 itself before the limiter sees it.
+"""
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from tool_execution import LatencyHistogram
+
+LLM_MAX_IN_FLIGHT = float(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+LLM_MIN_IN_FLIGHT = float(os.getenv("LLM_MIN_IN_FLIGHT", "1"))
+LLM_IN_FLIGHT_CEILING = float(os.getenv("LLM_IN_FLIGHT_CEILING", "32"))
+LLM_LATENCY_TARGET = float(os.getenv("LLM_LATENCY_TARGET", "30"))
+LLM_DECREASE_COOLDOWN = float(os.getenv("LLM_DECREASE_COOLDOWN", "5"))
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "4"))
+
+TRANSIENT_ERRORS = ("APIConnectionError", "APITimeoutError", "InternalServerError")
+
+
+def is_rate_limited(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def is_transient(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    return (status is not None and (status in (408, 409) or status >= 500)) or type(error).__name__ in TRANSIENT_ERRORS
+
+
+class AdaptiveLimiter:
+    """Caps concurrent LLM calls; the cap adapts to 429s and latency (AIMD)"""
+
+    def __init__(self, initial: float = LLM_MAX_IN_FLIGHT, minimum: float = LLM_MIN_IN_FLIGHT,
+                 maximum: float = LLM_IN_FLIGHT_CEILING, latency_target: float = LLM_LATENCY_TARGET,
+                 decrease_factor: float = 0.5, cooldown: float = LLM_DECREASE_COOLDOWN, retries: int = LLM_RETRIES):
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.retries = retries
+        self.in_flight = 0
+        self._waiters = deque()
+        self._last_decrease = 0.0
+        self.calls = 0
+        self.throttled = 0
+        self.slow_calls = 0
+        self.retried = 0
+        self.decreases = 0
+        self.latency = LatencyHistogram()
+        self.queue_wait = LatencyHistogram()
+
+    async def acquire(self):
+        queued = time.perf_counter()
+        while self.in_flight >= max(1, int(self.limit)):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # woken and cancelled at once: pass the slot on
+                    self._wake()
+                raise
+        self.in_flight += 1
+        self.queue_wait.observe(time.perf_counter() - queued)
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        free = max(1, int(self.limit)) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def on_success(self, seconds: float):
+        self.latency.observe(seconds)
+        if seconds > self.latency_target:
+            self.slow_calls += 1
+            self._decrease()
+        else:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._wake()
+
+    def on_throttle(self):
+        self.throttled += 1
+        self._decrease()
+
+    def _decrease(self):
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown or self.limit <= self.minimum:
+            return
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit * self.decrease_factor)
+        self.decreases += 1
+        print(f"🚦 LLM concurrency limit lowered to {int(self.limit)}")
+
+    async def call(self, invoke):
+        """Await invoke() within the limit, retrying 429s and transient errors with backoff"""
+        for attempt in range(self.retries + 1):
+            await self.acquire()
+            started = time.perf_counter()
+            try:
+                result = await invoke()
+            except Exception as e:
+                if attempt == self.retries or not (is_rate_limited(e) or is_transient(e)):
+                    raise
+                if is_rate_limited(e):
+                    self.on_throttle()
+                self.retried += 1
+            else:
+                self.calls += 1
+                self.on_success(time.perf_counter() - started)
+                return result
+            finally:
+                self.release()
+            await asyncio.sleep(min(30.0, 2 ** attempt) * (0.5 + random.random()))
+
+    def stats(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "waiting": sum(1 for w in self._waiters if not w.done()),
+            "calls": self.calls,
+            "throttled": self.throttled,
+            "slow_calls": self.slow_calls,
+            "retried": self.retried,
+            "decreases": self.decreases,
+            "latency": self.latency.snapshot(),
+            "queue_wait": self.queue_wait.snapshot(),
+        }
+
+
+_llm_limiter = None
+
+
+def get_llm_limiter() -> AdaptiveLimiter:
+    global _llm_limiter
+    if _llm_limiter is None:
+        _llm_limiter = AdaptiveLimiter()
+    return _llm_limiter
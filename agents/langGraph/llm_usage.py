@@ -0,0 +1,145 @@
+"""Per-call LLM token accounting, including provider-side prompt cache hits.
+
+OpenAI caches the longest previously seen prompt prefix (in 128-token steps,
+from 1024 tokens) and bills cached input tokens at a discount. The usage
+callback reads `input_token_details.cache_read` from every chat model response
+and prints one line per call, so it is easy to see whether the prompt layout
+is keeping the prefix stable. Pass `get_usage_callback()` in the model's
+callbacks and a tag naming the caller (e.g. "researcher").
+"""
+import os
+import threading
+import time
+from langchain_core.callbacks import BaseCallbackHandler
+
+# USD per million input tokens, and the fraction of that billed for cached tokens (gpt-4o-mini)
+LLM_INPUT_PRICE_PER_MTOK = float(os.getenv("LLM_INPUT_PRICE_PER_MTOK", "0.15"))
+LLM_CACHED_PRICE_RATIO = float(os.getenv("LLM_CACHED_PRICE_RATIO", "0.5"))
+LLM_USAGE_LOG = os.getenv("LLM_USAGE_LOG", "1") != "0"
+
+
+_encoding = None
+_encoding_loaded = False
+
+
+def count_tokens(text: str) -> int:
+    """Token count with the gpt-4o tokenizer, or a rough estimate without tiktoken"""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        # Loaded on first use: tiktoken may download the vocabulary. Marked loaded only
+        # afterwards, so a concurrent caller in another thread never sees a half-loaded state.
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = None
+        _encoding_loaded = True
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // 4
+
+
+class UsageTracker:
+    """Totals per caller tag: calls, input/cached/output tokens and latency"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.callers = {}
+
+    def _totals(self, caller: str) -> dict:
+        return self.callers.setdefault(caller, {
+            "calls": 0, "input_tokens": 0, "cached_tokens": 0, "output_tokens": 0,
+            "seconds": 0.0, "cache_hit_calls": 0, "cache_hit_seconds": 0.0, "response_cache_hits": 0,
+        })
+
+    def record(self, caller: str, input_tokens: int, cached_tokens: int, output_tokens: int, seconds: float):
+        with self._lock:
+            totals = self._totals(caller)
+            totals["calls"] += 1
+            totals["input_tokens"] += input_tokens
+            totals["cached_tokens"] += cached_tokens
+            totals["output_tokens"] += output_tokens
+            totals["seconds"] += seconds
+            if cached_tokens:
+                totals["cache_hit_calls"] += 1
+                totals["cache_hit_seconds"] += seconds
+        if LLM_USAGE_LOG:
+            share = cached_tokens / input_tokens if input_tokens else 0.0
+            print(f"🧮 {caller}: {input_tokens} input tokens ({cached_tokens} cached, {share:.0%}), "
+                  f"{output_tokens} output, {seconds:.2f}s")
+
+    def record_response_cache_hit(self, caller: str, seconds: float):
+        """A call answered from the local response cache; no tokens were billed"""
+        with self._lock:
+            self._totals(caller)["response_cache_hits"] += 1
+        if LLM_USAGE_LOG:
+            print(f"🧮 {caller}: answered from the response cache in {seconds:.2f}s")
+
+    def stats(self) -> dict:
+        result = {}
+        with self._lock:
+            for caller, t in self.callers.items():
+                misses = t["calls"] - t["cache_hit_calls"]
+                result[caller] = {
+                    **t,
+                    "cached_share": t["cached_tokens"] / t["input_tokens"] if t["input_tokens"] else 0.0,
+                    "avg_seconds_cache_hit": t["cache_hit_seconds"] / t["cache_hit_calls"] if t["cache_hit_calls"] else 0.0,
+                    "avg_seconds_cache_miss": (t["seconds"] - t["cache_hit_seconds"]) / misses if misses else 0.0,
+                    "input_cost_saved_usd": t["cached_tokens"] * (1 - LLM_CACHED_PRICE_RATIO)
+                                            * LLM_INPUT_PRICE_PER_MTOK / 1_000_000,
+                }
+        return result
+
+
+# Tags LangChain and LangGraph add to every run inside a sequence or graph step
+RUNTIME_TAG_PREFIXES = ("seq:step:", "graph:step:", "langsmith:")
+
+
+def caller_tag(tags) -> str:
+    """The tag naming the caller, skipping tags the runtime adds (e.g. 'seq:step:1')"""
+    for tag in tags or []:
+        if not tag.startswith(RUNTIME_TAG_PREFIXES):
+            return tag
+    return "llm"
+
+
+class UsageCallback(BaseCallbackHandler):
+    """Feeds chat model token usage into a UsageTracker"""
+
+    def __init__(self, tracker: UsageTracker):
+        self.tracker = tracker
+        self._started = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, tags=None, **kwargs):
+        self._started[run_id] = (time.perf_counter(), caller_tag(tags))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        started, caller = self._started.pop(run_id, (time.perf_counter(), "llm"))
+        usage = None
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                if message is not None and message.response_metadata.get("llm_cache") == "hit":
+                    self.tracker.record_response_cache_hit(caller, time.perf_counter() - started)
+                    return
+                usage = getattr(message, "usage_metadata", None) or usage
+        if not usage:
+            return
+        cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+        self.tracker.record(caller, usage.get("input_tokens", 0), cached,
+                            usage.get("output_tokens", 0), time.perf_counter() - started)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
+
+
+_tracker = UsageTracker()
+_callback = UsageCallback(_tracker)
+
+
+def get_usage_tracker() -> UsageTracker:
+    return _tracker
+
+
+def get_usage_callback() -> UsageCallback:
+    return _callback
@@ -0,0 +1,257 @@
+"""Durable WhatsApp notification outbox.
+
+send_whatsapp_notification only writes the message to a SQLite outbox and
+returns. A dispatcher running on its own event loop thread delivers queued
+messages: everything queued for the same recipient within the coalescing
+window goes out as one digest, failed sends are retried with exponential
+backoff, and each number gets at most one message per OUTBOX_MIN_INTERVAL.
+Messages survive a restart: opening the outbox puts rows left in 'sending'
+back in the queue, and research_tools.resume_notification_outbox() starts the
+dispatcher at process start when anything is still pending.
+"""
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+
+OUTBOX_PATH = os.path.expanduser(os.getenv("OUTBOX_PATH", "~/.cache/agents/notification_outbox.sqlite3"))
+OUTBOX_COALESCE_SECONDS = float(os.getenv("OUTBOX_COALESCE_SECONDS", "20"))
+OUTBOX_MIN_INTERVAL = float(os.getenv("OUTBOX_MIN_INTERVAL", "5"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_RETRY_BASE = float(os.getenv("OUTBOX_RETRY_BASE", "2"))
+# Twilio rejects message bodies above 1600 characters
+OUTBOX_MAX_BODY = int(os.getenv("OUTBOX_MAX_BODY", "1600"))
+
+DIGEST_HEADER = "🔬 Research Assistant Update"
+
+
+def build_digest(bodies, max_length: int = OUTBOX_MAX_BODY):
+    """Merge queued messages into one body; returns (body, number of messages used)"""
+    if len(bodies) == 1:
+        return f"{DIGEST_HEADER}:\n\n{bodies[0]}"[:max_length], 1
+    header = f"{DIGEST_HEADER} ({{count}} updates):"
+    parts, used = [], 0
+    for index, body in enumerate(bodies, 1):
+        part = f"{index}. {body}"
+        candidate = "\n\n".join([header.format(count=used + 1)] + parts + [part])
+        if len(candidate) > max_length:
+            if not parts:
+                # a single oversized message is truncated rather than stuck forever
+                parts.append(part[: max_length - len(header) - 10])
+                used = 1
+            break
+        parts.append(part)
+        used += 1
+    return "\n\n".join([header.format(count=used)] + parts), used
+
+
+class NotificationOutbox:
+    """SQLite outbox plus a background dispatcher thread"""
+
+    def __init__(self, send, path: str = OUTBOX_PATH,
+                 coalesce_seconds: float = OUTBOX_COALESCE_SECONDS,
+                 min_interval: float = OUTBOX_MIN_INTERVAL,
+                 max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+                 retry_base: float = OUTBOX_RETRY_BASE):
+        """send(recipient, body) delivers one message and returns its SID; it may block"""
+        self.send = send
+        self.path = path
+        self.coalesce_seconds = coalesce_seconds
+        self.min_interval = min_interval
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                recipient TEXT NOT NULL,
+                body TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                sent_at REAL,
+                sid TEXT,
+                error TEXT
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS outbox_pending ON outbox(status, recipient, next_attempt_at)")
+        # Anything caught mid-send by a crash or restart goes back in the queue
+        self._conn.execute("UPDATE outbox SET status = 'pending' WHERE status = 'sending'")
+        self._lock = threading.Lock()
+        # enqueue may be called from several worker threads at once
+        self._start_lock = threading.Lock()
+        self._last_sent = dict(self._conn.execute(
+            "SELECT recipient, MAX(sent_at) FROM outbox WHERE status = 'sent' GROUP BY recipient"
+        ).fetchall())
+        self._loop = None
+        self._wake = None
+        self._thread = None
+        self._stopping = False
+        self.enqueued = 0
+        self.digests_sent = 0
+        self.messages_sent = 0
+        self.retries = 0
+        self.failed = 0
+        self.queue_latency_total = 0.0
+
+    # Producer side
+
+    def enqueue(self, recipient: str, message: str) -> int:
+        """Store a message for delivery and return its outbox id"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO outbox (recipient, body, created_at, next_attempt_at) VALUES (?, ?, ?, ?)",
+                (recipient, message, now, now),
+            )
+        self.enqueued += 1
+        self.start()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        return cursor.lastrowid
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM outbox WHERE status IN ('pending', 'sending')"
+            ).fetchone()[0]
+
+    # Dispatcher
+
+    def start(self):
+        """Start the dispatcher thread if it is not running"""
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            ready = threading.Event()
+
+            def run():
+                self._loop = asyncio.new_event_loop()
+                self._wake = asyncio.Event()
+                ready.set()
+                self._loop.run_until_complete(self._dispatch_forever())
+
+            self._stopping = False
+            self._thread = threading.Thread(target=run, name="notification-outbox", daemon=True)
+            self._thread.start()
+            ready.wait()
+
+    def stop(self, timeout: float = 10):
+        """Stop the dispatcher; unsent messages stay in the outbox"""
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._loop.call_soon_threadsafe(self._wake.set)
+        self._thread.join(timeout)
+
+    def _due_recipients(self, now: float):
+        """Recipients whose oldest pending message has waited out the coalescing window"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT recipient, MIN(created_at), MIN(next_attempt_at) FROM outbox "
+                "WHERE status = 'pending' GROUP BY recipient"
+            ).fetchall()
+        due, next_wake = [], None
+        for recipient, oldest, next_attempt in rows:
+            ready_at = max(oldest + self.coalesce_seconds, next_attempt,
+                           self._last_sent.get(recipient, 0) + self.min_interval)
+            if ready_at <= now:
+                due.append(recipient)
+            else:
+                next_wake = ready_at if next_wake is None else min(next_wake, ready_at)
+        return due, next_wake
+
+    async def _dispatch_forever(self):
+        in_flight = {}
+        while not self._stopping:
+            now = time.time()
+            due, next_wake = self._due_recipients(now)
+            for recipient in due:
+                if recipient not in in_flight:
+                    # one digest at a time per recipient keeps messages in order
+                    in_flight[recipient] = asyncio.ensure_future(self._deliver(recipient))
+                    in_flight[recipient].add_done_callback(
+                        lambda _, r=recipient: self._delivery_done(in_flight, r)
+                    )
+            timeout = 1.0 if next_wake is None else max(0.05, min(next_wake - time.time(), 30))
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        if in_flight:
+            await asyncio.gather(*in_flight.values(), return_exceptions=True)
+
+    def _delivery_done(self, in_flight: dict, recipient: str):
+        in_flight.pop(recipient, None)
+        self._wake.set()
+
+    async def _deliver(self, recipient: str):
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, body, created_at, attempts FROM outbox "
+                "WHERE status = 'pending' AND recipient = ? AND next_attempt_at <= ? ORDER BY id",
+                (recipient, now),
+            ).fetchall()
+        if not rows:
+            return
+        body, used = build_digest([row[1] for row in rows])
+        batch = rows[:used]
+        ids = [row[0] for row in batch]
+        marks = ",".join("?" * len(ids))
+        with self._lock:
+            self._conn.execute(f"UPDATE outbox SET status = 'sending' WHERE id IN ({marks})", ids)
+        try:
+            sid = await asyncio.to_thread(self.send, recipient, body)
+        except Exception as e:
+            attempts = max(row[3] for row in batch) + 1
+            if attempts >= self.max_attempts:
+                status, next_attempt = "failed", now
+                self.failed += len(batch)
+                print(f"⚠️ WhatsApp digest to {recipient} failed permanently: {e}")
+            else:
+                status = "pending"
+                next_attempt = time.time() + self.retry_base * (2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+                self.retries += 1
+            with self._lock:
+                self._conn.execute(
+                    f"UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, error = ? WHERE id IN ({marks})",
+                    [status, attempts, next_attempt, str(e)[:500]] + ids,
+                )
+            return
+        sent_at = time.time()
+        self._last_sent[recipient] = sent_at
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE outbox SET status = 'sent', sent_at = ?, sid = ?, error = NULL WHERE id IN ({marks})",
+                [sent_at, sid] + ids,
+            )
+        self.digests_sent += 1
+        self.messages_sent += len(batch)
+        self.queue_latency_total += sum(sent_at - row[2] for row in batch)
+
+    def flush(self, timeout: float = 30) -> bool:
+        """Block until the outbox is empty or the timeout passes (for shutdown and benchmarks)"""
+        deadline = time.time() + timeout
+        while self.pending_count() and time.time() < deadline:
+            time.sleep(0.05)
+        return self.pending_count() == 0
+
+    def stats(self) -> dict:
+        return {
+            "enqueued": self.enqueued,
+            "pending": self.pending_count(),
+            "messages_sent": self.messages_sent,
+            "digests_sent": self.digests_sent,
+            "messages_per_digest": self.messages_sent / self.digests_sent if self.digests_sent else 0.0,
+            "retries": self.retries,
+            "failed": self.failed,
+            "avg_queue_seconds": self.queue_latency_total / self.messages_sent if self.messages_sent else 0.0,
+        }
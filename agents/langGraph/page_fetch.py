@@ -0,0 +1,232 @@
+"""Lightweight page reader: pooled HTTP GET plus main-content extraction.
+
+Most pages the researcher reads are static, so driving a full browser and
+pasting every piece of page text into the conversation is wasteful. fetch_page
+downloads the HTML over the shared HTTP client, keeps only the main content
+(readability-style scoring), trims it to a token budget and caches the result
+by content hash. It falls back to the session's Playwright context only when
+the page needs JavaScript to render. Parsing and token counting run in a
+worker thread so a large page does not stall other sessions on the event loop.
+"""
+import asyncio
+import hashlib
+import os
+import re
+import time
+from collections import OrderedDict
+from bs4 import BeautifulSoup
+from http_client import get_http_client
+from llm_usage import count_tokens
+
+FETCH_PAGE_MAX_TOKENS = int(os.getenv("FETCH_PAGE_MAX_TOKENS", "1500"))
+FETCH_PAGE_MAX_BYTES = int(os.getenv("FETCH_PAGE_MAX_BYTES", str(3 * 1024 * 1024)))
+FETCH_PAGE_CACHE_TTL = int(os.getenv("FETCH_PAGE_CACHE_TTL", "3600"))
+FETCH_PAGE_CACHE_SIZE = int(os.getenv("FETCH_PAGE_CACHE_SIZE", "256"))
+# Below this much extracted text we assume the page is rendered client-side
+FETCH_PAGE_MIN_CHARS = int(os.getenv("FETCH_PAGE_MIN_CHARS", "400"))
+
+USER_AGENT = "Mozilla/5.0 (compatible; ResearchAssistant/1.0; +https://github.com/)"
+
+_NOISE_TAGS = ["script", "style", "noscript", "nav", "header", "footer", "aside", "form",
+               "iframe", "svg", "button", "template"]
+# Matched against whole id/class tokens, so "has-sidebar", "navbar-offset" or "canvas" are not noise
+_NOISE_HINTS = re.compile(r"(?:(?:site|page|global|main)[-_])?(?:comments?|sidebar|footer|nav|navbar|navigation|menu"
+                          r"|cookies?|cookie[-_](?:banner|notice|consent)|banner|promo|related|related[-_]posts"
+                          r"|share|sharing|social|advert|ads)", re.I)
+_JS_MARKERS = re.compile(r"enable javascript|javascript is (?:required|disabled)|id=\"(?:root|app|__next)\"",
+                         re.I)
+
+
+def trim_to_tokens(blocks, max_tokens: int):
+    """Keep whole blocks until the budget is used, so text is never cut mid-sentence"""
+    kept, used = [], 0
+    for block in blocks:
+        tokens = count_tokens(block)
+        if used + tokens > max_tokens:
+            if not kept:
+                # a single huge block: cut it by characters
+                kept.append(block[: max_tokens * 4])
+                used = max_tokens
+            break
+        kept.append(block)
+        used += tokens
+    return kept, used
+
+
+def condense(blocks, max_tokens: int):
+    """(blocks kept within max_tokens, their token count, token count of all blocks)"""
+    kept, used = trim_to_tokens(blocks, max_tokens)
+    return kept, used, sum(count_tokens(block) for block in blocks)
+
+
+def _is_noise(tag) -> bool:
+    tokens = [tag.get("id") or ""] + (tag.get("class") or [])
+    return any(_NOISE_HINTS.fullmatch(token) for token in tokens if token)
+
+
+def extract_main_content(html: str):
+    """Return (title, text blocks) for the main content of a page"""
+    soup = BeautifulSoup(html, "lxml")
+    title = soup.title.get_text(strip=True) if soup.title else ""
+    # The marked-up main content and everything around it survive noise removal,
+    # e.g. a page-wide <form> or a <div class="sidebar"> that wraps <main>
+    protected = set()
+    for main in soup.find_all(["main", "article"]):
+        protected.add(id(main))
+        protected.update(id(parent) for parent in main.parents)
+    for tag in soup(_NOISE_TAGS) + soup.find_all(_is_noise):
+        if id(tag) not in protected and tag.name not in ("body", "html") and not tag.decomposed:
+            tag.decompose()
+
+    # Score containers by the paragraph text they hold directly, penalizing link-heavy blocks.
+    # Keyed by id(): hashing a bs4 Tag serializes its whole subtree.
+    scores, containers = {}, {}
+    for paragraph in soup.find_all(["p", "pre", "li", "td"]):
+        text = paragraph.get_text(" ", strip=True)
+        if len(text) < 25:
+            continue
+        parent = paragraph.parent
+        if parent is None:
+            continue
+        link_text = sum(len(a.get_text(strip=True)) for a in paragraph.find_all("a"))
+        score = (1 + text.count(",") + min(len(text) // 100, 3)) * (1 - link_text / max(len(text), 1))
+        for container, weight in ((parent, 1), (parent.parent, 0.5)):
+            if container is not None:
+                containers[id(container)] = container
+                scores[id(container)] = scores.get(id(container), 0) + score * weight
+
+    root = soup.find("article") or soup.find("main")
+    if scores:
+        best = max(scores, key=scores.get)
+        if root is None or scores.get(id(root), 0) < scores[best]:
+            root = containers[best]
+    if root is None:
+        root = soup.body or soup
+
+    blocks = []
+    for element in root.find_all(["h1", "h2", "h3", "h4", "p", "li", "pre", "blockquote", "td"]):
+        if element.find_parent(["p", "li", "blockquote", "td"]) is not None and element.name in ("p", "li"):
+            continue
+        text = re.sub(r"\s+", " ", element.get_text(" ", strip=True))
+        if not text:
+            continue
+        if element.name.startswith("h"):
+            text = "#" * int(element.name[1]) + " " + text
+        blocks.append(text)
+    if not blocks:
+        text = re.sub(r"\s+", " ", root.get_text(" ", strip=True))
+        blocks = [text] if text else []
+    return title, blocks
+
+
+class PageFetcher:
+    """Fetches and extracts pages, caching by URL and by content hash"""
+
+    def __init__(self, max_tokens: int = FETCH_PAGE_MAX_TOKENS):
+        self.max_tokens = max_tokens
+        self._url_cache = OrderedDict()
+        self._content_cache = OrderedDict()
+        self.fetches = 0
+        self.cache_hits = 0
+        self.browser_fallbacks = 0
+        self.bytes_fetched = 0
+        self.tokens_extracted = 0
+        self.tokens_kept = 0
+
+    def _remember(self, cache: OrderedDict, key, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > FETCH_PAGE_CACHE_SIZE:
+            cache.popitem(last=False)
+
+    def _needs_browser(self, html: str, blocks) -> bool:
+        text_chars = sum(len(b) for b in blocks)
+        return text_chars < FETCH_PAGE_MIN_CHARS and (
+            bool(_JS_MARKERS.search(html)) or html.lower().count("<script") > 5
+        )
+
+    async def _download(self, url: str):
+        client = get_http_client()
+        async with client.stream("GET", url, headers={"User-Agent": USER_AGENT,
+                                                       "Accept": "text/html,application/xhtml+xml"}) as response:
+            response.raise_for_status()
+            content_type = response.headers.get("content-type", "")
+            chunks, size = [], 0
+            async for chunk in response.aiter_bytes():
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= FETCH_PAGE_MAX_BYTES:
+                    break
+            body = b"".join(chunks)
+            encoding = response.encoding or "utf-8"
+        self.bytes_fetched += len(body)
+        return body.decode(encoding, errors="replace"), content_type, len(body)
+
+    async def _extract(self, html: str):
+        digest = hashlib.sha256(html.encode("utf-8", errors="replace")).hexdigest()
+        cached = self._content_cache.get(digest)
+        if cached is not None:
+            self.cache_hits += 1
+            return cached
+        title, blocks = await asyncio.to_thread(extract_main_content, html)
+        self._remember(self._content_cache, digest, (title, blocks))
+        return title, blocks
+
+    async def fetch(self, url: str, render=None) -> str:
+        """Return the trimmed main content of a URL.
+
+        render is an optional coroutine function url -> html used for pages that
+        need JavaScript (the session's Playwright context).
+        """
+        if not re.match(r"https?://", url):
+            url = "https://" + url
+        cached = self._url_cache.get(url)
+        if cached is not None and time.time() - cached[0] < FETCH_PAGE_CACHE_TTL:
+            self.cache_hits += 1
+            self._url_cache.move_to_end(url)
+            return cached[1]
+
+        self.fetches += 1
+        html, content_type, size = await self._download(url)
+        if content_type and "html" not in content_type and "xml" not in content_type:
+            if content_type.startswith("text/") or "json" in content_type:
+                title, blocks = "", [html]
+            else:
+                return f"Cannot extract text from {content_type} at {url}. Save or analyse it another way."
+        else:
+            title, blocks = await self._extract(html)
+            if render is not None and self._needs_browser(html, blocks):
+                self.browser_fallbacks += 1
+                title, blocks = await self._extract(await render(url))
+
+        kept, tokens, total_tokens = await asyncio.to_thread(condense, blocks, self.max_tokens)
+        self.tokens_extracted += total_tokens
+        self.tokens_kept += tokens
+        header = f"# {title}\nSource: {url}\n" if title else f"Source: {url}\n"
+        result = header + "\n\n".join(kept)
+        if len(kept) < len(blocks):
+            result += f"\n\n[Truncated to ~{tokens} of {total_tokens} tokens]"
+        self._remember(self._url_cache, url, (time.time(), result))
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "fetches": self.fetches,
+            "cache_hits": self.cache_hits,
+            "browser_fallbacks": self.browser_fallbacks,
+            "bytes_fetched": self.bytes_fetched,
+            "tokens_extracted": self.tokens_extracted,
+            "tokens_kept": self.tokens_kept,
+            # roughly how many bytes of download each kept token cost
+            "bytes_per_kept_token": self.bytes_fetched / self.tokens_kept if self.tokens_kept else 0.0,
+        }
+
+
+_page_fetcher = None
+
+
+def get_page_fetcher() -> PageFetcher:
+    global _page_fetcher
+    if _page_fetcher is None:
+        _page_fetcher = PageFetcher()
+    return _page_fetcher
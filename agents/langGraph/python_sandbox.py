@@ -0,0 +1,319 @@
+"""Pool of pre-warmed worker processes that run the researcher's Python code.
+
+Code runs outside the server process, so a heavy pandas or plotting cell no
+longer holds the GIL that the Gradio event loop needs. Each call gets a CPU
+time limit and a wall-clock limit, and each worker has a memory cap. A session
+keeps the same worker between calls so its variables persist. When the
+request awaiting a call is cancelled, the worker running it is killed rather
+than left to run until the wall-clock limit. Charts and long
+outputs are written to research_outputs/ and returned as file paths.
+
+This isolates the server from runaway code; it is not a security sandbox for
+untrusted users. Workers do not inherit the server's environment, only the
+variables in SANDBOX_ENV_ALLOWLIST, so API keys and Twilio tokens stay out of
+reach of model-written code (which fetched pages can steer).
+"""
+import asyncio
+import json
+import os
+import re
+import select
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+PYTHON_SANDBOX_WARM_WORKERS = int(os.getenv("PYTHON_SANDBOX_WARM_WORKERS", "2"))
+PYTHON_SANDBOX_MAX_WORKERS = int(os.getenv("PYTHON_SANDBOX_MAX_WORKERS", "8"))
+PYTHON_SANDBOX_CPU_SECONDS = int(os.getenv("PYTHON_SANDBOX_CPU_SECONDS", "30"))
+PYTHON_SANDBOX_WALL_SECONDS = float(os.getenv("PYTHON_SANDBOX_WALL_SECONDS", "60"))
+PYTHON_SANDBOX_MEMORY_MB = int(os.getenv("PYTHON_SANDBOX_MEMORY_MB", "2048"))
+PYTHON_SANDBOX_MAX_OUTPUT = int(os.getenv("PYTHON_SANDBOX_MAX_OUTPUT", "4000"))
+PYTHON_SANDBOX_OUTPUT_DIR = os.path.abspath(os.getenv("PYTHON_SANDBOX_OUTPUT_DIR", "research_outputs"))
+
+# Everything else in os.environ (API keys, tokens) is withheld from workers
+SANDBOX_ENV_ALLOWLIST = ("PATH", "HOME", "LANG", "LC_ALL", "LC_CTYPE", "TZ", "TMPDIR")
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "python_sandbox_worker.py")
+
+
+class SandboxTimeout(Exception):
+    pass
+
+
+class SandboxWorker:
+    """One warm interpreter process"""
+
+    def __init__(self, output_dir: str, memory_mb: int):
+        env = {name: os.environ[name] for name in SANDBOX_ENV_ALLOWLIST if name in os.environ}
+        env.update(PYTHON_SANDBOX_MEMORY_MB=str(memory_mb), MPLBACKEND="Agg")
+        self.process = subprocess.Popen(
+            [sys.executable, WORKER_SCRIPT],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            cwd=output_dir, env=env,
+        )
+        self.session_id = None
+        self.last_used = time.time()
+        self.busy = False
+        self.calls = 0
+        self._buffer = b""
+
+    def wait_ready(self, timeout: float):
+        self._read_message(timeout)
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def _read_exact(self, size: int, deadline: float) -> bytes:
+        fd = self.process.stdout.fileno()
+        while len(self._buffer) < size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise SandboxTimeout()
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                raise SandboxTimeout()
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise RuntimeError("Python worker exited unexpectedly (possibly out of memory)")
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def _read_message(self, timeout: float) -> dict:
+        deadline = time.monotonic() + timeout
+        (size,) = struct.unpack(">I", self._read_exact(4, deadline))
+        return json.loads(self._read_exact(size, deadline).decode("utf-8"))
+
+    def execute(self, code: str, cpu_seconds: int, wall_seconds: float, file_prefix: str) -> dict:
+        data = json.dumps({"code": code, "cpu_seconds": cpu_seconds, "file_prefix": file_prefix}).encode("utf-8")
+        self.process.stdin.write(struct.pack(">I", len(data)) + data)
+        self.process.stdin.flush()
+        self.calls += 1
+        return self._read_message(wall_seconds)
+
+    def kill(self):
+        if self.alive:
+            self.process.kill()
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            pass
+
+
+class PythonSandboxPool:
+    """Warm worker pool with per-session affinity"""
+
+    def __init__(self, warm_workers: int = PYTHON_SANDBOX_WARM_WORKERS,
+                 max_workers: int = PYTHON_SANDBOX_MAX_WORKERS,
+                 cpu_seconds: int = PYTHON_SANDBOX_CPU_SECONDS,
+                 wall_seconds: float = PYTHON_SANDBOX_WALL_SECONDS,
+                 memory_mb: int = PYTHON_SANDBOX_MEMORY_MB,
+                 output_dir: str = PYTHON_SANDBOX_OUTPUT_DIR):
+        self.warm_workers = warm_workers
+        self.max_workers = max_workers
+        self.cpu_seconds = cpu_seconds
+        self.wall_seconds = wall_seconds
+        self.memory_mb = memory_mb
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        self._lock = threading.Condition()
+        self._idle = []
+        self._bound = {}
+        self._expired_sessions = set()
+        self._starting = 0
+        self.calls = 0
+        self.timeouts = 0
+        self.workers_started = 0
+        self.workers_evicted = 0
+        self.interrupted = 0
+        self.fill()
+
+    def _start_worker(self):
+        try:
+            worker = SandboxWorker(self.output_dir, self.memory_mb)
+            worker.wait_ready(timeout=60)
+        except Exception as e:
+            print(f"Python sandbox worker failed to start: {e}")
+            worker = None
+        with self._lock:
+            self._starting -= 1
+            if worker is not None:
+                self.workers_started += 1
+                self._idle.append(worker)
+            self._lock.notify_all()
+
+    def _total_workers(self) -> int:
+        return len(self._idle) + len(self._bound) + self._starting
+
+    def fill(self):
+        """Top up the warm workers in the background"""
+        with self._lock:
+            missing = min(self.warm_workers - len(self._idle) - self._starting,
+                          self.max_workers - self._total_workers())
+            self._starting += max(0, missing)
+        for _ in range(max(0, missing)):
+            threading.Thread(target=self._start_worker, daemon=True).start()
+
+    def _evict_lru(self) -> bool:
+        """Free a slot by dropping the least recently used session that is not running code"""
+        candidates = [(w.last_used, sid) for sid, w in self._bound.items() if not w.busy]
+        if not candidates:
+            return False
+        _, session_id = min(candidates)
+        self._bound.pop(session_id).kill()
+        self._expired_sessions.add(session_id)
+        self.workers_evicted += 1
+        return True
+
+    def _acquire(self, session_id: str) -> SandboxWorker:
+        with self._lock:
+            while True:
+                worker = self._bound.get(session_id)
+                if worker is not None and not worker.alive:
+                    del self._bound[session_id]
+                    self._expired_sessions.add(session_id)
+                    worker = None
+                if worker is not None:
+                    if not worker.busy:
+                        worker.busy = True
+                        return worker
+                elif self._idle:
+                    worker = self._idle.pop()
+                    if not worker.alive:
+                        continue
+                    worker.session_id = session_id
+                    worker.busy = True
+                    self._bound[session_id] = worker
+                    break
+                elif self._total_workers() < self.max_workers or self._evict_lru():
+                    self._starting += 1
+                    threading.Thread(target=self._start_worker, daemon=True).start()
+                self._lock.wait(timeout=1)
+        self.fill()
+        return worker
+
+    def _release_call(self, worker: SandboxWorker):
+        with self._lock:
+            worker.busy = False
+            worker.last_used = time.time()
+            self._lock.notify_all()
+
+    def _drop(self, session_id: str, worker: SandboxWorker):
+        with self._lock:
+            if self._bound.get(session_id) is worker:
+                del self._bound[session_id]
+            self._lock.notify_all()
+        worker.kill()
+        self.fill()
+
+    def run(self, session_id: str, code: str) -> str:
+        """Run code in the session's worker and format the result for the LLM"""
+        worker = self._acquire(session_id)
+        notes = []
+        if session_id in self._expired_sessions:
+            self._expired_sessions.discard(session_id)
+            notes.append("Note: the previous Python session was reclaimed; variables were reset.")
+        # file names stay unique across worker restarts
+        session_tag = re.sub(r"[^\w-]", "", session_id)[:12] or "sandbox"
+        prefix = f"python_{session_tag}_{int(time.time())}"
+        self.calls += 1
+        try:
+            result = worker.execute(code, self.cpu_seconds, self.wall_seconds, prefix)
+        except SandboxTimeout:
+            self.timeouts += 1
+            self._drop(session_id, worker)
+            return "\n".join(notes + [
+                f"⏱️ Python execution exceeded {self.wall_seconds:.0f}s and was stopped. "
+                "The interpreter was restarted, so earlier variables are gone."
+            ])
+        except Exception as e:
+            self._drop(session_id, worker)
+            return "\n".join(notes + [f"Python execution failed: {e}. The interpreter was restarted."])
+        self._release_call(worker)
+        return "\n".join(notes + [self._format(result, prefix, worker.calls)])
+
+    async def arun(self, session_id: str, code: str) -> str:
+        """Async version of run(); the blocking wait happens in a thread"""
+        try:
+            return await asyncio.to_thread(self.run, session_id, code)
+        except asyncio.CancelledError:
+            # the thread would otherwise wait out the wall-clock limit
+            self.interrupt(session_id)
+            raise
+
+    def interrupt(self, session_id: str):
+        """Stop the code running in the session's worker; run() then restarts the interpreter"""
+        with self._lock:
+            worker = self._bound.get(session_id)
+        if worker is not None and worker.busy:
+            self.interrupted += 1
+            worker.kill()
+
+    def _format(self, result: dict, prefix: str, call_number: int) -> str:
+        output = result.get("output") or ""
+        parts = []
+        if len(output) > PYTHON_SANDBOX_MAX_OUTPUT:
+            filename = f"{prefix}_call{call_number}_output.txt"
+            with open(os.path.join(self.output_dir, filename), "w") as f:
+                f.write(output)
+            parts.append(output[:PYTHON_SANDBOX_MAX_OUTPUT])
+            parts.append(f"... [output truncated, {len(output)} characters saved to {filename}]")
+        elif output:
+            parts.append(output)
+        if result.get("error"):
+            parts.append(f"Error: {result['error']}")
+        if result.get("files"):
+            parts.append("Saved files in research_outputs/: " + ", ".join(result["files"]))
+        return "\n".join(parts) if parts else "(no output)"
+
+    def release(self, session_id: str):
+        """Discard a finished session's interpreter so the next session starts clean"""
+        with self._lock:
+            worker = self._bound.pop(session_id, None)
+            self._expired_sessions.discard(session_id)
+            self._lock.notify_all()
+        if worker is not None:
+            worker.kill()
+            self.fill()
+
+    def shutdown(self):
+        with self._lock:
+            workers = self._idle + list(self._bound.values())
+            self._idle, self._bound = [], {}
+        for worker in workers:
+            worker.kill()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "idle_workers": len(self._idle),
+                "session_workers": len(self._bound),
+                "starting_workers": self._starting,
+                "calls": self.calls,
+                "timeouts": self.timeouts,
+                "workers_started": self.workers_started,
+                "workers_evicted": self.workers_evicted,
+                "interrupted": self.interrupted,
+            }
+
+
+_sandbox_pool = None
+_sandbox_pool_lock = threading.Lock()
+
+
+def get_sandbox_pool() -> PythonSandboxPool:
+    """Return the process-wide sandbox pool, warming it on first use"""
+    global _sandbox_pool
+    with _sandbox_pool_lock:
+        if _sandbox_pool is None:
+            _sandbox_pool = PythonSandboxPool()
+    return _sandbox_pool
+
+
+def sanitize_code(query: str) -> str:
+    """Strip markdown code fences the LLM sometimes wraps code in"""
+    query = re.sub(r"^(\s|`)*(?i:python)?\s*", "", query)
+    return re.sub(r"(\s|`)*$", "", query)
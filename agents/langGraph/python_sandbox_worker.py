@@ -0,0 +1,135 @@
+"""Worker process for python_sandbox.py.
+
+Started by the sandbox pool with the research outputs directory as its working
+directory. Pre-imports the data science stack, then executes code snippets sent
+over stdin and answers on the original stdout. Messages are length-prefixed JSON.
+"""
+import contextlib
+import io
+import json
+import os
+import resource
+import signal
+import struct
+import sys
+import time
+import traceback
+
+WARM_MODULES = ("numpy", "pandas", "matplotlib")
+
+
+class CPUTimeExceeded(Exception):
+    pass
+
+
+def read_message(stream):
+    header = stream.read(4)
+    if len(header) < 4:
+        return None
+    (size,) = struct.unpack(">I", header)
+    return json.loads(stream.read(size).decode("utf-8"))
+
+
+def write_message(stream, payload):
+    data = json.dumps(payload).encode("utf-8")
+    stream.write(struct.pack(">I", len(data)) + data)
+    stream.flush()
+
+
+def warm_up(namespace):
+    for name in WARM_MODULES:
+        try:
+            module = __import__(name)
+        except ImportError:
+            continue
+        if name == "matplotlib":
+            module.use("Agg")
+            import matplotlib.pyplot as plt
+            namespace["plt"] = plt
+        namespace.setdefault({"numpy": "np", "pandas": "pd"}.get(name, name), module)
+
+
+def on_cpu_limit(signum, frame):
+    raise CPUTimeExceeded("CPU time limit exceeded")
+
+
+def set_cpu_limit(seconds):
+    if seconds <= 0:
+        return
+    used = resource.getrusage(resource.RUSAGE_SELF)
+    spent = used.ru_utime + used.ru_stime
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    resource.setrlimit(resource.RLIMIT_CPU, (int(spent + seconds) + 1, hard))
+
+
+def clear_cpu_limit():
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+
+
+def save_figures(prefix, call_number):
+    plt = sys.modules.get("matplotlib.pyplot")
+    if plt is None:
+        return []
+    files = []
+    for index, number in enumerate(plt.get_fignums(), 1):
+        path = f"{prefix}_call{call_number}_chart{index}.png"
+        plt.figure(number).savefig(path, bbox_inches="tight")
+        files.append(path)
+    plt.close("all")
+    return files
+
+
+def main():
+    # Keep the protocol channel private: anything user code writes to fd 1
+    # directly (C extensions, os.write) goes to /dev/null instead
+    proto_out = os.fdopen(os.dup(1), "wb")
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    proto_in = sys.stdin.buffer
+
+    memory_mb = int(os.getenv("PYTHON_SANDBOX_MEMORY_MB", "0"))
+    namespace = {"__name__": "__main__"}
+    warm_up(namespace)
+    if memory_mb > 0:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    signal.signal(signal.SIGXCPU, on_cpu_limit)
+    write_message(proto_out, {"ready": True, "pid": os.getpid()})
+
+    call_number = 0
+    while True:
+        request = read_message(proto_in)
+        if request is None:
+            break
+        call_number += 1
+        buffer = io.StringIO()
+        error = None
+        start = time.perf_counter()
+        set_cpu_limit(request.get("cpu_seconds", 0))
+        try:
+            with contextlib.redirect_stdout(buffer), contextlib.redirect_stderr(buffer):
+                exec(compile(request["code"], "<sandbox>", "exec"), namespace)
+        except CPUTimeExceeded as e:
+            error = str(e)
+        except MemoryError:
+            error = "Memory limit exceeded"
+        except BaseException:
+            error = traceback.format_exc(limit=5)
+        finally:
+            clear_cpu_limit()
+        try:
+            files = save_figures(request.get("file_prefix", "sandbox"), call_number)
+        except Exception as e:
+            files = []
+            error = (error or "") + f"\nSaving figures failed: {e}"
+        write_message(proto_out, {
+            "output": buffer.getvalue(),
+            "error": error,
+            "files": files,
+            "seconds": time.perf_counter() - start,
+        })
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,12 @@ except:
     from research_assistant import ResearchAssistant
     print("Using Full Research Assistant")
 import asyncio
+from llm_cache import LLM_CACHE_ENABLED
+from research_index import RESEARCH_INDEX_ENABLED
+from research_scheduler import QueueFullError, get_research_scheduler
+from research_metrics import RESEARCH_METRICS, start_metrics_server
+from research_assistant import RESEARCH_MODE
+from research_tools import resume_notification_outbox
 
 async def setup_research_assistant():
     """Initialize the research assistant"""
@@ -14,17 +20,39 @@ async def setup_research_assistant():
     await assistant.setup()
     return assistant
 
-async def process_research_request(assistant, research_topic, quality_criteria, history):
-    """Process a research request"""
+def request_user(request: gr.Request) -> str:
+    """Who the scheduler treats as one user: the login name, else the browser session"""
+    if request is None:
+        return "anonymous"
+    return request.username or request.session_hash or "anonymous"
+
+async def process_research_request(assistant, research_topic, quality_criteria, history, bypass_cache=False,
+                                   mode=RESEARCH_MODE, request: gr.Request = None):
+    """Process a research request, streaming progress into the chat"""
+    user_msg = {"role": "user", "content": research_topic}
+    try:
+        ticket = get_research_scheduler().submit(request_user(request))
+    except QueueFullError as e:
+        yield history + [user_msg, {"role": "assistant", "content": f"🚦 {e}"}], assistant
+        return
     try:
-        results = await assistant.conduct_research(research_topic, quality_criteria, history)
-        return results, assistant
+        async for position in ticket.wait():
+            waiting = {"role": "assistant", "content": f"⏳ Waiting for a free research slot: you are number {position} in the queue."}
+            yield history + [user_msg, waiting], assistant
+        async for results in assistant.stream_research(research_topic, quality_criteria, history,
+                                                       bypass_cache=bypass_cache, mode=mode):
+            yield results, assistant
     except Exception as e:
         error_msg = {"role": "assistant", "content": f"❌ Error during research: {str(e)}"}
-        return history + [error_msg], assistant
+        yield history + [error_msg], assistant
+    finally:
+        ticket.release()
     
-async def reset_assistant():
+async def reset_assistant(assistant):
     """Reset and create a new research assistant"""
+    if assistant:
+        # Give the old session's browser context back before leasing a new one
+        await assistant.aclose()
     new_assistant = ResearchAssistant()
     await new_assistant.setup()
     return "", "", None, new_assistant
@@ -105,6 +133,18 @@ with gr.Blocks(
                 lines=2,
                 scale=2
             )
+
+        with gr.Row():
+            bypass_cache = gr.Checkbox(
+                label="♻️ Fresh answers (skip cached model responses and earlier research)",
+                value=False,
+                visible=LLM_CACHE_ENABLED or RESEARCH_INDEX_ENABLED
+            )
+            mode = gr.Radio(
+                choices=[("🔁 Step by step", "loop"), ("🔀 Parallel searches", "fanout")],
+                value=RESEARCH_MODE,
+                label="🧭 Research Mode"
+            )
     
     with gr.Row():
         reset_btn = gr.Button("🔄 New Research Session", variant="secondary")
@@ -127,31 +167,36 @@ with gr.Blocks(
     # Event handlers
     app.load(setup_research_assistant, [], [assistant])
     
-    research_topic.submit(
+    topic_event = research_topic.submit(
         process_research_request, 
-        [assistant, research_topic, quality_criteria, chatbot], 
+        [assistant, research_topic, quality_criteria, chatbot, bypass_cache, mode],
         [chatbot, assistant]
     )
     
-    quality_criteria.submit(
+    criteria_event = quality_criteria.submit(
         process_research_request, 
-        [assistant, research_topic, quality_criteria, chatbot], 
+        [assistant, research_topic, quality_criteria, chatbot, bypass_cache, mode],
         [chatbot, assistant]
     )
     
-    research_btn.click(
+    click_event = research_btn.click(
         process_research_request, 
-        [assistant, research_topic, quality_criteria, chatbot], 
+        [assistant, research_topic, quality_criteria, chatbot, bypass_cache, mode],
         [chatbot, assistant]
     )
     
     reset_btn.click(
         reset_assistant, 
-        [], 
-        [research_topic, quality_criteria, chatbot, assistant]
+        [assistant], 
+        [research_topic, quality_criteria, chatbot, assistant],
+        # stop the research still streaming into the old chat; aclose cancels its graph run
+        cancels=[topic_event, criteria_event, click_event]
     )
 
 if __name__ == "__main__":
+    if RESEARCH_METRICS:
+        start_metrics_server()
+    resume_notification_outbox()
     app.launch(
         server_name="0.0.0.0",
         server_port=7860,
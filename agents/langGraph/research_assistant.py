@@ -3,12 +3,25 @@ from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode
+from langgraph.types import Send
 from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.memory import MemorySaver
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
 from pydantic import BaseModel, Field
-from research_tools import get_research_tools
+from research_tools import (get_research_tools, get_shared_research_tools, release_research_tools,
+                            release_research_tools_nowait, release_shared_research_tools,
+                            release_shared_research_tools_nowait)
+from llm_usage import get_usage_callback
+from llm_cache import get_llm_cache
+from llm_limiter import get_llm_limiter
+from research_metrics import start_request_metrics
+from conversation_compactor import ConversationCompactor, summary_message
+from checkpoint_store import get_checkpointer
+from research_evaluation import EVALUATION_PREFIX, TieredEvaluator, request_messages
+from research_budget import BudgetExceeded, RequestBudget, partial_result, stopped_message
+from research_index import get_research_index, completed_research, warm_start_context, answered_from_index
 from dotenv import load_dotenv
+import os
+import time
 import uuid
 import asyncio
 from datetime import datetime
@@ -16,6 +29,28 @@ from datetime import datetime
 # Load environment variables from root .env file
 load_dotenv("../.env", override=True)
 
+# Minimum gap between chat updates while researcher tokens stream in
+STREAM_MIN_INTERVAL = float(os.getenv("STREAM_MIN_INTERVAL", "0.05"))
+STREAM_TOOL_PREVIEW_CHARS = int(os.getenv("STREAM_TOOL_PREVIEW_CHARS", "500"))
+
+# Nodes whose model output is shown in the chat as it streams
+ANSWER_NODES = ("researcher", "writer")
+
+# "loop": researcher -> tools -> researcher; "fanout": planner -> parallel searches -> writer
+RESEARCH_MODE = os.getenv("RESEARCH_MODE", "loop")
+FANOUT_SEARCHES = int(os.getenv("FANOUT_SEARCHES", "5"))
+# Parallel branches (and other graph tasks) a fan-out request runs at once
+FANOUT_MAX_CONCURRENCY = int(os.getenv("FANOUT_MAX_CONCURRENCY", "5"))
+FANOUT_RESULT_CHARS = int(os.getenv("FANOUT_RESULT_CHARS", "6000"))
+
+DEFAULT_QUALITY_CRITERIA = "Comprehensive, well-sourced, and academically rigorous research"
+
+def merge_findings(existing: Optional[List[Dict[str, str]]], new: Optional[List[Dict[str, str]]]) -> List[Dict[str, str]]:
+    """Search branches append their findings; None starts a new request with none"""
+    if new is None:
+        return []
+    return (existing or []) + new
+
 class ResearchState(TypedDict):
     messages: Annotated[List[Any], add_messages]
     research_objective: str
@@ -23,95 +58,252 @@ class ResearchState(TypedDict):
     feedback_on_work: Optional[str]
     research_complete: bool
     user_input_needed: bool
+    conversation_summary: Optional[str]
+    summarized_count: int
+    evaluation_rounds: int
+    research_mode: str
+    search_plan: List[Dict[str, str]]
+    findings: Annotated[List[Dict[str, str]], merge_findings]
+    # Earlier research on a similar objective from the research index (warm start)
+    prior_research: Optional[str]
     
 class ResearchEvaluatorOutput(BaseModel):
     feedback: str = Field(description="Detailed feedback on the research quality and completeness")
     research_complete: bool = Field(description="Whether the research meets the specified criteria")
     user_input_needed: bool = Field(description="True if more input/clarification is needed from the user")
 
+class SearchItem(BaseModel):
+    reason: str = Field(description="Why this search is important to the research objective")
+    query: str = Field(description="The search term to use for the web search")
+
+class SearchPlan(BaseModel):
+    searches: List[SearchItem] = Field(description="Web searches to perform to best answer the objective")
+
+PLANNER_INSTRUCTIONS = f"""You are a research planner. Given a research objective, come up with a set of web searches \
+that together cover it. Each search should address a different sub-question. Output at most {FANOUT_SEARCHES} searches.
+If earlier searches and evaluator feedback are given, plan only the searches still needed to address the feedback."""
+
+SEARCH_SUMMARY_INSTRUCTIONS = """You are a research assistant. Given a search term and its web results, produce a concise \
+summary of the results: 2-3 paragraphs, less than 300 words, capturing the main points, figures and dates. Keep the \
+URLs of the sources you use. This will be consumed by someone writing a report, so capture the essence and ignore any fluff."""
+
+WRITER_INSTRUCTIONS = """You are a senior researcher writing a cohesive report for a research objective. You are given \
+summaries of several web searches. First outline the report, then write it in markdown: detailed, well structured, \
+citing the source URLs from the summaries. Address the quality criteria and any evaluator feedback."""
+
+# Byte-identical on every call so the provider can cache it (together with the tool schemas)
+RESEARCHER_SYSTEM_MESSAGE = SystemMessage(content="""You are an expert Research Assistant specialized in conducting thorough, academic-quality research.
+
+The research objective, quality criteria, current date and any evaluator feedback are given in the last message.
+
+RESEARCH METHODOLOGY:
+1. Start with broad searches to understand the topic landscape
+2. Use multiple sources: web search, Wikipedia, direct website analysis
+3. Create comprehensive summaries with proper information
+4. Save all findings to files in the research_outputs directory
+5. Send WhatsApp notifications for major milestones
+
+AVAILABLE TOOLS:
+- research_web_search: For finding current information
+- Wikipedia: For foundational knowledge and references
+- fetch_page: For reading the main content of a web page (prefer this for static pages)
+- Browser tools: For pages that need clicking or other interaction
+- File tools: For saving research outputs, creating reports
+- Python: For data analysis, creating charts
+- WhatsApp notifications: For updating the user on progress
+
+RESPONSE GUIDELINES:
+- If you need clarification, ask specific questions
+- When research is complete, provide a comprehensive summary
+- Create structured outputs (reports, summaries, data files)
+- Send notifications at key milestones
+""")
+
 class ResearchAssistant:
     def __init__(self):
         self.researcher_llm_with_tools = None
         self.evaluator_llm_with_output = None
+        self.planner_llm = None
+        self.search_summarizer_llm = None
+        self.writer_llm = None
         self.tools = None
         self.graph = None
         self.assistant_id = str(uuid.uuid4())
-        self.memory = MemorySaver()
-        self.browser = None
-        self.playwright = None
+        self.memory = get_checkpointer()
+        self.tool_session = None
+        # The process-wide assistant whose graph this session uses (see setup)
+        self.engine = None
+        self.compactor = None
+        self.last_stream_timings = None
+        self.evaluation = TieredEvaluator()
+        self.research_index = get_research_index()
+        # Graph runs of this session's requests, so reset can cancel them
+        self.runs = set()
         
     async def setup(self):
-        """Initialize the research assistant with all necessary tools and models"""
-        self.tools, self.browser, self.playwright = await get_research_tools()
+        """Attach this session to the process-wide research graph, built by the first session.
+
+        The session keeps only its thread id: its conversation lives in the
+        checkpointer and its tools' resources are looked up by that id.
+        """
+        self.attach(await get_research_engine())
+
+    def attach(self, engine: "ResearchAssistant"):
+        self.engine = engine
+        for name in SHARED_ATTRIBUTES:
+            setattr(self, name, getattr(engine, name))
+
+    async def build(self, tools=None):
+        """Create the models and tools and compile a graph for this assistant alone.
+
+        Without `tools` the assistant gets its own per-session tools, as every
+        session did before the graph was shared.
+        """
+        if tools is None:
+            self.tools, self.tool_session = await get_research_tools(self.assistant_id)
+        else:
+            self.tools = tools
         
-        # Researcher LLM - does the actual research work
-        researcher_llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.3)
+        # Researcher LLM - does the actual research work. Every model here runs through
+        # the LLM limiter, which does the retrying, so the SDK's own retries are off.
+        researcher_llm = ChatOpenAI(
+            model="gpt-4o-mini", temperature=0.3, stream_usage=True, cache=get_llm_cache(), max_retries=0,
+            callbacks=[get_usage_callback()], tags=["researcher"]
+        )
         self.researcher_llm_with_tools = researcher_llm.bind_tools(self.tools)
+
+        # Fan-out mode: plan searches, summarize each branch, write the report
+        self.planner_llm = ChatOpenAI(
+            model="gpt-4o-mini", temperature=0.3, cache=get_llm_cache(), max_retries=0,
+            callbacks=[get_usage_callback()], tags=["planner"]
+        ).with_structured_output(SearchPlan)
+        self.search_summarizer_llm = ChatOpenAI(
+            model="gpt-4o-mini", temperature=0.1, stream_usage=True, cache=get_llm_cache(), max_retries=0,
+            callbacks=[get_usage_callback()], tags=["search_worker"]
+        )
+        self.writer_llm = ChatOpenAI(
+            model="gpt-4o-mini", temperature=0.3, stream_usage=True, cache=get_llm_cache(), max_retries=0,
+            callbacks=[get_usage_callback()], tags=["writer"]
+        )
         
         # Evaluator LLM - evaluates research quality
-        evaluator_llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.1)
+        evaluator_llm = ChatOpenAI(
+            model="gpt-4o-mini", temperature=0.1, stream_usage=True, cache=get_llm_cache(), max_retries=0,
+            callbacks=[get_usage_callback()], tags=["evaluator"]
+        )
         self.evaluator_llm_with_output = evaluator_llm.with_structured_output(ResearchEvaluatorOutput)
+
+        # Summarizes older turns once the conversation outgrows its token budget
+        self.compactor = ConversationCompactor(ChatOpenAI(
+            model="gpt-4o-mini", temperature=0, max_retries=0, callbacks=[get_usage_callback()], tags=["compactor"]
+        ))
         
         await self.build_research_graph()
         
-    def researcher_agent(self, state: ResearchState) -> Dict[str, Any]:
+    async def researcher_agent(self, state: ResearchState) -> Dict[str, Any]:
         """Main research agent that conducts research using available tools"""
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        # Static instructions first, then the conversation, then everything that
+        # changes between calls, so the prompt prefix stays cacheable
+        messages = [RESEARCHER_SYSTEM_MESSAGE] + self.conversation_view(state) + [self.research_context(state)]
+            
+        # Get response from researcher, within the process-wide LLM concurrency limit
+        response = await get_llm_limiter().call(lambda: self.researcher_llm_with_tools.ainvoke(messages))
         
-        system_message = f"""You are an expert Research Assistant specialized in conducting thorough, academic-quality research.
+        return {"messages": [response]}
 
-Your current research objective: {state['research_objective']}
-Quality criteria to meet: {state['quality_criteria']}
+    async def compact_conversation(self, state: ResearchState) -> Dict[str, Any]:
+        """Fold older turns into the running summary when over the token budget"""
+        return await self.compactor.compact(
+            state["messages"], state.get("conversation_summary"), state.get("summarized_count") or 0
+        )
 
-Current date and time: {current_time}
+    def conversation_view(self, state: ResearchState) -> List[Any]:
+        """Running summary plus the turns it does not cover yet"""
+        recent = state["messages"][state.get("summarized_count") or 0:]
+        if state.get("conversation_summary"):
+            return [summary_message(state["conversation_summary"])] + recent
+        return recent
 
-RESEARCH METHODOLOGY:
-1. Start with broad searches to understand the topic landscape
-2. Use multiple sources: web search, Wikipedia, direct website analysis
-3. Create comprehensive summaries with proper information
-4. Save all findings to files in the research_outputs directory
-5. Send WhatsApp notifications for major milestones
+    def research_context(self, state: ResearchState) -> SystemMessage:
+        """Per-call context for the researcher; always sent last"""
+        # The date only: a clock to the second would make every call unique to the response cache
+        current_date = datetime.now().strftime("%Y-%m-%d")
+        context = f"""Your current research objective: {state['research_objective']}
+Quality criteria to meet: {state['quality_criteria']}
 
-AVAILABLE TOOLS:
-- research_web_search: For finding current information
-- Wikipedia: For foundational knowledge and references
-- Browser tools: For direct website analysis
-- File tools: For saving research outputs, creating reports
-- Python: For data analysis, creating charts
-- WhatsApp notifications: For updating the user on progress
+Current date: {current_date}"""
 
-RESPONSE GUIDELINES:
-- If you need clarification, ask specific questions
-- When research is complete, provide a comprehensive summary
-- Create structured outputs (reports, summaries, data files)
-- Send notifications at key milestones
-"""
+        if state.get("prior_research"):
+            context += f"\n\n{state['prior_research']}"
 
         if state.get("feedback_on_work"):
-            system_message += f"""
-            
+            context += f"""
+
 PREVIOUS FEEDBACK TO ADDRESS:
 {state['feedback_on_work']}
 
 Please address this feedback and improve your research accordingly."""
 
-        # Update or add system message
-        messages = state["messages"]
-        found_system = False
-        for message in messages:
-            if isinstance(message, SystemMessage):
-                message.content = system_message
-                found_system = True
-                break
-                
-        if not found_system:
-            messages = [SystemMessage(content=system_message)] + messages
-            
-        # Get response from researcher
-        response = self.researcher_llm_with_tools.invoke(messages)
-        
-        return {"messages": [response]}
+        return SystemMessage(content=context)
     
+    def mode_router(self, state: ResearchState) -> str:
+        """Pick the loop or the fan-out graph for this request"""
+        return "fanout" if state.get("research_mode") == "fanout" else "loop"
+
+    async def plan_searches(self, state: ResearchState) -> Dict[str, Any]:
+        """Fan-out planner: split the objective into independent searches"""
+        prompt = f"Research objective: {state['research_objective']}\nQuality criteria: {state['quality_criteria']}"
+        if state.get("findings"):
+            done = "\n".join(f"- {finding['query']}" for finding in state["findings"])
+            prompt += f"\n\nSearches already done:\n{done}"
+        if state.get("prior_research"):
+            prompt += f"\n\n{state['prior_research']}"
+        if state.get("feedback_on_work"):
+            prompt += f"\n\nEvaluator feedback to address:\n{state['feedback_on_work']}"
+        plan = await get_llm_limiter().call(lambda: self.planner_llm.ainvoke([
+            SystemMessage(content=PLANNER_INSTRUCTIONS), HumanMessage(content=prompt)
+        ]))
+        searches = [item.model_dump() for item in plan.searches[:FANOUT_SEARCHES]]
+        print(f"🗺️ Planned {len(searches)} searches: " + "; ".join(item["query"] for item in searches))
+        return {"search_plan": searches}
+
+    def dispatch_searches(self, state: ResearchState):
+        """One parallel search branch per planned search"""
+        searches = state.get("search_plan") or []
+        if not searches:
+            return "writer"
+        return [Send("search_worker", {**item, "objective": state["research_objective"]}) for item in searches]
+
+    async def search_worker(self, task: Dict[str, str]) -> Dict[str, Any]:
+        """Fan-out branch: run one search and summarize its results"""
+        search = next(tool for tool in self.tools if tool.name == "research_web_search")
+        try:
+            results = str(await search.ainvoke({"query": task["query"]}))[:FANOUT_RESULT_CHARS]
+        except Exception as e:
+            results = f"Search failed: {e}"
+        response = await get_llm_limiter().call(lambda: self.search_summarizer_llm.ainvoke([
+            SystemMessage(content=SEARCH_SUMMARY_INSTRUCTIONS),
+            HumanMessage(content=f"Search term: {task['query']}\nReason for searching: {task['reason']}\n\n"
+                                 f"Results:\n{results}"),
+        ]))
+        return {"findings": [{"query": task["query"], "reason": task["reason"], "summary": response.content}]}
+
+    async def write_report(self, state: ResearchState) -> Dict[str, Any]:
+        """Fan-out writer: merge the branch summaries into one report"""
+        findings = "\n\n".join(
+            f"### {finding['query']}\n{finding['summary']}" for finding in state.get("findings") or []
+        )
+        prompt = (f"Research objective: {state['research_objective']}\nQuality criteria: {state['quality_criteria']}"
+                  f"\n\nSearch summaries:\n\n{findings or '(no searches returned results)'}")
+        if state.get("prior_research"):
+            prompt += f"\n\n{state['prior_research']}"
+        if state.get("feedback_on_work"):
+            prompt += f"\n\nEvaluator feedback to address:\n{state['feedback_on_work']}"
+        response = await get_llm_limiter().call(lambda: self.writer_llm.ainvoke([
+            SystemMessage(content=WRITER_INSTRUCTIONS), HumanMessage(content=prompt)
+        ]))
+        return {"messages": [response]}
+
     def research_router(self, state: ResearchState) -> str:
         """Route based on whether the researcher wants to use tools or is done"""
         last_message = state["messages"][-1]
@@ -121,9 +313,11 @@ Please address this feedback and improve your research accordingly."""
         else:
             return "evaluator"
             
-    def format_research_conversation(self, messages: List[Any]) -> str:
+    def format_research_conversation(self, messages: List[Any], summary: Optional[str] = None) -> str:
         """Format the conversation for evaluation"""
         conversation = "Research Session History:\n\n"
+        if summary:
+            conversation += f"Summary of earlier work:\n{summary}\n\n"
         for message in messages:
             if isinstance(message, HumanMessage):
                 conversation += f"User Request: {message.content}\n"
@@ -132,9 +326,22 @@ Please address this feedback and improve your research accordingly."""
                 conversation += f"Research Assistant: {text}\n"
         return conversation
         
-    def research_evaluator(self, state: ResearchState) -> Dict[str, Any]:
-        """Evaluate the quality and completeness of research"""
+    async def research_evaluator(self, state: ResearchState) -> Dict[str, Any]:
+        """Evaluate the quality and completeness of research; clear cases skip the LLM"""
         last_response = state["messages"][-1].content
+        rounds = (state.get("evaluation_rounds") or 0) + 1
+        decision, checks = self.evaluation.decide(
+            state["research_objective"], last_response, state["messages"], rounds,
+            searches=len(state.get("findings") or [])
+        )
+        if decision is not None:
+            return {
+                "messages": [{"role": "assistant", "content": f"{EVALUATION_PREFIX}\n{decision['feedback']}"}],
+                "feedback_on_work": decision["feedback"],
+                "research_complete": decision["research_complete"],
+                "user_input_needed": decision["user_input_needed"],
+                "evaluation_rounds": rounds,
+            }
         
         system_message = """You are a Research Quality Evaluator. Your job is to assess whether research meets academic standards and user requirements.
 
@@ -149,17 +356,23 @@ IMPORTANT: Be generous in your evaluation. If the research shows good effort and
 
 Rate the overall research quality and determine if more work is needed."""
 
+        recent_messages = state["messages"][state.get("summarized_count") or 0:]
+
+        # The conversation only grows between evaluations, so it goes first and
+        # the parts that change (objective, latest output) follow it
         user_message = f"""Evaluate this research session:
 
+FULL CONVERSATION:
+{self.format_research_conversation(recent_messages, state.get('conversation_summary'))}
+
 RESEARCH OBJECTIVE: {state['research_objective']}
 QUALITY CRITERIA: {state['quality_criteria']}
 
-FULL CONVERSATION:
-{self.format_research_conversation(state['messages'])}
-
 LATEST RESEARCH OUTPUT:
 {last_response}
 
+QUICK CHECK RESULTS: {checks['words']} words, {checks['sources']} sources consulted or cited, {checks['files']} files saved
+
 EVALUATION GUIDELINES:
 - If the research provides substantial information on the topic, mark as COMPLETE
 - If files have been saved or multiple sources used, lean towards COMPLETE  
@@ -177,19 +390,22 @@ Provide detailed feedback on research quality, completeness, and whether the obj
             HumanMessage(content=user_message)
         ]
         
-        eval_result = self.evaluator_llm_with_output.invoke(evaluator_messages)
+        eval_result = await get_llm_limiter().call(lambda: self.evaluator_llm_with_output.ainvoke(evaluator_messages))
         
         return {
-            "messages": [{"role": "assistant", "content": f"📊 Research Quality Evaluation:\n{eval_result.feedback}"}],
+            "messages": [{"role": "assistant", "content": f"{EVALUATION_PREFIX}\n{eval_result.feedback}"}],
             "feedback_on_work": eval_result.feedback,
             "research_complete": eval_result.research_complete,
-            "user_input_needed": eval_result.user_input_needed
+            "user_input_needed": eval_result.user_input_needed,
+            "evaluation_rounds": rounds,
         }
         
     def evaluation_router(self, state: ResearchState) -> str:
         """Route based on evaluation results"""
         if state["research_complete"] or state["user_input_needed"]:
             return "END"
+        elif state.get("research_mode") == "fanout":
+            return "planner"
         else:
             return "researcher"
             
@@ -198,9 +414,13 @@ Provide detailed feedback on research quality, completeness, and whether the obj
         graph_builder = StateGraph(ResearchState)
         
         # Add nodes
+        graph_builder.add_node("compactor", self.compact_conversation)
         graph_builder.add_node("researcher", self.researcher_agent)
         graph_builder.add_node("tools", ToolNode(tools=self.tools))
         graph_builder.add_node("evaluator", self.research_evaluator)
+        graph_builder.add_node("planner", self.plan_searches)
+        graph_builder.add_node("search_worker", self.search_worker)
+        graph_builder.add_node("writer", self.write_report)
         
         # Add edges
         graph_builder.add_conditional_edges(
@@ -208,13 +428,19 @@ Provide detailed feedback on research quality, completeness, and whether the obj
             self.research_router, 
             {"tools": "tools", "evaluator": "evaluator"}
         )
-        graph_builder.add_edge("tools", "researcher")
+        graph_builder.add_edge("tools", "compactor")
+        graph_builder.add_edge("compactor", "researcher")
         graph_builder.add_conditional_edges(
             "evaluator", 
             self.evaluation_router, 
-            {"researcher": "researcher", "END": END}
+            {"researcher": "compactor", "planner": "planner", "END": END}
         )
-        graph_builder.add_edge(START, "researcher")
+        graph_builder.add_conditional_edges(START, self.mode_router, {"loop": "compactor", "fanout": "planner"})
+
+        # Fan-out mode: the planner's searches run as parallel branches, then the writer merges them
+        graph_builder.add_conditional_edges("planner", self.dispatch_searches, ["search_worker", "writer"])
+        graph_builder.add_edge("search_worker", "writer")
+        graph_builder.add_edge("writer", "evaluator")
         
         # Compile graph with recursion limit
         self.graph = graph_builder.compile(
@@ -223,25 +449,147 @@ Provide detailed feedback on research quality, completeness, and whether the obj
             # This allows up to 50 steps before stopping
         )
         
-    async def conduct_research(self, research_request, quality_criteria, history):
-        """Main method to conduct research"""
+    def research_config(self, bypass_cache: bool = False, metrics=None, mode: str = "loop",
+                        budget: RequestBudget = None) -> Dict[str, Any]:
         config = {
-            "configurable": {"thread_id": self.assistant_id},
+            # llm_cache_bypass makes the response cache skip lookups for this request
+            "configurable": {"thread_id": self.assistant_id, "llm_cache_bypass": bypass_cache},
             # Set higher recursion limit to prevent infinite loops
             "recursion_limit": 100
         }
-        
-        state = {
+        if mode == "fanout":
+            # caps the parallel search branches
+            config["max_concurrency"] = FANOUT_MAX_CONCURRENCY
+        callbacks = [handler for handler in (metrics, budget) if handler is not None]
+        if callbacks:
+            config["callbacks"] = callbacks
+        return config
+
+    def initial_state(self, research_request, quality_criteria, mode: str = "loop",
+                      prior_research: Optional[str] = None) -> Dict[str, Any]:
+        return {
             "messages": research_request,
             "research_objective": research_request,
-            "quality_criteria": quality_criteria or "Comprehensive, well-sourced, and academically rigorous research",
+            "quality_criteria": quality_criteria or DEFAULT_QUALITY_CRITERIA,
             "feedback_on_work": None,
             "research_complete": False,
-            "user_input_needed": False
+            "user_input_needed": False,
+            "evaluation_rounds": 0,
+            "research_mode": mode,
+            "search_plan": [],
+            "findings": None,
+            "prior_research": prior_research,
         }
+
+    def start_run(self, work, budget: RequestBudget) -> asyncio.Task:
+        """Run one request's graph as a task that cancel() can stop, within the budget's deadline"""
+        async def bounded():
+            timeout = asyncio.timeout(budget.seconds or None)
+            try:
+                async with timeout:
+                    return await work()
+            except TimeoutError:
+                if timeout.expired():
+                    raise budget.deadline_exceeded() from None
+                raise
+
+        task = asyncio.create_task(bounded())
+        self.runs.add(task)
+        task.add_done_callback(self.runs.discard)
+        return task
+
+    async def settle_stopped_request(self, error: BudgetExceeded) -> str:
+        """Close a request stopped by its budget in the checkpoint; returns the reply with its partial result"""
+        config = self.research_config()
+        values = (await self.graph.aget_state(config)).values
+        recent = request_messages(values.get("messages") or [])
+        reply = stopped_message(error, partial_result(recent, values.get("findings")))
+        # Tool calls left without results would make the next model call fail
+        answered = {message.tool_call_id for message in recent if isinstance(message, ToolMessage)}
+        closing = [
+            ToolMessage(content=f"Not run: research stopped because {error}.", tool_call_id=call["id"], name=call["name"])
+            for message in recent if isinstance(message, AIMessage)
+            for call in message.tool_calls or [] if call["id"] not in answered
+        ]
+        await self.graph.aupdate_state(config, {
+            "messages": closing + [AIMessage(content=reply)],
+            "research_complete": True,
+            "user_input_needed": False,
+        }, as_node="evaluator")
+        print(f"⏹️ Research stopped: {error}")
+        return reply
+
+    async def cancel(self) -> int:
+        """Cancel this session's running requests, with their LLM calls and tools"""
+        runs = list(self.runs)
+        for task in runs:
+            task.cancel()
+        if runs:
+            await asyncio.gather(*runs, return_exceptions=True)
+            print(f"🛑 Cancelled {len(runs)} running research request(s)")
+        return len(runs)
+
+    async def recall(self, research_request, quality_criteria, bypass_cache: bool = False):
+        """Earlier research on a similar objective from the research index, if any"""
+        if self.research_index is None or bypass_cache:
+            return None
+        try:
+            return await self.research_index.lookup(research_request, quality_criteria or DEFAULT_QUALITY_CRITERIA)
+        except Exception as e:
+            print(f"⚠️ Research index lookup failed: {e}")
+            return None
+
+    async def answer_from_index(self, research_request, match) -> List[Dict[str, str]]:
+        """Answer with earlier research; the turn still goes into this session's history"""
+        await self.graph.aupdate_state(self.research_config(), {
+            "messages": [HumanMessage(content=research_request), AIMessage(content=match["answer"])],
+            "research_objective": research_request,
+            "research_complete": True,
+            "user_input_needed": False,
+        }, as_node="evaluator")
+        return [{"role": "assistant", "content": match["answer"]},
+                {"role": "assistant", "content": answered_from_index(match)}]
+
+    async def remember(self, research_request, quality_criteria, values: Dict[str, Any], seconds: float):
+        """Add a completed request to the research index"""
+        if self.research_index is None or not values.get("research_complete") or values.get("user_input_needed"):
+            return
+        research = completed_research(values.get("messages") or [])
+        if research is None:
+            return
+        try:
+            await self.research_index.store(research_request, quality_criteria or DEFAULT_QUALITY_CRITERIA,
+                                            research, seconds)
+        except Exception as e:
+            print(f"⚠️ Could not add research to the index: {e}")
+
+    def error_message(self, e: Exception) -> Dict[str, str]:
+        # Handle recursion or other errors gracefully
+        if "recursion" in str(e).lower():
+            return {"role": "assistant", "content": f"⚠️ Research process took too many iterations and was stopped for safety. This usually means the evaluator is being too strict. Here's what we found so far:\n\nLast research attempt covered the topic but may need refinement. Try using simpler quality criteria or a more focused research question."}
+        return {"role": "assistant", "content": f"⚠️ Research error: {str(e)}"}
+
+    async def conduct_research(self, research_request, quality_criteria, history, bypass_cache: bool = False,
+                               mode: str = RESEARCH_MODE):
+        """Main method to conduct research; mode is loop or fanout"""
+        started = time.perf_counter()
+        match = await self.recall(research_request, quality_criteria, bypass_cache)
+        if match and match["kind"] == "answer":
+            return history + [{"role": "user", "content": research_request}] + \
+                await self.answer_from_index(research_request, match)
+
+        metrics = start_request_metrics(self.assistant_id, research_request)
+        budget = RequestBudget()
+        config = self.research_config(bypass_cache, metrics, mode, budget)
+        state = self.initial_state(research_request, quality_criteria, mode,
+                                   warm_start_context(match) if match else None)
+        user_msg = {"role": "user", "content": research_request}
         
         try:
-            result = await self.graph.ainvoke(state, config=config)
+            result = await self.start_run(lambda: self.graph.ainvoke(state, config=config), budget)
+            if metrics:
+                metrics.finish()
+            await self.remember(research_request, quality_criteria, result, time.perf_counter() - started)
             
             # Format response for gradio
             user_msg = {"role": "user", "content": research_request}
@@ -249,25 +597,217 @@ Provide detailed feedback on research quality, completeness, and whether the obj
             evaluation = {"role": "assistant", "content": result["messages"][-1].content}
             
             return history + [user_msg, research_output, evaluation]
+        except BudgetExceeded as e:
+            if metrics:
+                metrics.finish(e)
+            return history + [user_msg, {"role": "assistant", "content": await self.settle_stopped_request(e)}]
+        except asyncio.CancelledError as e:
+            if metrics:
+                metrics.finish(e)
+            if asyncio.current_task().cancelling():
+                raise
+            # the session cancelled the run (reset), not our caller
+            return history + [user_msg, {"role": "assistant", "content": "🛑 Research cancelled."}]
         except Exception as e:
-            # Handle recursion or other errors gracefully
-            if "recursion" in str(e).lower():
-                error_msg = {"role": "assistant", "content": f"⚠️ Research process took too many iterations and was stopped for safety. This usually means the evaluator is being too strict. Here's what we found so far:\n\nLast research attempt covered the topic but may need refinement. Try using simpler quality criteria or a more focused research question."}
-            else:
-                error_msg = {"role": "assistant", "content": f"⚠️ Research error: {str(e)}"}
-            
+            if metrics:
+                metrics.finish(e)
             user_msg = {"role": "user", "content": research_request}
-            return history + [user_msg, error_msg]
+            return history + [user_msg, self.error_message(e)]
+
+    async def stream_research(self, research_request, quality_criteria, history, bypass_cache: bool = False,
+                              mode: str = RESEARCH_MODE):
+        """Conduct research, yielding the chat history as researcher tokens, tool calls and evaluations arrive"""
+        started = time.perf_counter()
+        timings = {"first_output": None, "first_token": None, "total": None}
+        self.last_stream_timings = timings
+
+        messages = history + [{"role": "user", "content": research_request}]
+        status = {"role": "assistant", "content": "",
+                  "metadata": {"title": "🔎 Researching...", "status": "pending"}}
+        messages.append(status)
+        # Something visible before the graph even starts
+        timings["first_output"] = time.perf_counter() - started
+        yield messages
+
+        match = await self.recall(research_request, quality_criteria, bypass_cache)
+        if match and match["kind"] == "answer":
+            messages += await self.answer_from_index(research_request, match)
+            timings["first_token"] = timings["total"] = time.perf_counter() - started
+            status["metadata"].update(title="♻️ Answered from earlier research", status="done",
+                                      duration=round(timings["total"], 1))
+            yield messages
+            return
+        if match:
+            messages.append({"role": "assistant", "content": match["objective"],
+                             "metadata": {"title": f"🗂️ Building on earlier research "
+                                                   f"(similarity {match['similarity']:.2f})", "status": "done"}})
+
+        tool_messages = {}
+        answer = None
+        last_yield = 0.0
+        metrics = start_request_metrics(self.assistant_id, research_request)
+        budget = RequestBudget()
+        config = self.research_config(bypass_cache, metrics, mode, budget)
+        state = self.initial_state(research_request, quality_criteria, mode,
+                                   warm_start_context(match) if match else None)
+
+        # The graph runs in its own task (see start_run); events reach this generator through a queue
+        events = asyncio.Queue()
+
+        async def pump():
+            async for event in self.graph.astream_events(state, config=config, version="v2"):
+                events.put_nowait(event)
+
+        run = self.start_run(pump, budget)
+        run.add_done_callback(lambda _: events.put_nowait(None))
+        error = None
+        try:
+            while (event := await events.get()) is not None:
+                kind = event["event"]
+                node = event.get("metadata", {}).get("langgraph_node")
+
+                if kind == "on_chat_model_start" and node in ANSWER_NODES:
+                    # each researcher step gets its own chat bubble
+                    answer = None
+                    continue
+                elif kind == "on_chat_model_stream" and node in ANSWER_NODES:
+                    text = event["data"]["chunk"].content
+                    if not text:
+                        continue
+                    if answer is None:
+                        answer = {"role": "assistant", "content": ""}
+                        messages.append(answer)
+                    if timings["first_token"] is None:
+                        timings["first_token"] = time.perf_counter() - started
+                    answer["content"] += text
+                    # Gradio re-renders the chat on every yield; batch tokens a little
+                    if time.perf_counter() - last_yield < STREAM_MIN_INTERVAL:
+                        continue
+                elif kind == "on_chat_model_end" and node in ANSWER_NODES:
+                    # cached responses arrive whole, without stream events
+                    output = event["data"].get("output")
+                    if answer is not None or not getattr(output, "content", None):
+                        continue
+                    answer = {"role": "assistant", "content": output.content}
+                    messages.append(answer)
+                    if timings["first_token"] is None:
+                        timings["first_token"] = time.perf_counter() - started
+                elif kind == "on_tool_start":
+                    arguments = event["data"].get("input") or {}
+                    tool_message = {"role": "assistant", "content": "",
+                                    "metadata": {"title": f"🔧 {event['name']}", "status": "pending",
+                                                 "log": str(arguments)[:200]}}
+                    tool_messages[event["run_id"]] = (tool_message, time.perf_counter())
+                    messages.append(tool_message)
+                    answer = None
+                elif kind in ("on_tool_end", "on_tool_error"):
+                    tool_message, tool_started = tool_messages.pop(event["run_id"], (None, None))
+                    if tool_message is None:
+                        continue
+                    output = event["data"].get("output") if kind == "on_tool_end" else event["data"].get("error")
+                    output = getattr(output, "content", output)
+                    tool_message["content"] = str(output)[:STREAM_TOOL_PREVIEW_CHARS]
+                    tool_message["metadata"].update(status="done", duration=round(time.perf_counter() - tool_started, 2))
+                    if kind == "on_tool_error":
+                        tool_message["metadata"]["title"] = f"⚠️ {event['name']} failed"
+                elif kind == "on_chain_end" and event["name"] == "evaluator" and node == "evaluator":
+                    output = event["data"].get("output") or {}
+                    for message in output.get("messages", []):
+                        content = message["content"] if isinstance(message, dict) else message.content
+                        messages.append({"role": "assistant", "content": content})
+                    answer = None
+                else:
+                    continue
+                last_yield = time.perf_counter()
+                yield messages
+            await run
+        except BudgetExceeded as e:
+            error = e
+            messages.append({"role": "assistant", "content": await self.settle_stopped_request(e)})
+        except asyncio.CancelledError as e:
+            error = e
+            if asyncio.current_task().cancelling():
+                raise
+            # the session cancelled the run (reset), not our caller
+            messages.append({"role": "assistant", "content": "🛑 Research cancelled."})
+        except Exception as e:
+            error = e
+            messages.append(self.error_message(e))
+        finally:
+            # Also reached when the client goes away and the generator is closed or cancelled
+            if not run.done():
+                run.cancel()
+                error = error or asyncio.CancelledError()
+            if metrics:
+                metrics.finish(error)
+        if error is None:
+            snapshot = await self.graph.aget_state(config)
+            await self.remember(research_request, quality_criteria, snapshot.values, time.perf_counter() - started)
+
+        timings["total"] = time.perf_counter() - started
+        status["metadata"].update(title="🔎 Research finished", status="done", duration=round(timings["total"], 1))
+        first_token = f"{timings['first_token']:.2f}s" if timings["first_token"] is not None else "n/a"
+        print(f"⏱️ First output {timings['first_output'] * 1000:.0f} ms, first token {first_token}, "
+              f"total {timings['total']:.1f}s")
+        yield messages
         
+    async def aclose(self):
+        """Cancel running requests, return this session's browser context to the shared pool and drop its checkpoints"""
+        await self.cancel()
+        if self.tool_session:
+            await release_research_tools(self.tool_session)
+        elif self.engine is not None:
+            await release_shared_research_tools(self.assistant_id)
+        await self.memory.adelete_thread(self.assistant_id)
+
+    async def drop_thread(self, runs):
+        """Delete this session's checkpoints once its cancelled runs have stopped writing them"""
+        await asyncio.gather(*runs, return_exceptions=True)
+        await self.memory.adelete_thread(self.assistant_id)
+
     def cleanup(self):
-        """Clean up browser resources"""
-        if self.browser:
+        """Cancel running requests and clean up browser resources from sync callbacks running on the event loop"""
+        runs = list(self.runs)
+        for task in runs:
+            task.cancel()
+        # The checkpointer is shared, so a closed tab's thread would otherwise stay in it
+        try:
+            task = asyncio.get_running_loop().create_task(self.drop_thread(runs))
+            _pending_thread_deletes.add(task)
+            task.add_done_callback(_pending_thread_deletes.discard)
+        except RuntimeError:
+            print("No running event loop; this session's checkpoints were not deleted")
+        if self.tool_session or self.engine is not None:
+            # The pool tracks the pending close so shutdown can wait for it
             try:
-                loop = asyncio.get_running_loop()
-                loop.create_task(self.browser.close())
-                if self.playwright:
-                    loop.create_task(self.playwright.stop())
+                if self.tool_session:
+                    release_research_tools_nowait(self.tool_session)
+                else:
+                    release_shared_research_tools_nowait(self.assistant_id)
             except RuntimeError:
-                asyncio.run(self.browser.close())
-                if self.playwright:
-                    asyncio.run(self.playwright.stop())
\ No newline at end of file
+                print("No running event loop; browser context will be closed with the pool")
+
+
+# What a session takes from the process-wide assistant; everything else is per session
+SHARED_ATTRIBUTES = ("researcher_llm_with_tools", "evaluator_llm_with_output", "planner_llm", "search_summarizer_llm",
+                     "writer_llm", "tools", "compactor", "evaluation", "graph")
+
+_research_engine = None
+_research_engine_lock = None
+# Strong references to checkpoint deletions scheduled by cleanup()
+_pending_thread_deletes = set()
+
+
+async def get_research_engine() -> ResearchAssistant:
+    """The process-wide assistant: LLM clients, shared tools and the compiled graph, built once"""
+    global _research_engine, _research_engine_lock
+    if _research_engine is None:
+        if _research_engine_lock is None:
+            _research_engine_lock = asyncio.Lock()
+        async with _research_engine_lock:
+            if _research_engine is None:
+                engine = ResearchAssistant()
+                await engine.build(get_shared_research_tools())
+                _research_engine = engine
+                print("🧩 Research graph compiled; sessions share it")
+    return _research_engine
@@ -0,0 +1,83 @@
+"""Per-request wall-clock and token budgets for research requests.
+
+recursion_limit only caps graph steps, and one step can wait minutes on a
+slow model, a browser navigation or a Python cell. Each request now gets a
+RequestBudget:
+- RESEARCH_DEADLINE seconds of wall-clock time. The graph runs under
+  asyncio.timeout, so when it expires the in-flight LLM calls and tools are
+  cancelled.
+- RESEARCH_TOKEN_BUDGET model tokens (input plus output, response cache hits
+  excluded). Once they are spent, the next model call raises BudgetExceeded
+  before it goes out.
+Either one stops the graph with BudgetExceeded. The assistant then answers
+with the best partial result (see partial_result) instead of an error.
+Set either to 0 to disable it.
+"""
+import os
+import time
+from typing import Any, Dict, List, Optional
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage
+from research_evaluation import EVALUATION_PREFIX
+
+RESEARCH_DEADLINE = float(os.getenv("RESEARCH_DEADLINE", "600"))
+RESEARCH_TOKEN_BUDGET = int(os.getenv("RESEARCH_TOKEN_BUDGET", "300000"))
+
+
+class BudgetExceeded(Exception):
+    """A request ran out of time or tokens; `status` is "deadline" or "token_budget\""""
+
+    def __init__(self, status: str, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class RequestBudget(BaseCallbackHandler):
+    """Counts one request's model tokens and refuses model calls once they are spent"""
+
+    # Called on the event loop, and its exception must reach the graph
+    run_inline = True
+    raise_error = True
+
+    def __init__(self, seconds: float = RESEARCH_DEADLINE, tokens: int = RESEARCH_TOKEN_BUDGET):
+        self.seconds = seconds
+        self.tokens = tokens
+        self.tokens_used = 0
+        self.started = time.monotonic()
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        if self.tokens and self.tokens_used >= self.tokens:
+            raise BudgetExceeded("token_budget", f"the token budget of {self.tokens} tokens was used up")
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                if message is None or message.response_metadata.get("llm_cache") == "hit":
+                    continue
+                usage = getattr(message, "usage_metadata", None) or {}
+                self.tokens_used += usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+
+    def deadline_exceeded(self) -> BudgetExceeded:
+        return BudgetExceeded("deadline", f"the {self.seconds:g}s time limit was reached")
+
+    def stats(self) -> dict:
+        return {"seconds": round(time.monotonic() - self.started, 1), "seconds_budget": self.seconds,
+                "tokens_used": self.tokens_used, "tokens_budget": self.tokens}
+
+
+def partial_result(messages: List[Any], findings: Optional[List[Dict[str, str]]] = None) -> Optional[str]:
+    """The most useful output a stopped request produced: the latest answer text, else the search summaries"""
+    for message in reversed(messages):
+        if isinstance(message, AIMessage) and str(message.content).strip() \
+                and not str(message.content).startswith(EVALUATION_PREFIX):
+            return str(message.content)
+    if findings:
+        return "\n\n".join(f"### {finding['query']}\n{finding['summary']}" for finding in findings)
+    return None
+
+
+def stopped_message(error: BudgetExceeded, partial: Optional[str]) -> str:
+    if partial:
+        return f"⏹️ Research stopped because {error}. Here is the best result so far:\n\n{partial}"
+    return f"⏹️ Research stopped because {error}, before any result was ready. Try a narrower question."
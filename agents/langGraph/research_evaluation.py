@@ -0,0 +1,195 @@
+"""Tiered evaluation of researcher output.
+
+Every finished researcher turn used to go through the structured LLM
+evaluator, and a rejection sent the researcher round again. Most outputs are
+clearly good or clearly not an answer, and cheap local checks can tell those
+apart:
+- length of the answer in words
+- distinct sources: hosts of URLs cited in the answer, plus the searches,
+  Wikipedia lookups and pages read since the request (or, in fan-out mode,
+  the parallel searches the report was written from)
+- files saved to research_outputs/ during the request
+- overlap between the objective's keywords and the answer
+
+Clear passes and clear failures are decided locally; only borderline outputs
+go to the LLM. Keyword overlap is compared on light stems ("schools" and
+"school", "analysed" and "analysis" match) and only ever helps an answer
+pass: a low overlap goes to the LLM, since wording and non-English
+objectives defeat a keyword count. After EVALUATOR_MAX_ROUNDS evaluations of one request the
+output is accepted as it is, so a strict evaluator cannot loop forever.
+Set EVALUATOR_MODE=llm to send every output to the LLM evaluator.
+"""
+import os
+import re
+from urllib.parse import urlparse
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+# Start of the evaluator's chat message; marks evaluations in the conversation
+EVALUATION_PREFIX = "📊 Research Quality Evaluation:"
+
+EVALUATOR_MODE = os.getenv("EVALUATOR_MODE", "tiered").lower()
+EVALUATOR_MAX_ROUNDS = int(os.getenv("EVALUATOR_MAX_ROUNDS", "3"))
+# An answer at least this long that covers the objective and has sources passes without the LLM
+EVALUATOR_PASS_WORDS = int(os.getenv("EVALUATOR_PASS_WORDS", "250"))
+EVALUATOR_PASS_SOURCES = int(os.getenv("EVALUATOR_PASS_SOURCES", "2"))
+EVALUATOR_PASS_OVERLAP = float(os.getenv("EVALUATOR_PASS_OVERLAP", "0.6"))
+# Shorter than this the answer fails without the LLM
+EVALUATOR_FAIL_WORDS = int(os.getenv("EVALUATOR_FAIL_WORDS", "60"))
+
+OUTPUT_DIR = "research_outputs"
+SOURCE_TOOLS = {"research_web_search", "wikipedia", "fetch_page", "navigate_browser"}
+FILE_TOOLS = {"write_file", "copy_file", "move_file"}
+
+_URL = re.compile(r"https?://[^\s)\]>\"']+")
+_WORD = re.compile(r"[^\W_][\w\-]+")
+_PNG = re.compile(r"[\w\-. ]+\.png")
+STOPWORDS = set("""a about above after again all also an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have having
+her here hers him his how i if in into is it its itself just me more most my no nor not now of off on once
+only or other our out over own please research same she should so some such than that the their them then
+there these they this those through to too under until up very was we were what when where which while who
+whom why will with would you your find give tell show make latest current recent""".split())
+
+
+# (suffix, replacement), longest first; enough to match inflections, not a full stemmer
+_SUFFIXES = [("ysis", "ys"), ("yses", "ys"), ("ysed", "ys"), ("yzed", "ys"), ("yse", "ys"), ("yze", "ys"),
+             ("ational", ""), ("ations", ""), ("ation", ""), ("ating", ""), ("ated", ""), ("ates", ""),
+             ("ate", ""), ("ings", ""), ("ing", ""), ("ies", "y"), ("ied", "y"), ("ed", ""), ("es", ""),
+             ("s", ""), ("e", "")]
+
+
+def stem(word: str) -> str:
+    for suffix, replacement in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3 and not (suffix == "s" and word.endswith("ss")):
+            return word[: -len(suffix)] + replacement
+    return word
+
+
+def keywords(text: str) -> set:
+    return {stem(w) for w in _WORD.findall(text.lower()) if w not in STOPWORDS and len(w) > 2}
+
+
+def request_messages(messages):
+    """Messages since the latest user request"""
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return messages[i:]
+    return messages
+
+
+def saved_files(messages) -> set:
+    """Files under research_outputs/ that this request's tool calls wrote"""
+    files = set()
+    for message in messages:
+        if isinstance(message, AIMessage):
+            for call in message.tool_calls or []:
+                if call["name"] in FILE_TOOLS:
+                    path = call["args"].get("file_path") or call["args"].get("destination_path")
+                    if path:
+                        files.add(os.path.basename(path))
+        elif isinstance(message, ToolMessage) and message.name == "Python_REPL":
+            # the Python tool reports the charts it saved by name
+            files.update(name.strip() for name in _PNG.findall(str(message.content)))
+    return {name for name in files if os.path.exists(os.path.join(OUTPUT_DIR, name))}
+
+
+def local_checks(objective: str, answer: str, messages, searches: int = 0) -> dict:
+    """Cheap signals about one researcher answer"""
+    recent = request_messages(messages)
+    cited = {urlparse(url).netloc.lower() for url in _URL.findall(answer)}
+    consulted = set()
+    for message in recent:
+        if isinstance(message, AIMessage):
+            for call in message.tool_calls or []:
+                if call["name"] in SOURCE_TOOLS:
+                    consulted.add((call["name"], str(sorted(call["args"].items()))))
+    wanted = keywords(objective)
+    overlap = len(wanted & keywords(answer)) / len(wanted) if wanted else 1.0
+    return {
+        "words": len(answer.split()),
+        "sources": len(cited) + len(consulted) + searches,
+        "files": len(saved_files(recent)),
+        "overlap": round(overlap, 2),
+        "question": answer.rstrip().endswith("?"),
+    }
+
+
+def verdict(checks: dict) -> str:
+    """"pass", "fail" or "borderline" for the LLM to decide"""
+    if checks["question"]:
+        # the researcher may be asking the user something; let the LLM judge
+        return "borderline"
+    if checks["words"] < EVALUATOR_FAIL_WORDS:
+        return "fail"
+    if (checks["words"] >= EVALUATOR_PASS_WORDS and checks["overlap"] >= EVALUATOR_PASS_OVERLAP
+            and (checks["sources"] >= EVALUATOR_PASS_SOURCES or checks["files"])):
+        return "pass"
+    return "borderline"
+
+
+def describe(checks: dict) -> str:
+    return (f"{checks['words']} words, {checks['sources']} sources, {checks['files']} files saved, "
+            f"{checks['overlap']:.0%} of the objective's key terms covered")
+
+
+def fail_feedback(checks: dict) -> str:
+    """Why verdict() failed the answer; only the checks that fail it are named"""
+    problems = []
+    if checks["words"] < EVALUATOR_FAIL_WORDS:
+        problems.append("the answer is too short to be a research summary")
+    return "Quick check failed: " + "; ".join(problems) + f" ({describe(checks)}). " \
+        "Research the objective further and give a complete summary with sources."
+
+
+class TieredEvaluator:
+    """Decides clear cases locally and counts how many LLM evaluations that saved"""
+
+    def __init__(self, mode: str = EVALUATOR_MODE, max_rounds: int = EVALUATOR_MAX_ROUNDS):
+        self.mode = mode
+        self.max_rounds = max_rounds
+        self.evaluations = 0
+        self.local_passes = 0
+        self.local_fails = 0
+        self.round_cap_accepts = 0
+        self.llm_calls = 0
+
+    def decide(self, objective: str, answer: str, messages, rounds: int, searches: int = 0):
+        """Returns (decision, checks); decision is None when the LLM should evaluate.
+
+        `rounds` counts evaluations of this request so far, including this one;
+        `searches` counts fan-out search branches behind the answer.
+        """
+        self.evaluations += 1
+        checks = local_checks(objective, answer, messages, searches)
+        decision = None
+        if self.mode == "tiered":
+            result = verdict(checks)
+            if result == "pass":
+                self.local_passes += 1
+                decision = {"feedback": f"Quick check passed: {describe(checks)}.",
+                            "research_complete": True, "user_input_needed": False}
+            elif result == "fail" and rounds < self.max_rounds:
+                self.local_fails += 1
+                decision = {"feedback": fail_feedback(checks), "research_complete": False,
+                            "user_input_needed": False}
+        if decision is None and rounds >= self.max_rounds and self.max_rounds:
+            # Out of rounds: accept what we have instead of evaluating again
+            self.round_cap_accepts += 1
+            decision = {"feedback": f"Accepted after {rounds} evaluation rounds ({describe(checks)}).",
+                        "research_complete": True, "user_input_needed": False}
+        if decision is None:
+            self.llm_calls += 1
+        print(f"🧪 Evaluation round {rounds}: {describe(checks)} -> "
+              + ("LLM evaluator" if decision is None else "decided locally")
+              + f" ({self.evaluations - self.llm_calls} of {self.evaluations} LLM calls avoided)")
+        return decision, checks
+
+    def stats(self) -> dict:
+        return {
+            "evaluations": self.evaluations,
+            "llm_calls": self.llm_calls,
+            "llm_calls_avoided": self.evaluations - self.llm_calls,
+            "local_passes": self.local_passes,
+            "local_fails": self.local_fails,
+            "round_cap_accepts": self.round_cap_accepts,
+        }
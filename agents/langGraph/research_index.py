@@ -0,0 +1,316 @@
+"""Semantic index of completed research.
+
+Users often ask near-duplicate questions ("AI impact on education" vs "AI in
+schools"), and each one used to rerun the whole researcher/evaluator loop.
+Every completed request is stored with an embedding of its objective plus
+quality criteria, along with:
+- the final output and the evaluator's verdict
+- the sources it used (cited URLs and search queries)
+- the files it saved to research_outputs/
+
+A new request is embedded and compared (cosine similarity) with the index:
+- at or above RESEARCH_INDEX_ANSWER_SIMILARITY, and younger than
+  RESEARCH_INDEX_ANSWER_TTL, it is answered from the index without running
+  the graph
+- at or above RESEARCH_INDEX_WARM_SIMILARITY, and younger than
+  RESEARCH_INDEX_WARM_TTL, the earlier research is handed to the researcher
+  (or the fan-out planner and writer) as a starting point
+- otherwise the request runs as usual
+
+Enable with RESEARCH_INDEX=1; numpy is only imported once the index is in
+use. "Fresh answers" (bypass_cache) skips the lookup but still stores the
+new result, which replaces any entry with the same objective and criteria.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from langchain_core.messages import AIMessage
+from research_evaluation import EVALUATION_PREFIX, SOURCE_TOOLS, request_messages, saved_files
+
+RESEARCH_INDEX_ENABLED = os.getenv("RESEARCH_INDEX", "0") == "1"
+RESEARCH_INDEX_PATH = os.path.expanduser(os.getenv("RESEARCH_INDEX_PATH", "~/.cache/agents/research_index.sqlite3"))
+RESEARCH_INDEX_MODEL = os.getenv("RESEARCH_INDEX_MODEL", "text-embedding-3-small")
+RESEARCH_INDEX_ANSWER_SIMILARITY = float(os.getenv("RESEARCH_INDEX_ANSWER_SIMILARITY", "0.92"))
+RESEARCH_INDEX_WARM_SIMILARITY = float(os.getenv("RESEARCH_INDEX_WARM_SIMILARITY", "0.80"))
+RESEARCH_INDEX_ANSWER_TTL = int(os.getenv("RESEARCH_INDEX_ANSWER_TTL", str(7 * 24 * 3600)))
+RESEARCH_INDEX_WARM_TTL = int(os.getenv("RESEARCH_INDEX_WARM_TTL", str(90 * 24 * 3600)))
+RESEARCH_INDEX_MAX_ENTRIES = int(os.getenv("RESEARCH_INDEX_MAX_ENTRIES", "2000"))
+# How much of an earlier answer a warm start puts in front of the researcher
+RESEARCH_INDEX_WARM_CHARS = int(os.getenv("RESEARCH_INDEX_WARM_CHARS", "4000"))
+
+_URL = re.compile(r"https?://[^\s)\]>\"']+")
+
+
+def index_text(objective: str, criteria: str) -> str:
+    """What gets embedded: the objective, then the criteria it had to meet"""
+    return f"{' '.join(objective.split())}\nQuality criteria: {' '.join((criteria or '').split())}"
+
+
+def request_key(objective: str, criteria: str) -> str:
+    """Identifies reruns of the same request; indexed, so store() finds the entry it replaces"""
+    return hashlib.sha256(index_text(objective, criteria).encode("utf-8")).hexdigest()
+
+
+def completed_research(messages) -> Optional[Dict[str, Any]]:
+    """Final output, verdict, sources and saved files of the latest request, from its messages"""
+    recent = request_messages(messages)
+    verdict = None
+    answer = None
+    for message in reversed(recent):
+        if not isinstance(message, AIMessage) or message.tool_calls:
+            continue
+        content = str(message.content)
+        if content.startswith(EVALUATION_PREFIX):
+            verdict = verdict or content[len(EVALUATION_PREFIX):].strip()
+        elif content.strip():
+            answer = content
+            break
+    if answer is None:
+        return None
+    sources = list(dict.fromkeys(_URL.findall(answer)))
+    for message in recent:
+        if isinstance(message, AIMessage):
+            for call in message.tool_calls or []:
+                if call["name"] in SOURCE_TOOLS:
+                    query = call["args"].get("query") or call["args"].get("url")
+                    if query:
+                        sources.append(f"{call['name']}: {query}")
+    return {"answer": answer, "verdict": verdict or "", "sources": list(dict.fromkeys(sources)),
+            "files": sorted(saved_files(recent))}
+
+
+class ResearchIndex:
+    """SQLite-backed store of completed research, looked up by embedding similarity"""
+
+    def __init__(self, path: str = RESEARCH_INDEX_PATH, embeddings=None,
+                 answer_similarity: float = RESEARCH_INDEX_ANSWER_SIMILARITY,
+                 warm_similarity: float = RESEARCH_INDEX_WARM_SIMILARITY,
+                 answer_ttl: int = RESEARCH_INDEX_ANSWER_TTL, warm_ttl: int = RESEARCH_INDEX_WARM_TTL,
+                 max_entries: int = RESEARCH_INDEX_MAX_ENTRIES):
+        if embeddings is None:
+            from langchain_openai import OpenAIEmbeddings
+            embeddings = OpenAIEmbeddings(model=RESEARCH_INDEX_MODEL)
+        self.embeddings = embeddings
+        self.path = path
+        self.answer_similarity = answer_similarity
+        self.warm_similarity = warm_similarity
+        self.answer_ttl = answer_ttl
+        self.warm_ttl = warm_ttl
+        self.max_entries = max_entries
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS research_index (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                objective TEXT NOT NULL,
+                criteria TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                answer TEXT NOT NULL,
+                verdict TEXT NOT NULL,
+                sources TEXT NOT NULL,
+                files TEXT NOT NULL,
+                seconds REAL NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                request_key TEXT
+            )"""
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(research_index)")}
+        if "request_key" not in columns:
+            # Index written before entries had a request key: add and backfill it once
+            self._conn.execute("ALTER TABLE research_index ADD COLUMN request_key TEXT")
+            rows = self._conn.execute("SELECT id, objective, criteria FROM research_index").fetchall()
+            self._conn.executemany("UPDATE research_index SET request_key = ? WHERE id = ?",
+                                   [(request_key(objective, criteria), row_id) for row_id, objective, criteria in rows])
+        self._conn.execute("CREATE INDEX IF NOT EXISTS research_index_request_key ON research_index(request_key)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS research_index_created_at ON research_index(created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS research_index_last_access ON research_index(last_access)")
+        self._lock = threading.Lock()
+        # Unit-length embeddings, one row per entry, so a lookup is one matrix product
+        self._ids = []
+        self._vectors = None
+        self._load()
+        # Recent embeddings by text: the lookup's embedding is reused when the request is stored
+        self._embedded = OrderedDict()
+        self.lookups = 0
+        self.answered = 0
+        self.warm_starts = 0
+        self.misses = 0
+        self.stored = 0
+        self.seconds_saved = 0.0
+
+    def _load(self):
+        import numpy as np
+        rows = self._conn.execute("SELECT id, embedding FROM research_index ORDER BY id").fetchall()
+        self._ids = [row[0] for row in rows]
+        self._vectors = np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows]) if rows else None
+
+    async def embed(self, text: str):
+        """Unit-length float32 numpy vector for text"""
+        vector = self._embedded.get(text)
+        if vector is None:
+            import numpy as np
+            vector = np.asarray(await self.embeddings.aembed_query(text), dtype=np.float32)
+            vector /= np.linalg.norm(vector) or 1.0
+            self._embedded[text] = vector
+            if len(self._embedded) > 256:
+                self._embedded.popitem(last=False)
+        return vector
+
+    async def lookup(self, objective: str, criteria: str) -> Optional[Dict[str, Any]]:
+        """The closest fresh enough entry, with kind "answer" or "warm"; None on a miss"""
+        started = time.perf_counter()
+        self.lookups += 1
+        vector = await self.embed(index_text(objective, criteria))
+        # The matrix product and SQLite reads run off the event loop
+        match = await asyncio.to_thread(self._match, vector)
+        if match is None:
+            self.misses += 1
+        elif match["kind"] == "answer":
+            self.answered += 1
+            self.seconds_saved += max(0.0, match["seconds"] - (time.perf_counter() - started))
+        else:
+            self.warm_starts += 1
+        lookups = self.answered + self.warm_starts
+        print(f"🗂️ Research index: " + (f"{match['kind']} from '{match['objective'][:60]}' "
+                                        f"(similarity {match['similarity']:.2f})" if match else "miss")
+              + f" ({lookups} of {self.lookups} lookups reused earlier research)")
+        return match
+
+    def _match(self, vector) -> Optional[Dict[str, Any]]:
+        import numpy as np
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                return None
+            similarities = self._vectors @ vector
+            now = time.time()
+            # Best first, newest first among ties; the closest entry may be too old to use, the next one not
+            for position in np.lexsort((-np.asarray(self._ids), -similarities)):
+                similarity = float(similarities[position])
+                if similarity < self.warm_similarity:
+                    break
+                row = self._conn.execute(
+                    "SELECT id, objective, criteria, answer, verdict, sources, files, seconds, created_at "
+                    "FROM research_index WHERE id = ?", (self._ids[position],)
+                ).fetchone()
+                age = now - row[8]
+                if similarity >= self.answer_similarity and age <= self.answer_ttl:
+                    kind = "answer"
+                elif age <= self.warm_ttl:
+                    kind = "warm"
+                else:
+                    continue
+                self._conn.execute("UPDATE research_index SET last_access = ? WHERE id = ?", (now, row[0]))
+                return {"kind": kind, "similarity": round(similarity, 3), "age": age, "id": row[0],
+                        "objective": row[1], "criteria": row[2], "answer": row[3], "verdict": row[4],
+                        "sources": json.loads(row[5]), "files": json.loads(row[6]), "seconds": row[7],
+                        "created_at": row[8]}
+        return None
+
+    async def store(self, objective: str, criteria: str, research: Dict[str, Any], seconds: float):
+        """Index one completed request (see completed_research)"""
+        vector = await self.embed(index_text(objective, criteria))
+        await asyncio.to_thread(self._insert, objective, criteria, research, seconds, vector)
+        self.stored += 1
+
+    def _insert(self, objective: str, criteria: str, research: Dict[str, Any], seconds: float, vector):
+        import numpy as np
+        key = request_key(objective, criteria)
+        now = time.time()
+        with self._lock:
+            # A rerun of the same request supersedes the earlier answer
+            deleted = self._conn.execute("DELETE FROM research_index WHERE request_key = ?", (key,)).rowcount
+            cursor = self._conn.execute(
+                "INSERT INTO research_index (objective, criteria, embedding, answer, verdict, sources, files, "
+                "seconds, created_at, last_access, request_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (objective, criteria, vector.tobytes(), research["answer"], research["verdict"],
+                 json.dumps(research["sources"]), json.dumps(research["files"]), seconds, now, now, key)
+            )
+            deleted += self._prune(now)
+            if deleted or self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                self._load()
+            else:
+                # Nothing removed: append the new row instead of reloading every embedding
+                self._ids.append(cursor.lastrowid)
+                self._vectors = np.vstack([self._vectors, vector])
+
+    def _prune(self, now: float) -> int:
+        """Drop expired and least recently used entries; returns how many were removed"""
+        # Too old even to warm-start from
+        removed = self._conn.execute("DELETE FROM research_index WHERE created_at < ?", (now - self.warm_ttl,)).rowcount
+        (entries,) = self._conn.execute("SELECT COUNT(*) FROM research_index").fetchone()
+        if entries > self.max_entries:
+            removed += self._conn.execute(
+                "DELETE FROM research_index WHERE id IN "
+                "(SELECT id FROM research_index ORDER BY last_access ASC LIMIT ?)", (entries - self.max_entries,)
+            ).rowcount
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM research_index")
+            self._load()
+
+    def stats(self) -> dict:
+        return {
+            "lookups": self.lookups,
+            "answered": self.answered,
+            "warm_starts": self.warm_starts,
+            "misses": self.misses,
+            "hit_rate": (self.answered + self.warm_starts) / self.lookups if self.lookups else 0.0,
+            "answer_rate": self.answered / self.lookups if self.lookups else 0.0,
+            "seconds_saved": round(self.seconds_saved, 1),
+            "stored": self.stored,
+            "entries": len(self._ids),
+        }
+
+
+def warm_start_context(match: Dict[str, Any]) -> str:
+    """Earlier research on a similar objective, as a starting point for the researcher"""
+    created = time.strftime("%Y-%m-%d", time.localtime(match["created_at"]))
+    answer = match["answer"]
+    if len(answer) > RESEARCH_INDEX_WARM_CHARS:
+        answer = answer[:RESEARCH_INDEX_WARM_CHARS] + "\n[...]"
+    sources = "\n".join(f"- {source}" for source in match["sources"][:20]) or "- (none recorded)"
+    files = ", ".join(match["files"]) or "none"
+    return f"""EARLIER RESEARCH ON A SIMILAR OBJECTIVE ({created}): {match['objective']}
+{answer}
+
+Sources it used:
+{sources}
+Files it saved to research_outputs/: {files}
+
+Build on this instead of repeating it: check what is out of date, fill the gaps for the current objective, and search only for what is missing."""
+
+
+def answered_from_index(match: Dict[str, Any]) -> str:
+    """Note shown under an answer that came from the index"""
+    created = time.strftime("%Y-%m-%d", time.localtime(match["created_at"]))
+    files = f" Files saved then: {', '.join(match['files'])}." if match["files"] else ""
+    return (f"♻️ Answered from earlier research ({created}) on \"{match['objective']}\" "
+            f"(similarity {match['similarity']:.2f}).{files} Tick \"Fresh answers\" to research it again.")
+
+
+_research_index = None
+_research_index_lock = threading.Lock()
+
+
+def get_research_index() -> Optional[ResearchIndex]:
+    """The process-wide research index, or None unless RESEARCH_INDEX=1"""
+    global _research_index
+    if not RESEARCH_INDEX_ENABLED:
+        return None
+    with _research_index_lock:
+        if _research_index is None:
+            _research_index = ResearchIndex()
+        return _research_index
@@ -0,0 +1,401 @@
+"""Live metrics and per-request traces for the research service.
+
+Each research request gets a RequestMetrics callback handler in its graph
+config. From the LangChain callbacks it records:
+- graph node spans (compactor, researcher, tools, evaluator) and the
+  number of graph steps the request reached
+- LLM calls and token usage (input, cached, output) per node
+- tool call spans, with errors and timeouts
+- work cancelled by a reset, a disconnect or the request's budget
+  (research_budget.py): spans still open when the request ends
+When the request ends these go into the process-wide MetricsRegistry, and,
+if RESEARCH_TRACE_DIR is set, into a JSON trace file for that request.
+
+render_metrics() returns the registry plus the scheduler, LLM limiter,
+tool guard, caches and browser pool state in the Prometheus text format.
+start_metrics_server() serves it on /metrics on its own port next to the
+Gradio app. The endpoint has no authentication, so it listens on 127.0.0.1
+unless RESEARCH_METRICS_HOST says otherwise (e.g. 0.0.0.0 for a scraper on
+another host).
+
+With RESEARCH_METRICS=0 no handler is attached, so requests pay nothing.
+benchmarks/metrics_overhead.py measures the cost either way.
+"""
+import asyncio
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from langchain_core.callbacks import BaseCallbackHandler
+from tool_execution import LATENCY_BUCKETS, LatencyHistogram
+
+RESEARCH_METRICS = os.getenv("RESEARCH_METRICS", "1") != "0"
+RESEARCH_METRICS_PORT = int(os.getenv("RESEARCH_METRICS_PORT", "9464"))
+RESEARCH_METRICS_HOST = os.getenv("RESEARCH_METRICS_HOST", "127.0.0.1")
+RESEARCH_TRACE_DIR = os.getenv("RESEARCH_TRACE_DIR")
+
+# seconds; whole research requests take minutes
+REQUEST_BUCKETS = [1, 5, 10, 30, 60, 120, 300, 600, 1200, float("inf")]
+STEP_BUCKETS = [5, 10, 20, 40, 60, 80, 100, float("inf")]
+
+class MetricsRegistry:
+    """Counters and histograms keyed by metric name and label values"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.help = {}
+
+    def describe(self, name: str, text: str):
+        self.help[name] = text
+
+    def inc(self, name: str, labels: dict = None, amount: float = 1):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, labels: dict = None, buckets=LATENCY_BUCKETS):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram(buckets)
+            histogram.observe(value)
+
+    def samples(self):
+        """(name, labels, value, kind) for every series; histograms expand into buckets, sum and count"""
+        with self._lock:
+            counters = list(self.counters.items())
+            histograms = [(key, h.snapshot()) for key, h in self.histograms.items()]
+        for (name, labels), value in counters:
+            yield name, dict(labels), value, "counter"
+        for (name, labels), snapshot in histograms:
+            for bound, count in snapshot["buckets"].items():
+                yield f"{name}_bucket", {**dict(labels), "le": bound}, count, "histogram"
+            yield f"{name}_sum", dict(labels), snapshot["sum"], "histogram"
+            yield f"{name}_count", dict(labels), snapshot["count"], "histogram"
+
+
+registry = MetricsRegistry()
+registry.describe("research_requests_total", "Research requests by outcome")
+registry.describe("research_request_seconds", "Wall time of research requests")
+registry.describe("research_graph_steps", "Graph steps reached per request (recursion limit is 100)")
+registry.describe("research_loop_iterations", "Researcher turns per request")
+registry.describe("research_node_seconds", "Graph node run time")
+registry.describe("research_llm_calls_total", "Chat model calls by graph node")
+registry.describe("research_llm_tokens_total", "Chat model tokens by graph node and kind")
+registry.describe("research_tool_calls_total", "Tool calls by tool and outcome")
+registry.describe("research_tool_seconds", "Tool call run time")
+registry.describe("research_cancelled_total", "LLM calls, tool calls and graph nodes cancelled before they finished")
+
+
+class RequestMetrics(BaseCallbackHandler):
+    """Collects spans for one research request from the graph's callbacks"""
+
+    # Called on the event loop instead of a worker thread
+    run_inline = True
+
+    def __init__(self, session_id: str, objective: str, registry: MetricsRegistry = registry,
+                 trace_dir: str = RESEARCH_TRACE_DIR):
+        self.request_id = str(uuid.uuid4())
+        self.session_id = session_id
+        self.objective = objective
+        self.registry = registry
+        self.trace_dir = trace_dir
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.max_step = 0
+        self.iterations = 0
+        self.spans = []
+        self._open = {}
+
+    def _begin(self, run_id, kind: str, name: str, **attributes):
+        self._open[run_id] = {"kind": kind, "name": name, "start": time.perf_counter() - self.started, **attributes}
+
+    def _end(self, run_id, error=None, **attributes):
+        span = self._open.pop(run_id, None)
+        if span is None:
+            return None
+        span["seconds"] = time.perf_counter() - self.started - span["start"]
+        span.update(attributes)
+        if error is not None:
+            span["error"] = f"{type(error).__name__}: {error}"[:300]
+        self.spans.append(span)
+        return span
+
+    # Graph nodes
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        # the node's own run; routers and inner runnables share the node metadata
+        if node and kwargs.get("name") == node and any(t.startswith("graph:step:") for t in tags or []):
+            step = (metadata or {}).get("langgraph_step") or 0
+            self.max_step = max(self.max_step, step)
+            if node == "researcher":
+                self.iterations += 1
+            self._begin(run_id, "node", node, step=step)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        span = self._end(run_id)
+        if span is not None:
+            self.registry.observe("research_node_seconds", span["seconds"], {"node": span["name"]})
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        span = self._end(run_id, error)
+        if span is not None:
+            self.registry.observe("research_node_seconds", span["seconds"], {"node": span["name"]})
+            if isinstance(error, asyncio.CancelledError):
+                self.registry.inc("research_cancelled_total", {"kind": "node"})
+
+    # LLM calls
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._begin(run_id, "llm", (metadata or {}).get("langgraph_node") or "llm")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage, cache_hit = {}, False
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                if message is not None:
+                    usage = getattr(message, "usage_metadata", None) or usage
+                    cache_hit = cache_hit or message.response_metadata.get("llm_cache") == "hit"
+        tokens = {
+            "input": usage.get("input_tokens", 0),
+            "cached": (usage.get("input_token_details") or {}).get("cache_read") or 0,
+            "output": usage.get("output_tokens", 0),
+        }
+        span = self._end(run_id, tokens=tokens, response_cache_hit=cache_hit)
+        if span is None:
+            return
+        labels = {"node": span["name"]}
+        self.registry.inc("research_llm_calls_total", {**labels, "cache": "hit" if cache_hit else "miss"})
+        if not cache_hit:
+            for kind, count in tokens.items():
+                if count:
+                    self.registry.inc("research_llm_tokens_total", {**labels, "kind": kind}, count)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        span = self._end(run_id, error)
+        if span is not None:
+            if isinstance(error, asyncio.CancelledError):
+                self.registry.inc("research_llm_calls_total", {"node": span["name"], "cache": "cancelled"})
+                self.registry.inc("research_cancelled_total", {"kind": "llm"})
+            else:
+                self.registry.inc("research_llm_calls_total", {"node": span["name"], "cache": "error"})
+
+    # Tool calls
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._begin(run_id, "tool", (serialized or {}).get("name") or kwargs.get("name") or "tool",
+                    input=str(input_str)[:200])
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        content = str(getattr(output, "content", output))
+        # the tool guard returns a timeout message instead of raising
+        status = "timeout" if content.startswith('{"status": "timeout"') else "ok"
+        span = self._end(run_id, status=status, output_chars=len(content))
+        if span is not None:
+            self._record_tool(span, status)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        span = self._end(run_id, error, status="error")
+        if span is not None:
+            self._record_tool(span, "error")
+
+    def _record_tool(self, span: dict, status: str):
+        self.registry.inc("research_tool_calls_total", {"tool": span["name"], "status": status})
+        self.registry.observe("research_tool_seconds", span["seconds"], {"tool": span["name"]})
+
+    def finish(self, error: BaseException = None):
+        """Record the request as a whole and write its trace file"""
+        seconds = time.perf_counter() - self.started
+        # Whatever is still open was cancelled with the request
+        for run_id, span in list(self._open.items()):
+            span = self._end(run_id, status="cancelled")
+            self.registry.inc("research_cancelled_total", {"kind": span["kind"]})
+            if span["kind"] == "tool":
+                self._record_tool(span, "cancelled")
+            elif span["kind"] == "llm":
+                self.registry.inc("research_llm_calls_total", {"node": span["name"], "cache": "cancelled"})
+        if error is None:
+            status = "ok"
+        elif isinstance(error, asyncio.CancelledError):
+            status = "cancelled"
+        elif getattr(error, "status", None) in ("deadline", "token_budget"):
+            # research_budget.BudgetExceeded
+            status = error.status
+        elif "recursion" in str(error).lower():
+            status = "recursion_limit"
+        else:
+            status = "error"
+        self.registry.inc("research_requests_total", {"status": status})
+        self.registry.observe("research_request_seconds", seconds, buckets=REQUEST_BUCKETS)
+        self.registry.observe("research_graph_steps", self.max_step, buckets=STEP_BUCKETS)
+        self.registry.observe("research_loop_iterations", self.iterations, buckets=STEP_BUCKETS)
+        if self.trace_dir:
+            self.write_trace(status, seconds, error)
+
+    def write_trace(self, status: str, seconds: float, error: Exception = None):
+        os.makedirs(self.trace_dir, exist_ok=True)
+        path = os.path.join(self.trace_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{self.request_id[:8]}.json")
+        trace = {
+            "request_id": self.request_id,
+            "session_id": self.session_id,
+            "objective": self.objective,
+            "started_at": self.started_at,
+            "seconds": seconds,
+            "status": status,
+            "error": str(error) if error is not None else None,
+            "graph_steps": self.max_step,
+            "researcher_iterations": self.iterations,
+            "spans": sorted(self.spans, key=lambda span: span["start"]),
+        }
+        with open(path, "w") as f:
+            json.dump(trace, f, indent=2, default=str)
+
+
+def start_request_metrics(session_id: str, objective: str):
+    """A handler for one request, or None when metrics are disabled"""
+    return RequestMetrics(session_id, objective) if RESEARCH_METRICS else None
+
+
+# Exposition
+
+def _existing(module: str, attribute: str):
+    """A module's singleton if the process has created it; never creates one"""
+    return getattr(sys.modules.get(module), attribute, None)
+
+
+def scheduler_gauges():
+    scheduler = _existing("research_scheduler", "_research_scheduler")
+    if scheduler is not None:
+        stats = scheduler.stats()
+        yield "research_active_requests", {}, stats["active"]
+        yield "research_queue_depth", {}, stats["queue_depth"]
+        yield "research_queue_rejected_total", {}, stats["rejected"]
+        for quantile in ("p50", "p95"):
+            yield "research_queue_wait_seconds", {"quantile": quantile}, stats["wait_time"][quantile]
+    limiter = _existing("llm_limiter", "_llm_limiter")
+    if limiter is not None:
+        stats = limiter.stats()
+        for key in ("limit", "in_flight", "waiting", "throttled", "retried"):
+            yield f"research_llm_limiter_{key}", {}, stats[key]
+
+
+def tool_gauges():
+    guard = _existing("tool_execution", "_tool_guard")
+    if guard is not None:
+        stats = guard.stats()
+        for tool, count in stats["timeouts"].items():
+            yield "research_tool_timeouts", {"tool": tool}, count
+        for group, count in stats["in_flight"].items():
+            yield "research_tool_in_flight", {"group": group}, count
+    for module, attribute, name in (("search_cache", "_search_cache", "search"),
+                                    ("llm_cache", "_llm_cache", "llm"),
+                                    ("page_fetch", "_page_fetcher", "page")):
+        cache = _existing(module, attribute)
+        if cache is not None:
+            stats = cache.stats()
+            for key in ("hits", "misses"):
+                if key in stats:
+                    yield f"research_cache_{key}", {"cache": name}, stats[key]
+
+
+def browser_gauges():
+    pool = _existing("browser_pool", "_browser_pool")
+    if pool is not None:
+        stats = pool.stats()
+        yield "research_browsers", {}, len(stats["browsers"])
+        for browser in stats["browsers"]:
+            yield "research_browser_contexts", {"browser": browser["id"]}, browser["active_contexts"]
+            if browser["memory_bytes"] is not None:
+                yield "research_browser_memory_bytes", {"browser": browser["id"]}, browser["memory_bytes"]
+
+
+def usage_gauges():
+    tracker = _existing("llm_usage", "_tracker")
+    if tracker is not None:
+        for caller, totals in tracker.stats().items():
+            yield "research_llm_seconds", {"caller": caller}, totals["seconds"]
+
+
+def index_gauges():
+    index = _existing("research_index", "_research_index")
+    if index is not None:
+        stats = index.stats()
+        for result in ("answered", "warm_starts", "misses"):
+            yield "research_index_lookups", {"result": result}, stats[result]
+        yield "research_index_seconds_saved", {}, stats["seconds_saved"]
+        yield "research_index_entries", {}, stats["entries"]
+
+
+GAUGE_SOURCES = [scheduler_gauges, tool_gauges, browser_gauges, usage_gauges, index_gauges]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _family(name: str, kind: str) -> str:
+    return re.sub(r"_(bucket|sum|count)$", "", name) if kind == "histogram" else name
+
+
+def render_metrics(registry: MetricsRegistry = registry) -> str:
+    """Everything in the Prometheus text exposition format"""
+    families = {}
+    for name, labels, value, kind in registry.samples():
+        families.setdefault((_family(name, kind), kind), []).append((name, labels, value))
+    for source in GAUGE_SOURCES:
+        try:
+            # the components live on the event loop; this runs in the server thread
+            gauges = list(source())
+        except RuntimeError:
+            continue
+        for name, labels, value in gauges:
+            # sources report running totals under *_total names
+            kind = "counter" if name.endswith("_total") else "gauge"
+            families.setdefault((name, kind), []).append((name, labels, value))
+
+    lines = []
+    for (family, kind), samples in families.items():
+        if family in registry.help:
+            lines.append(f"# HELP {family} {registry.help[family]}")
+        lines.append(f"# TYPE {family} {kind}")
+        lines.extend(f"{name}{_labels(labels)} {value}" for name, labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int = RESEARCH_METRICS_PORT, host: str = RESEARCH_METRICS_HOST):
+    """Serve /metrics from a daemon thread"""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    print(f"📈 Metrics at http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,174 @@
+"""Admission control for research requests across all Gradio sessions.
+
+Without it, every user who presses "Start Research" starts a full research
+loop at once, and ten simultaneous users all hit the provider's rate limit
+together. The scheduler admits at most RESEARCH_MAX_ACTIVE requests at a
+time. The rest wait in a bounded queue:
+- each user has their own FIFO, and users take turns (round-robin), so
+  one user queueing several requests cannot starve the others
+- the queue holds at most RESEARCH_MAX_QUEUE requests, and at most
+  RESEARCH_MAX_QUEUED_PER_USER per user; beyond that submit() refuses
+- a waiting request sees its position, which the app shows in the chat
+
+LLM calls made by admitted requests are further limited by the adaptive
+limiter in llm_limiter.py.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from llm_limiter import get_llm_limiter
+from tool_execution import LatencyHistogram
+
+RESEARCH_MAX_ACTIVE = int(os.getenv("RESEARCH_MAX_ACTIVE", "4"))
+RESEARCH_MAX_QUEUE = int(os.getenv("RESEARCH_MAX_QUEUE", "32"))
+RESEARCH_MAX_QUEUED_PER_USER = int(os.getenv("RESEARCH_MAX_QUEUED_PER_USER", "2"))
+# How often a waiting request re-reads its queue position
+RESEARCH_POSITION_INTERVAL = float(os.getenv("RESEARCH_POSITION_INTERVAL", "2"))
+
+# seconds; research requests can wait minutes
+WAIT_BUCKETS = [0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, float("inf")]
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+class Ticket:
+    """One research request's place in the scheduler"""
+
+    def __init__(self, scheduler, user: str):
+        self.scheduler = scheduler
+        self.user = user
+        self.enqueued_at = time.perf_counter()
+        self.admitted_at = None
+        self.released = False
+        self._admitted = asyncio.Event()
+
+    @property
+    def admitted(self) -> bool:
+        return self.admitted_at is not None
+
+    def position(self) -> int:
+        """1-based place in the dispatch order; 0 once admitted"""
+        return self.scheduler.position(self)
+
+    async def wait(self):
+        """Yield the queue position until the request is admitted"""
+        while not self.admitted:
+            yield self.position()
+            try:
+                await asyncio.wait_for(self._admitted.wait(), RESEARCH_POSITION_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    def release(self):
+        """Leave the queue, or free the slot once the research is done; safe to call twice"""
+        if not self.released:
+            self.released = True
+            self.scheduler.release(self)
+
+
+class ResearchScheduler:
+    """Bounded, per-user fair queue in front of a fixed number of research slots"""
+
+    def __init__(self, max_active: int = RESEARCH_MAX_ACTIVE, max_queue: int = RESEARCH_MAX_QUEUE,
+                 max_per_user: int = RESEARCH_MAX_QUEUED_PER_USER):
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        # user -> waiting tickets; the order of users is the round-robin order
+        self._queues = OrderedDict()
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.abandoned = 0
+        self.wait_time = LatencyHistogram(WAIT_BUCKETS)
+        self.run_time = LatencyHistogram(WAIT_BUCKETS)
+
+    def queue_depth(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def submit(self, user: str) -> Ticket:
+        """Queue a request for `user`; raises QueueFullError when the queue or the user's share is full"""
+        if self.queue_depth() >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(f"The research queue is full ({self.max_queue} waiting). Please try again shortly.")
+        queue = self._queues.get(user)
+        if queue is not None and len(queue) >= self.max_per_user:
+            self.rejected += 1
+            raise QueueFullError(f"You already have {len(queue)} research requests waiting.")
+        ticket = Ticket(self, user)
+        if queue is None:
+            queue = self._queues[user] = deque()
+        queue.append(ticket)
+        self._dispatch()
+        return ticket
+
+    def dispatch_order(self):
+        """Waiting tickets in the order they will be admitted"""
+        queues = list(self._queues.values())
+        for turn in range(max((len(q) for q in queues), default=0)):
+            for queue in queues:
+                if turn < len(queue):
+                    yield queue[turn]
+
+    def position(self, ticket: Ticket) -> int:
+        if ticket.admitted:
+            return 0
+        for position, waiting in enumerate(self.dispatch_order(), start=1):
+            if waiting is ticket:
+                return position
+        return 0
+
+    def _dispatch(self):
+        while self.active < self.max_active and self._queues:
+            user, queue = next(iter(self._queues.items()))
+            ticket = queue.popleft()
+            # the user goes to the back of the rotation (or leaves it)
+            del self._queues[user]
+            if queue:
+                self._queues[user] = queue
+            self.active += 1
+            self.admitted += 1
+            ticket.admitted_at = time.perf_counter()
+            self.wait_time.observe(ticket.admitted_at - ticket.enqueued_at)
+            ticket._admitted.set()
+
+    def release(self, ticket: Ticket):
+        if ticket.admitted:
+            self.active -= 1
+            self.run_time.observe(time.perf_counter() - ticket.admitted_at)
+        else:
+            # the user left (or the request failed) while still queued
+            queue = self._queues.get(ticket.user)
+            if queue is not None and ticket in queue:
+                queue.remove(ticket)
+                if not queue:
+                    del self._queues[ticket.user]
+            self.abandoned += 1
+        self._dispatch()
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "max_active": self.max_active,
+            "queue_depth": self.queue_depth(),
+            "queued_per_user": {user: len(queue) for user, queue in self._queues.items()},
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "abandoned": self.abandoned,
+            "wait_time": self.wait_time.snapshot(),
+            "run_time": self.run_time.snapshot(),
+            "llm": get_llm_limiter().stats(),
+        }
+
+
+_research_scheduler = None
+
+
+def get_research_scheduler() -> ResearchScheduler:
+    global _research_scheduler
+    if _research_scheduler is None:
+        _research_scheduler = ResearchScheduler()
+    return _research_scheduler
@@ -1,69 +1,119 @@
 import os
-import requests
-from langchain.agents import Tool
-from langchain_community.agent_toolkits import FileManagementToolkit
-from langchain_community.tools.wikipedia.tool import WikipediaQueryRun
-from langchain_experimental.tools import PythonREPLTool
-from langchain_community.utilities import GoogleSerperAPIWrapper
-from langchain_community.utilities.wikipedia import WikipediaAPIWrapper
-from playwright.async_api import async_playwright
-from langchain_community.agent_toolkits import PlayWrightBrowserToolkit
+import asyncio
+import threading
 from dotenv import load_dotenv
-from twilio.rest import Client
+from langchain_core.tools import Tool
+from search_cache import get_search_cache
+from http_client import get_http_client
+from tool_registry import ToolRegistry, ToolSession, ToolSessions
+from tool_execution import get_tool_guard
+from tool_schemas import (
+    BROWSER_TOOLS,
+    FILE_TOOLS,
+    FetchPageInput,
+    PythonInput,
+    SearchInput,
+    WhatsAppNotificationInput,
+    WikipediaInput,
+)
 
 # Load environment variables from root .env file
 load_dotenv("../.env", override=True)
 
 # WhatsApp/Twilio configuration - NOW USING ENVIRONMENT VARIABLES
 WHATSAPP_ACCOUNT_SID = os.getenv("WHATSAPP_ACCOUNT_SID")
-WHATSAPP_AUTH_TOKEN = os.getenv("WHATSAPP_AUTH_TOKEN") 
+WHATSAPP_AUTH_TOKEN = os.getenv("WHATSAPP_AUTH_TOKEN")
 WHATSAPP_FROM_NUMBER = os.getenv("WHATSAPP_FROM_NUMBER")
 WHATSAPP_TO_NUMBER = os.getenv("WHATSAPP_TO_NUMBER", "+4915222350056")
+TWILIO_API_BASE_URL = os.getenv("TWILIO_API_BASE_URL")
 
-# Initialize services with error handling
-try:
-    from langchain_community.utilities import GoogleSerperAPIWrapper
-    serper = GoogleSerperAPIWrapper()
-except:
-    serper = None
-    print("Google Serper not configured, using basic search")
-
-try:
-    from langchain_community.utilities.wikipedia import WikipediaAPIWrapper
-    wikipedia_available = True
-except:
-    wikipedia_available = False
-    print("Wikipedia not available")
-
-# Only initialize Twilio if credentials are available
-if WHATSAPP_ACCOUNT_SID and WHATSAPP_AUTH_TOKEN:
-    twilio_client = Client(WHATSAPP_ACCOUNT_SID, WHATSAPP_AUTH_TOKEN)
-else:
-    twilio_client = None
-    print("Twilio credentials not found in environment variables")
-
-async def playwright_tools():
-    """Set up Playwright browser tools for web automation"""
-    playwright = await async_playwright().start()
-    browser = await playwright.chromium.launch(headless=False)
-    toolkit = PlayWrightBrowserToolkit.from_browser(async_browser=browser)
-    return toolkit.get_tools(), browser, playwright
+# Async search limits - shared by every research session in this process
+SEARCH_MAX_CONCURRENCY = int(os.getenv("SEARCH_MAX_CONCURRENCY", "8"))
+SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "15"))
+SERPER_API_URL = "https://google.serper.dev"
+
+# Services are created on first use so importing this module stays cheap
+_serper = None
+_serper_loaded = False
+_twilio_client = None
+_twilio_loaded = False
+
+def get_serper():
+    """Create the Serper wrapper on first use"""
+    global _serper, _serper_loaded
+    if not _serper_loaded:
+        _serper_loaded = True
+        try:
+            from langchain_community.utilities import GoogleSerperAPIWrapper
+            _serper = GoogleSerperAPIWrapper()
+        except Exception:
+            _serper = None
+            print("Google Serper not configured, using basic search")
+    return _serper
+
+def get_twilio_client():
+    """Create the Twilio client on first use, if credentials are available"""
+    global _twilio_client, _twilio_loaded
+    if not _twilio_loaded:
+        _twilio_loaded = True
+        if WHATSAPP_ACCOUNT_SID and WHATSAPP_AUTH_TOKEN:
+            from twilio.rest import Client
+            _twilio_client = Client(WHATSAPP_ACCOUNT_SID, WHATSAPP_AUTH_TOKEN)
+            if TWILIO_API_BASE_URL:
+                # Point at a local stand-in such as benchmarks/fake_twilio.py
+                _twilio_client.api.base_url = TWILIO_API_BASE_URL
+        else:
+            print("Twilio credentials not found in environment variables")
+    return _twilio_client
+
+async def playwright_tools(session_id: str):
+    """Lease a browser context from the shared pool and build Playwright tools on it"""
+    from browser_pool import get_browser_pool
+    lease = await get_browser_pool().lease(session_id)
+    return lease.get_tools(), lease
+
+def deliver_whatsapp_message(recipient: str, body: str) -> str:
+    """Send one WhatsApp message through Twilio; used by the notification outbox"""
+    message = get_twilio_client().messages.create(
+        from_=f"whatsapp:{WHATSAPP_FROM_NUMBER}",
+        body=body,
+        to=f"whatsapp:{recipient}"
+    )
+    return message.sid
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+def get_notification_outbox():
+    """Create the durable notification outbox on first use"""
+    global _outbox
+    # reached from worker threads; two outboxes would each claim the same rows
+    with _outbox_lock:
+        if _outbox is None:
+            from notification_outbox import NotificationOutbox
+            _outbox = NotificationOutbox(send=deliver_whatsapp_message)
+    return _outbox
+
+def resume_notification_outbox():
+    """At process start, deliver messages a previous run left in the outbox"""
+    from notification_outbox import OUTBOX_PATH
+    if not os.path.exists(OUTBOX_PATH) or not get_twilio_client():
+        return None
+    outbox = get_notification_outbox()
+    pending = outbox.pending_count()
+    if pending:
+        print(f"📨 Resuming {pending} queued WhatsApp notification(s)")
+        outbox.start()
+    return outbox
 
 def send_whatsapp_notification(message: str):
-    """Send a WhatsApp notification to the user when research is complete"""
+    """Queue a WhatsApp notification; delivery happens in the background as a digest"""
     try:
-        if not twilio_client:
+        if not get_twilio_client():
             return "⚠️ WhatsApp not configured. Add WHATSAPP credentials to .env file"
-            
-        formatted_message = f"🔬 Research Assistant Update:\n\n{message}"
-        
-        # Try to send WhatsApp message
-        message = twilio_client.messages.create(
-            from_=f"whatsapp:{WHATSAPP_FROM_NUMBER}",
-            body=formatted_message,
-            to=f"whatsapp:{WHATSAPP_TO_NUMBER}"
-        )
-        return f"✅ WhatsApp notification sent successfully! Message SID: {message.sid}"
+
+        outbox_id = get_notification_outbox().enqueue(WHATSAPP_TO_NUMBER, message)
+        return f"✅ WhatsApp notification queued (#{outbox_id}); it will be delivered shortly with any other pending updates."
     except Exception as e:
         # If WhatsApp fails, just log it and continue
         error_msg = f"⚠️ WhatsApp notification failed: {str(e)}"
@@ -72,68 +122,276 @@ def send_whatsapp_notification(message: str):
 
 def get_file_tools():
     """Get file management tools for saving research outputs"""
+    from langchain_community.agent_toolkits import FileManagementToolkit
     os.makedirs("research_outputs", exist_ok=True)
     toolkit = FileManagementToolkit(root_dir="research_outputs")
     return toolkit.get_tools()
 
+def serper_search_params():
+    """Request parameters that change what Serper returns, used as part of the cache key"""
+    serper = get_serper()
+    return {"type": serper.type, "gl": serper.gl or "us", "hl": serper.hl or "en", "num": serper.k}
+
 def advanced_web_search(query: str):
     """Enhanced web search specifically for research purposes"""
     try:
+        serper = get_serper()
         if serper:
-            results = serper.run(query)
+            # Raw Serper responses are cached on disk and shared with the crew's search tool
+            raw = get_search_cache().get_or_fetch(
+                "serper", query, lambda: serper.results(query), **serper_search_params()
+            )
+            results = serper._parse_results(raw)
             return f"Research search results for '{query}':\n{results}"
         else:
             return f"Search functionality not available. Please configure SERPER_API_KEY in your .env file"
     except Exception as e:
         return f"Search failed: {str(e)}"
 
-async def get_research_tools():
-    """Compile all tools needed for research assistance"""
-    
-    # WhatsApp notification tool
-    whatsapp_tool = Tool(
+_search_semaphore = None
+_search_semaphore_loop = None
+
+def get_search_semaphore():
+    """Global limit on in-flight Serper requests, created on the running loop"""
+    global _search_semaphore, _search_semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _search_semaphore is None or _search_semaphore_loop is not loop:
+        _search_semaphore = asyncio.Semaphore(SEARCH_MAX_CONCURRENCY)
+        _search_semaphore_loop = loop
+    return _search_semaphore
+
+async def fetch_serper_results(query: str):
+    """POST a query to Serper over the shared keep-alive client"""
+    params = serper_search_params()
+    payload = {"q": query, "gl": params["gl"], "hl": params["hl"], "num": params["num"]}
+    async with get_search_semaphore():
+        response = await get_http_client().post(
+            f"{SERPER_API_URL}/{params['type']}",
+            headers={"X-API-KEY": get_serper().serper_api_key, "Content-Type": "application/json"},
+            json=payload,
+            timeout=SEARCH_TIMEOUT,
+        )
+    response.raise_for_status()
+    return response.json()
+
+async def async_web_search(query: str):
+    """Non-blocking version of advanced_web_search for use inside the graph's event loop"""
+    try:
+        serper = get_serper()
+        if serper:
+            raw = await asyncio.wait_for(
+                get_search_cache().aget_or_fetch(
+                    "serper", query, lambda: fetch_serper_results(query), **serper_search_params()
+                ),
+                timeout=SEARCH_TIMEOUT,
+            )
+            results = serper._parse_results(raw)
+            return f"Research search results for '{query}':\n{results}"
+        else:
+            return f"Search functionality not available. Please configure SERPER_API_KEY in your .env file"
+    except asyncio.TimeoutError:
+        return f"Search timed out after {SEARCH_TIMEOUT:.0f}s for '{query}'. Try a narrower query."
+    except Exception as e:
+        return f"Search failed: {str(e)}"
+
+# Tool loaders - called with the session the first time a tool is used
+
+def load_whatsapp_tool(session: ToolSession):
+    return Tool(
         name="send_whatsapp_notification",
         func=send_whatsapp_notification,
+        # the first call imports Twilio and opens the outbox database
+        coroutine=lambda message: asyncio.to_thread(send_whatsapp_notification, message),
         description="Send a WhatsApp notification to the user when research is completed or important updates are available"
     )
-    
-    # Enhanced search tool
-    search_tool = Tool(
-        name="research_web_search", 
+
+def load_search_tool(session: ToolSession):
+    return Tool(
+        name="research_web_search",
         func=advanced_web_search,
+        coroutine=async_web_search,
         description="Search the web for academic and research information on any topic"
     )
-    
-    # File management tools
-    file_tools = get_file_tools()
-    
-    # Wikipedia for academic references (if available)
-    wiki_tool = None
-    if wikipedia_available:
+
+def load_wikipedia_tool(session: ToolSession):
+    # Served from the local FTS index first; network pages are stored in it (see wiki_index.py)
+    from wiki_index import get_wiki_index
+    index = get_wiki_index()
+    return Tool(
+        name="wikipedia",
+        func=index.lookup,
+        coroutine=lambda query: asyncio.to_thread(index.lookup, query),
+        description=WIKIPEDIA_TOOL_DESCRIPTION,
+    )
+
+def load_python_tool(session: ToolSession):
+    from python_sandbox import get_sandbox_pool, sanitize_code
+    pool = get_sandbox_pool()
+    session.resources["python_sandbox"] = pool
+    return Tool(
+        name="Python_REPL",
+        func=lambda query: pool.run(session.session_id, sanitize_code(query)),
+        coroutine=lambda query: pool.arun(session.session_id, sanitize_code(query)),
+        description=PYTHON_TOOL_DESCRIPTION,
+    )
+
+def file_tool_loader(name: str):
+    def load(session: ToolSession):
+        tools = session.group("files", lambda: {tool.name: tool for tool in get_file_tools()})
+        return tools[name]
+    return load
+
+async def get_session_browser_tools(session: ToolSession):
+    """Lease the session's browser context on first use and return its tools by name"""
+    async def lease_browser():
+        tools, lease = await playwright_tools(session.session_id)
+        session.resources["browser_lease"] = lease
+        return {tool.name: tool for tool in tools}
+    return await session.agroup("browser", lease_browser)
+
+def browser_tool_loader(name: str):
+    async def load(session: ToolSession):
+        tools = await get_session_browser_tools(session)
+        return tools[name]
+    return load
+
+def load_fetch_page_tool(session: ToolSession):
+    from page_fetch import get_page_fetcher
+    fetcher = get_page_fetcher()
+
+    async def render_with_browser(url: str) -> str:
+        # Only for pages that need JavaScript; reuses the session's browser context
+        await get_session_browser_tools(session)
+        page = await session.resources["browser_lease"].context.new_page()
+        try:
+            await page.goto(url, wait_until="networkidle", timeout=30000)
+            return await page.content()
+        finally:
+            await page.close()
+
+    async def fetch_page(url: str):
         try:
-            from langchain_community.tools.wikipedia.tool import WikipediaQueryRun
-            wikipedia = WikipediaAPIWrapper()
-            wiki_tool = WikipediaQueryRun(api_wrapper=wikipedia)
+            return await fetcher.fetch(url, render=render_with_browser)
         except Exception as e:
-            print(f"Wikipedia tool creation failed: {e}")
-    
-    # Python for data analysis
-    try:
-        from langchain_experimental.tools import PythonREPLTool
-        python_repl = PythonREPLTool()
-    except Exception as e:
-        print(f"Python REPL tool not available: {e}")
-        python_repl = None
-    
-    # Browser tools for web research
-    browser_tools, browser, playwright = await playwright_tools()
-    
-    # Compile all available tools
-    all_tools = file_tools + browser_tools + [whatsapp_tool, search_tool]
-    
-    if wiki_tool:
-        all_tools.append(wiki_tool)
-    if python_repl:
-        all_tools.append(python_repl)
-    
-    return all_tools, browser, playwright
+            return f"Could not fetch {url}: {e}"
+
+    return Tool(name="fetch_page", func=None, coroutine=fetch_page, description=FETCH_PAGE_TOOL_DESCRIPTION)
+
+FETCH_PAGE_TOOL_DESCRIPTION = (
+    "Read the main content of a web page as clean text, trimmed to a token budget. "
+    "Much faster and shorter than the browser tools; use it first for articles, reports and documentation, "
+    "and only use the browser tools when you need to click or interact with a page."
+)
+
+WIKIPEDIA_TOOL_DESCRIPTION = (
+    "A wrapper around Wikipedia. Useful for when you need to answer general questions about "
+    "people, places, companies, facts, historical events, or other subjects. Input should be a search query."
+)
+
+PYTHON_TOOL_DESCRIPTION = (
+    "A Python shell with numpy (np), pandas (pd) and matplotlib (plt) already imported. "
+    "Variables persist between calls. If you want to see the output of a value, print it out with `print(...)`. "
+    "Charts are saved automatically as PNG files in research_outputs/ and their file names are returned."
+)
+
+research_tool_registry = ToolRegistry()
+
+for _name, _description, _schema in FILE_TOOLS:
+    research_tool_registry.register(_name, _description, _schema, file_tool_loader(_name), group="files")
+
+for _name, _description, _schema in BROWSER_TOOLS:
+    research_tool_registry.register(_name, _description, _schema, browser_tool_loader(_name), group="browser")
+
+research_tool_registry.register(
+    "send_whatsapp_notification",
+    "Send a WhatsApp notification to the user when research is completed or important updates are available",
+    WhatsAppNotificationInput,
+    load_whatsapp_tool,
+    group="notify",
+)
+research_tool_registry.register(
+    "research_web_search",
+    "Search the web for academic and research information on any topic",
+    SearchInput,
+    load_search_tool,
+    group="search",
+)
+research_tool_registry.register(
+    "fetch_page",
+    FETCH_PAGE_TOOL_DESCRIPTION,
+    FetchPageInput,
+    load_fetch_page_tool,
+    group="fetch",
+)
+research_tool_registry.register(
+    "wikipedia",
+    WIKIPEDIA_TOOL_DESCRIPTION,
+    WikipediaInput,
+    load_wikipedia_tool,
+    group="wikipedia",
+)
+research_tool_registry.register(
+    "Python_REPL",
+    PYTHON_TOOL_DESCRIPTION,
+    PythonInput,
+    load_python_tool,
+    group="python",
+)
+
+# Sessions of the shared tools, by thread id
+research_tool_sessions = ToolSessions(research_tool_registry)
+_shared_research_tools = None
+
+def get_shared_research_tools():
+    """One set of research tools for every session; each call runs in the session named by its thread_id"""
+    global _shared_research_tools
+    if _shared_research_tools is None:
+        _shared_research_tools = research_tool_registry.build_shared(research_tool_sessions)
+    return _shared_research_tools
+
+async def get_research_tools(session_id: str):
+    """Compile all tools needed for research assistance.
+
+    Tools are described up front and built lazily on their first call, so this
+    returns immediately. The returned ToolSession owns anything the tools
+    acquire, such as the session's browser lease.
+    """
+    session = ToolSession(session_id)
+    return research_tool_registry.build(session), session
+
+async def release_research_tools(session: ToolSession):
+    """Release resources the session's tools acquired"""
+    get_tool_guard().release_session(session.session_id)
+    lease = session.resources.pop("browser_lease", None)
+    if lease is not None:
+        from browser_pool import get_browser_pool
+        await get_browser_pool().release(lease)
+    sandbox = session.resources.pop("python_sandbox", None)
+    if sandbox is not None:
+        await asyncio.to_thread(sandbox.release, session.session_id)
+
+def release_research_tools_nowait(session: ToolSession):
+    """Release from sync code running on the event loop"""
+    get_tool_guard().release_session(session.session_id)
+    sandbox = session.resources.pop("python_sandbox", None)
+    if sandbox is not None:
+        sandbox.release(session.session_id)
+    lease = session.resources.pop("browser_lease", None)
+    if lease is not None:
+        from browser_pool import get_browser_pool
+        get_browser_pool().release_nowait(lease)
+
+async def release_shared_research_tools(session_id: str):
+    """Release what a session acquired through the shared tools"""
+    session = research_tool_sessions.pop(session_id)
+    if session is not None:
+        await release_research_tools(session)
+    else:
+        get_tool_guard().release_session(session_id)
+
+def release_shared_research_tools_nowait(session_id: str):
+    session = research_tool_sessions.pop(session_id)
+    if session is not None:
+        release_research_tools_nowait(session)
+    else:
+        get_tool_guard().release_session(session_id)
@@ -0,0 +1,220 @@
+"""Persistent search-result cache shared by the research tools and the crew tools.
+
+Raw Serper responses are stored in a SQLite file keyed on the normalized query
+and the request parameters, with a TTL and LRU eviction. Concurrent callers that
+ask for the same query while a request is in flight share that one request.
+
+The CrewAI project loads this same file (see
+cybersecuritythreatintelligencesystem/tools/search_cache.py), so both projects
+read and write the cache with one implementation.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+SEARCH_CACHE_PATH = os.path.expanduser(os.getenv("SEARCH_CACHE_PATH", "~/.cache/agents/search_cache.sqlite3"))
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", str(24 * 3600)))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "5000"))
+
+# Trimmed from the ends only; symbols inside a query (C++, C#, AT&T, TCP/IP) change what it searches for
+_EDGE_PUNCTUATION = " \t\n?!.,;:\"'"
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, collapse whitespace and trim surrounding punctuation so near-identical queries share a key"""
+    return " ".join((query or "").lower().split()).strip(_EDGE_PUNCTUATION)
+
+
+class SearchCache:
+    """SQLite-backed search cache with TTL, LRU eviction and single-flight requests"""
+
+    def __init__(self, path: str = SEARCH_CACHE_PATH, ttl: int = SEARCH_CACHE_TTL,
+                 max_entries: int = SEARCH_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS search_cache (
+                key TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                query TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS search_cache_lru ON search_cache(last_access)")
+        self._db_lock = threading.Lock()
+        self._inflight_lock = threading.Lock()
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.bytes_saved = 0
+
+    def make_key(self, provider: str, query: str, **params) -> str:
+        """Build a stable cache key from the provider, normalized query and request parameters"""
+        payload = json.dumps(
+            {"provider": provider, "q": normalize_query(query), "params": params},
+            sort_keys=True, default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """Return the cached value for a key, or None if it is missing or expired"""
+        now = time.time()
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT value, size, created_at FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, size, created_at = row
+            if now - created_at > self.ttl:
+                self._conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE search_cache SET last_access = ? WHERE key = ?", (now, key))
+        self.bytes_saved += size
+        return json.loads(value)
+
+    def set(self, key: str, value, provider: str = "", query: str = ""):
+        """Store a value and evict expired or least recently used entries"""
+        encoded = json.dumps(value, default=str)
+        now = time.time()
+        with self._db_lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, provider, normalize_query(query), encoded, len(encoded.encode("utf-8")), now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM search_cache WHERE created_at < ?", (now - self.ttl,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM search_cache WHERE key IN "
+                "(SELECT key FROM search_cache ORDER BY last_access ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def get_or_fetch(self, provider: str, query: str, fetch, **params):
+        """Return a cached result or call fetch() once, sharing the result with concurrent callers"""
+        key = self.make_key(provider, query, **params)
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+
+        if not leader:
+            self.coalesced += 1
+            value = future.result()
+            self.bytes_saved += len(json.dumps(value, default=str).encode("utf-8"))
+            return value
+
+        self.misses += 1
+        try:
+            value = fetch()
+            self.set(key, value, provider, query)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            # Failures are never cached; waiting callers get the same error
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    async def aget_or_fetch(self, provider: str, query: str, afetch, **params):
+        """Async variant of get_or_fetch; coalesces with both async and threaded callers"""
+        key = self.make_key(provider, query, **params)
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+
+        if not leader:
+            self.coalesced += 1
+            # shield so a timed-out follower does not cancel the leader's request
+            value = await asyncio.shield(asyncio.wrap_future(future))
+            self.bytes_saved += len(json.dumps(value, default=str).encode("utf-8"))
+            return value
+
+        self.misses += 1
+        try:
+            value = await afetch()
+            self.set(key, value, provider, query)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            # Waiting callers should see a normal error, not a cancellation of their own task
+            future.set_exception(RuntimeError(f"search for '{query}' was cancelled"))
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        """Hit rate and bytes saved since this process started"""
+        with self._db_lock:
+            entries, stored = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM search_cache"
+            ).fetchone()
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "entries": entries,
+            "bytes_stored": stored,
+        }
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self._db_lock:
+            self._conn.execute("DELETE FROM search_cache")
+
+
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> SearchCache:
+    """Return the process-wide search cache, opening it on first use"""
+    global _search_cache
+    if _search_cache is None:
+        with _search_cache_lock:
+            if _search_cache is None:
+                _search_cache = SearchCache()
+    return _search_cache
@@ -0,0 +1,185 @@
+"""Concurrency limits, timeouts and latency histograms for tool calls.
+
+The tools node runs all tool calls of one researcher turn at once. Each tool
+belongs to a limit group; a group caps how many of its calls run at the same
+time in the process, and each call gets a timeout. A call that times out
+returns a structured message instead of holding up the rest of the turn.
+Browser calls are also serialized per session, since a session drives a
+single page.
+
+Override limits with TOOL_LIMITS, e.g. "browser=2:45,search=16:20" meaning
+group=max_concurrency:timeout_seconds.
+"""
+import asyncio
+import bisect
+import json
+import os
+import time
+from python_sandbox import PYTHON_SANDBOX_MAX_WORKERS
+
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "60"))
+
+# seconds; the same bucket bounds Prometheus uses for request latencies
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float("inf")]
+
+
+class ToolLimit:
+    def __init__(self, max_concurrency: int, timeout: float = TOOL_TIMEOUT, per_session: bool = False):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        # one call at a time within a session (on top of the process-wide cap)
+        self.per_session = per_session
+
+
+DEFAULT_TOOL_LIMITS = {
+    "search": ToolLimit(8, 20),
+    "fetch": ToolLimit(8, 30),
+    "wikipedia": ToolLimit(4, 20),
+    "python": ToolLimit(PYTHON_SANDBOX_MAX_WORKERS, 60),
+    "browser": ToolLimit(4, 45, per_session=True),
+    "files": ToolLimit(8, 15),
+    "notify": ToolLimit(4, 15),
+}
+
+
+def parse_tool_limits(spec: str, defaults=DEFAULT_TOOL_LIMITS):
+    limits = dict(defaults)
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        group, _, values = item.partition("=")
+        concurrency, _, timeout = values.partition(":")
+        current = limits.get(group, ToolLimit(8))
+        limits[group] = ToolLimit(int(concurrency or current.max_concurrency),
+                                  float(timeout or current.timeout), current.per_session)
+    return limits
+
+
+class LatencyHistogram:
+    """Cumulative-bucket histogram of call durations"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation"""
+        if not self.count:
+            return 0.0
+        target, seen = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.buckets[-1]
+
+    def snapshot(self) -> dict:
+        cumulative, running = {}, 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            cumulative["+Inf" if bound == float("inf") else str(bound)] = running
+        return {"buckets": cumulative, "count": self.count, "sum": self.total,
+                "p50": self.quantile(0.5), "p95": self.quantile(0.95)}
+
+
+def timeout_message(tool: str, timeout: float) -> str:
+    """What the researcher sees when a tool call runs out of time"""
+    return json.dumps({
+        "status": "timeout",
+        "tool": tool,
+        "timeout_seconds": timeout,
+        "message": f"{tool} did not finish within {timeout:.0f}s and was cancelled. "
+                   "Try a narrower input, another source, or continue without it.",
+    })
+
+
+class ToolGuard:
+    """Applies group limits and timeouts to tool calls and records their latency"""
+
+    def __init__(self, limits=None):
+        self.limits = limits or parse_tool_limits(os.getenv("TOOL_LIMITS", ""))
+        self._semaphores = {}
+        self._session_locks = {}
+        self.latency = {}
+        self.queue_wait = {}
+        self.timeouts = {}
+        self.errors = {}
+        self.in_flight = {}
+
+    def limit(self, group: str) -> ToolLimit:
+        return self.limits.get(group) or ToolLimit(8)
+
+    def _semaphore(self, group: str) -> asyncio.Semaphore:
+        # Semaphores belong to an event loop; Gradio and tests may run several
+        loop = asyncio.get_running_loop()
+        key = (id(loop), group)
+        if key not in self._semaphores:
+            self._semaphores[key] = asyncio.Semaphore(self.limit(group).max_concurrency)
+        return self._semaphores[key]
+
+    def _session_lock(self, group: str, session_id: str) -> asyncio.Lock:
+        key = (id(asyncio.get_running_loop()), group, session_id)
+        if key not in self._session_locks:
+            self._session_locks[key] = asyncio.Lock()
+        return self._session_locks[key]
+
+    def release_session(self, session_id: str):
+        for key in [k for k in self._session_locks if k[2] == session_id]:
+            del self._session_locks[key]
+
+    def observe(self, tool: str, seconds: float):
+        self.latency.setdefault(tool, LatencyHistogram()).observe(seconds)
+
+    async def run(self, tool: str, group: str, session_id: str, call):
+        """Await call() under the group's limits; returns a timeout message instead of hanging"""
+        limit = self.limit(group)
+        queued = time.perf_counter()
+        session_lock = self._session_lock(group, session_id) if limit.per_session else None
+        if session_lock is not None:
+            await session_lock.acquire()
+        try:
+            async with self._semaphore(group):
+                started = time.perf_counter()
+                self.queue_wait.setdefault(tool, LatencyHistogram()).observe(started - queued)
+                self.in_flight[group] = self.in_flight.get(group, 0) + 1
+                try:
+                    return await asyncio.wait_for(call(), limit.timeout)
+                except asyncio.TimeoutError:
+                    self.timeouts[tool] = self.timeouts.get(tool, 0) + 1
+                    print(f"⏱️ {tool} timed out after {limit.timeout:.0f}s")
+                    return timeout_message(tool, limit.timeout)
+                except Exception:
+                    self.errors[tool] = self.errors.get(tool, 0) + 1
+                    raise
+                finally:
+                    self.in_flight[group] -= 1
+                    self.observe(tool, time.perf_counter() - started)
+        finally:
+            if session_lock is not None:
+                session_lock.release()
+
+    def stats(self) -> dict:
+        return {
+            "latency": {tool: h.snapshot() for tool, h in self.latency.items()},
+            "queue_wait": {tool: h.snapshot() for tool, h in self.queue_wait.items()},
+            "timeouts": dict(self.timeouts),
+            "errors": dict(self.errors),
+            "in_flight": dict(self.in_flight),
+            "limits": {group: {"max_concurrency": l.max_concurrency, "timeout": l.timeout}
+                       for group, l in self.limits.items()},
+        }
+
+
+_tool_guard = None
+
+
+def get_tool_guard() -> ToolGuard:
+    global _tool_guard
+    if _tool_guard is None:
+        _tool_guard = ToolGuard()
+    return _tool_guard
@@ -0,0 +1,212 @@
+"""Lazy tool registry for the research assistant.
+
+Every tool is registered with its name, description and argument schema, which
+is all the LLM needs for tool binding. The code behind a tool (Playwright,
+Twilio, Wikipedia, the Python REPL, ...) is only imported and built the first
+time the tool is actually called.
+
+build_shared() returns one set of SessionTools for every session. A
+SessionTool finds the calling session from the run config's thread_id and
+runs that session's lazy tool, so one compiled graph can serve all sessions
+while browser leases and Python interpreters stay per session.
+"""
+import asyncio
+import inspect
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
+from pydantic import BaseModel, PrivateAttr
+from tool_execution import get_tool_guard
+
+
+class ToolSession:
+    """Per-session state shared by the loaders of one assistant's tools"""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        # loaders that build several tools at once (toolkits) cache them here
+        self.groups: Dict[str, Any] = {}
+        # objects that must be released with the session, e.g. a browser lease
+        self.resources: Dict[str, Any] = {}
+        self._group_locks: Dict[str, asyncio.Lock] = {}
+        self._sync_lock = threading.Lock()
+
+    def group(self, name: str, factory: Callable[[], Any]):
+        """Build a group of related objects once per session"""
+        with self._sync_lock:
+            if name not in self.groups:
+                self.groups[name] = factory()
+        return self.groups[name]
+
+    async def agroup(self, name: str, factory: Callable[[], Any]):
+        """Async version of group(); factory may return a coroutine"""
+        if name not in self.groups:
+            lock = self._group_locks.setdefault(name, asyncio.Lock())
+            async with lock:
+                if name not in self.groups:
+                    result = factory()
+                    if inspect.isawaitable(result):
+                        result = await result
+                    self.groups[name] = result
+        return self.groups[name]
+
+
+class LazyTool(BaseTool):
+    """A tool whose implementation is built on first call"""
+
+    loader: Callable[[], Any]
+    # sync loaders import and build the tool in a worker thread when loaded from async code
+    async_loader: bool = False
+    # concurrency/timeout group (see tool_execution.py) and the session that owns the tool
+    group: str = "default"
+    session_id: str = ""
+    _impl: Optional[BaseTool] = PrivateAttr(default=None)
+    _sync_lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _async_lock: Optional[asyncio.Lock] = PrivateAttr(default=None)
+
+    @property
+    def loaded(self) -> bool:
+        return self._impl is not None
+
+    def _load(self) -> BaseTool:
+        with self._sync_lock:
+            if self._impl is None:
+                impl = self.loader()
+                if inspect.isawaitable(impl):
+                    impl.close()
+                    raise RuntimeError(f"Tool '{self.name}' can only be used asynchronously")
+                self._impl = impl
+        return self._impl
+
+    async def _aload(self) -> BaseTool:
+        if self._impl is None:
+            if self._async_lock is None:
+                self._async_lock = asyncio.Lock()
+            async with self._async_lock:
+                if self._impl is None:
+                    if self.async_loader:
+                        impl = await self.loader()
+                    else:
+                        impl = await asyncio.to_thread(self.loader)
+                    self._impl = impl
+        return self._impl
+
+    def _run(self, *args: Any, run_manager=None, **kwargs: Any) -> Any:
+        config = {"callbacks": run_manager.get_child()} if run_manager else None
+        started = time.perf_counter()
+        try:
+            return self._load().invoke(kwargs if kwargs else (args[0] if args else {}), config=config)
+        finally:
+            get_tool_guard().observe(self.name, time.perf_counter() - started)
+
+    async def _arun(self, *args: Any, run_manager=None, **kwargs: Any) -> Any:
+        config = {"callbacks": run_manager.get_child()} if run_manager else None
+
+        async def call():
+            impl = await self._aload()
+            return await impl.ainvoke(kwargs if kwargs else (args[0] if args else {}), config=config)
+
+        return await get_tool_guard().run(self.name, self.group, self.session_id, call)
+
+
+class ToolSessions:
+    """The ToolSession and lazy tools of each session that uses the shared tools"""
+
+    def __init__(self, registry: "ToolRegistry"):
+        self.registry = registry
+        self._sessions: Dict[str, Tuple[ToolSession, Dict[str, LazyTool]]] = {}
+        self._lock = threading.Lock()
+
+    def tools(self, session_id: str) -> Dict[str, LazyTool]:
+        """The session's tools by name, created on its first tool call"""
+        with self._lock:
+            if session_id not in self._sessions:
+                session = ToolSession(session_id)
+                self._sessions[session_id] = (session, {tool.name: tool for tool in self.registry.build(session)})
+            return self._sessions[session_id][1]
+
+    def pop(self, session_id: str) -> Optional[ToolSession]:
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+        return entry[0] if entry else None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class SessionTool(BaseTool):
+    """A tool shared by all sessions; each call runs the lazy tool of the session in config's thread_id"""
+
+    sessions: Any
+
+    def _session_tool(self, config: RunnableConfig) -> LazyTool:
+        session_id = (config or {}).get("configurable", {}).get("thread_id")
+        if not session_id:
+            raise ValueError(f"Tool '{self.name}' needs a thread_id in the run config")
+        return self.sessions.tools(session_id)[self.name]
+
+    def _run(self, *args: Any, config: RunnableConfig, run_manager=None, **kwargs: Any) -> Any:
+        return self._session_tool(config)._run(*args, run_manager=run_manager, **kwargs)
+
+    async def _arun(self, *args: Any, config: RunnableConfig, run_manager=None, **kwargs: Any) -> Any:
+        return await self._session_tool(config)._arun(*args, run_manager=run_manager, **kwargs)
+
+
+class ToolSpec:
+    """Up-front description of a tool plus the factory that builds it"""
+
+    def __init__(self, name: str, description: str, args_schema: Type[BaseModel],
+                 loader: Callable[[ToolSession], Any], enabled: Callable[[], bool] = None,
+                 group: str = None):
+        self.name = name
+        self.description = description
+        self.args_schema = args_schema
+        self.loader = loader
+        self.enabled = enabled or (lambda: True)
+        self.group = group or name
+
+
+class ToolRegistry:
+    """Holds tool specs and turns them into lazy tools for a session"""
+
+    def __init__(self):
+        self._specs: Dict[str, ToolSpec] = {}
+
+    def register(self, name: str, description: str, args_schema: Type[BaseModel],
+                 loader: Callable[[ToolSession], Any], enabled: Callable[[], bool] = None,
+                 group: str = None):
+        """Register a tool; loader(session) returns the real tool, optionally as a coroutine.
+
+        Tools in the same group share a concurrency limit and timeout.
+        """
+        self._specs[name] = ToolSpec(name, description, args_schema, loader, enabled, group)
+
+    def unregister(self, name: str):
+        self._specs.pop(name, None)
+
+    def specs(self) -> List[ToolSpec]:
+        return [spec for spec in self._specs.values() if spec.enabled()]
+
+    def build(self, session: ToolSession) -> List[LazyTool]:
+        """Create the session's tools without loading any of them"""
+        return [
+            LazyTool(
+                name=spec.name,
+                description=spec.description,
+                args_schema=spec.args_schema,
+                loader=(lambda spec=spec: spec.loader(session)),
+                async_loader=inspect.iscoroutinefunction(spec.loader),
+                group=spec.group,
+                session_id=session.session_id,
+            )
+            for spec in self.specs()
+        ]
+
+    def build_shared(self, sessions: ToolSessions) -> List[SessionTool]:
+        """One set of tools for all sessions; see SessionTool"""
+        return [
+            SessionTool(name=spec.name, description=spec.description, args_schema=spec.args_schema, sessions=sessions)
+            for spec in self.specs()
+        ]
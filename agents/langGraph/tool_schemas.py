@@ -0,0 +1,108 @@
+"""Argument schemas for the research tools.
+
+These mirror the schemas of the LangChain tools they stand in for, so tools can
+be bound to the LLM without importing langchain_community, Playwright or Twilio.
+"""
+from typing import List
+from pydantic import BaseModel, Field
+
+
+# Research tools
+class SearchInput(BaseModel):
+    query: str = Field(description="Search query for the web")
+
+
+class FetchPageInput(BaseModel):
+    url: str = Field(description="URL of the page to read")
+
+
+class WhatsAppNotificationInput(BaseModel):
+    message: str = Field(description="Progress update or summary to send to the user")
+
+
+class WikipediaInput(BaseModel):
+    query: str = Field(description="query to look up on wikipedia")
+
+
+class PythonInput(BaseModel):
+    query: str = Field(description="code snippet to run")
+
+
+# File management tools
+class ReadFileInput(BaseModel):
+    file_path: str = Field(..., description="name of file")
+
+
+class WriteFileInput(BaseModel):
+    file_path: str = Field(..., description="name of file")
+    text: str = Field(..., description="text to write to file")
+    append: bool = Field(default=False, description="Whether to append to an existing file.")
+
+
+class DirectoryListingInput(BaseModel):
+    dir_path: str = Field(default=".", description="Subdirectory to list.")
+
+
+class FileCopyInput(BaseModel):
+    source_path: str = Field(..., description="Path of the file to copy")
+    destination_path: str = Field(..., description="Path to save the copied file")
+
+
+class FileMoveInput(BaseModel):
+    source_path: str = Field(..., description="Path of the file to move")
+    destination_path: str = Field(..., description="New path for the moved file")
+
+
+class FileDeleteInput(BaseModel):
+    file_path: str = Field(..., description="Path of the file to delete")
+
+
+class FileSearchInput(BaseModel):
+    dir_path: str = Field(default=".", description="Subdirectory to search in.")
+    pattern: str = Field(..., description="Unix shell regex, where * matches everything.")
+
+
+# Browser tools
+class NoInput(BaseModel):
+    pass
+
+
+class ClickInput(BaseModel):
+    selector: str = Field(..., description="CSS selector for the element to click")
+
+
+class NavigateInput(BaseModel):
+    url: str = Field(..., description="url to navigate to")
+
+
+class ExtractHyperlinksInput(BaseModel):
+    absolute_urls: bool = Field(default=False, description="Return absolute URLs instead of relative URLs")
+
+
+class GetElementsInput(BaseModel):
+    selector: str = Field(..., description="CSS selector, such as '*', 'div', 'p', 'a', #id, .classname")
+    attributes: List[str] = Field(
+        default_factory=lambda: ["innerText"],
+        description="Set of attributes to retrieve for each element",
+    )
+
+
+FILE_TOOLS = [
+    ("read_file", "Read file from disk", ReadFileInput),
+    ("write_file", "Write file to disk", WriteFileInput),
+    ("list_directory", "List files and directories in a specified folder", DirectoryListingInput),
+    ("copy_file", "Create a copy of a file in a specified location", FileCopyInput),
+    ("move_file", "Move or rename a file from one location to another", FileMoveInput),
+    ("file_delete", "Delete a file", FileDeleteInput),
+    ("file_search", "Recursively search for files in a subdirectory that match the regex pattern", FileSearchInput),
+]
+
+BROWSER_TOOLS = [
+    ("click_element", "Click on an element with the given CSS selector", ClickInput),
+    ("navigate_browser", "Navigate a browser to the specified URL", NavigateInput),
+    ("previous_webpage", "Navigate back to the previous page in the browser history", NoInput),
+    ("extract_text", "Extract all the text on the current webpage", NoInput),
+    ("extract_hyperlinks", "Extract all hyperlinks on the current webpage", ExtractHyperlinksInput),
+    ("get_elements", "Retrieve elements in the current web page matching the given CSS selector", GetElementsInput),
+    ("current_webpage", "Returns the URL of the current page", NoInput),
+]
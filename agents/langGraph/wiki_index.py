@@ -0,0 +1,329 @@
+"""Local Wikipedia index backed by SQLite FTS5.
+
+Serves the same lookups as the `wikipedia` tool from a local full-text index.
+The index can be built once from a MediaWiki XML dump (.xml or .xml.bz2) or
+from a JSONL file of {"title": ..., "text": ...} articles, and pages fetched
+from the network are stored in it as well.
+
+Modes (WIKIPEDIA_MODE):
+- hybrid (default): answer from the index when it has a match, otherwise ask
+  Wikipedia and store the pages
+- offline: never touch the network
+- network: always ask Wikipedia, but still store the pages
+
+Build an index:
+    python wiki_index.py build enwiki-latest-pages-articles1.xml.bz2 --limit 50000
+"""
+import argparse
+import bz2
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+WIKI_INDEX_PATH = os.path.expanduser(os.getenv("WIKI_INDEX_PATH", "~/.cache/agents/wiki_index.sqlite3"))
+WIKIPEDIA_MODE = os.getenv("WIKIPEDIA_MODE", "hybrid").lower()
+WIKI_TOP_K = int(os.getenv("WIKI_TOP_K", "3"))
+WIKI_MAX_CHARS = int(os.getenv("WIKI_MAX_CHARS", "4000"))
+WIKI_NETWORK_TTL = int(os.getenv("WIKI_NETWORK_TTL", str(30 * 24 * 3600)))
+
+NO_RESULT = "No good Wikipedia Search Result was found"
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(re.findall(r"\w+", (query or "").lower()))
+
+
+def fts_query(query: str, any_term: bool = False) -> str:
+    """Turn free text into a safe FTS5 query; all terms must match unless any_term is set"""
+    terms = [f'"{term}"' for term in re.findall(r"\w+", query or "")]
+    return (" OR " if any_term else " ").join(terms)
+
+
+# Very small wikitext cleaner: good enough for lead sections and full-text search
+_WIKI_PATTERNS = [
+    (re.compile(r"<!--.*?-->", re.S), ""),
+    (re.compile(r"<ref[^>]*/>", re.S), ""),
+    (re.compile(r"<ref[^>]*>.*?</ref>", re.S), ""),
+    (re.compile(r"\[\[(?:File|Image|Category):[^\]]*\]\]", re.I), ""),
+    (re.compile(r"\[\[(?:[^|\]]*\|)?([^\]]+)\]\]"), r"\1"),
+    (re.compile(r"\[https?://\S+ ([^\]]+)\]"), r"\1"),
+    (re.compile(r"'{2,}"), ""),
+    (re.compile(r"<[^>]+>"), ""),
+    (re.compile(r"\n{3,}"), "\n\n"),
+]
+
+
+def _strip_templates(text: str) -> str:
+    out, depth, i = [], 0, 0
+    while i < len(text):
+        pair = text[i:i + 2]
+        if pair in ("{{", "{|"):
+            depth += 1
+            i += 2
+        elif pair in ("}}", "|}") and depth:
+            depth -= 1
+            i += 2
+        else:
+            if not depth:
+                out.append(text[i])
+            i += 1
+    return "".join(out)
+
+
+def clean_wikitext(text: str) -> str:
+    text = _strip_templates(text)
+    for pattern, replacement in _WIKI_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text.strip()
+
+
+def lead_section(text: str) -> str:
+    return re.split(r"\n==[^=]", text, maxsplit=1)[0].strip()
+
+
+class WikiIndex:
+    """Full-text index of Wikipedia articles plus a cache of network lookups"""
+
+    def __init__(self, path: str = WIKI_INDEX_PATH, mode: str = WIKIPEDIA_MODE,
+                 top_k: int = WIKI_TOP_K, max_chars: int = WIKI_MAX_CHARS):
+        self.path = path
+        self.mode = mode
+        self.top_k = top_k
+        self.max_chars = max_chars
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS articles USING fts5(
+                title, summary, content, tokenize='porter unicode61'
+            );
+            CREATE TABLE IF NOT EXISTS article_meta (
+                title TEXT PRIMARY KEY,
+                article_rowid INTEGER NOT NULL,
+                source TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS query_cache (
+                query TEXT PRIMARY KEY,
+                titles TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            );
+            """
+        )
+        self._lock = threading.Lock()
+        self._api = None
+        self.local_hits = 0
+        self.query_cache_hits = 0
+        self.network_lookups = 0
+        self.misses = 0
+
+    # Storage
+
+    def add_article(self, title: str, summary: str, content: str, source: str = "dump"):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT article_rowid FROM article_meta WHERE title = ?", (title,)
+            ).fetchone()
+            if row:
+                self._conn.execute("DELETE FROM articles WHERE rowid = ?", (row[0],))
+            cursor = self._conn.execute(
+                "INSERT INTO articles (title, summary, content) VALUES (?, ?, ?)", (title, summary, content)
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO article_meta VALUES (?, ?, ?, ?)",
+                (title, cursor.lastrowid, source, time.time()),
+            )
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+
+    def article_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM article_meta").fetchone()[0]
+
+    # Lookups
+
+    def _summaries_for_titles(self, titles):
+        summaries = []
+        with self._lock:
+            for title in titles:
+                row = self._conn.execute(
+                    "SELECT a.summary FROM articles a JOIN article_meta m ON a.rowid = m.article_rowid "
+                    "WHERE m.title = ?", (title,)
+                ).fetchone()
+                if row:
+                    summaries.append((title, row[0]))
+        return summaries
+
+    def search_local(self, query: str, any_term: bool = False):
+        """Best-matching (title, summary) pairs, with title matches weighted up"""
+        match = fts_query(query, any_term)
+        if not match:
+            return []
+        with self._lock:
+            return self._conn.execute(
+                "SELECT title, summary FROM articles WHERE articles MATCH ? "
+                "ORDER BY bm25(articles, 10.0, 3.0, 1.0) LIMIT ?",
+                (match, self.top_k),
+            ).fetchall()
+
+    def _cached_titles(self, query: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT titles, fetched_at FROM query_cache WHERE query = ?", (normalize_query(query),)
+            ).fetchone()
+        if row and time.time() - row[1] < WIKI_NETWORK_TTL:
+            return json.loads(row[0])
+        return None
+
+    def _fetch_network(self, query: str):
+        """Look the query up on Wikipedia and store every page we get back"""
+        if self._api is None:
+            from langchain_community.utilities.wikipedia import WikipediaAPIWrapper
+            self._api = WikipediaAPIWrapper(top_k_results=self.top_k, doc_content_chars_max=self.max_chars)
+        self.network_lookups += 1
+        titles, summaries = [], []
+        for title in self._api.wiki_client.search(query[:300], results=self.top_k)[: self.top_k]:
+            page = self._api._fetch_page(title)
+            if page is None or not page.summary:
+                continue
+            self.add_article(title, page.summary, page.content, source="network")
+            titles.append(title)
+            summaries.append((title, page.summary))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_cache VALUES (?, ?, ?)",
+                (normalize_query(query), json.dumps(titles), time.time()),
+            )
+            self._conn.commit()
+        return summaries
+
+    def lookup(self, query: str) -> str:
+        """Same output format as WikipediaAPIWrapper.run"""
+        summaries = []
+        cached_titles = None if self.mode == "network" else self._cached_titles(query)
+        if cached_titles is not None:
+            self.query_cache_hits += 1
+            summaries = self._summaries_for_titles(cached_titles)
+        if not summaries and self.mode != "network":
+            summaries = self.search_local(query)
+            if not summaries and self.mode == "offline":
+                summaries = self.search_local(query, any_term=True)
+            if summaries:
+                self.local_hits += 1
+        if not summaries and self.mode != "offline":
+            try:
+                summaries = self._fetch_network(query)
+            except Exception as e:
+                return f"Wikipedia lookup failed: {e}"
+        if not summaries:
+            self.misses += 1
+            return NO_RESULT
+        return "\n\n".join(f"Page: {title}\nSummary: {summary}" for title, summary in summaries)[: self.max_chars]
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "articles": self.article_count(),
+            "local_hits": self.local_hits,
+            "query_cache_hits": self.query_cache_hits,
+            "network_lookups": self.network_lookups,
+            "misses": self.misses,
+        }
+
+    # Building
+
+    def build_from_jsonl(self, path: str, limit: int = 0) -> int:
+        count = 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                article = json.loads(line)
+                text = article.get("text", "")
+                self.add_article(article["title"], article.get("summary") or lead_section(text), text)
+                count += 1
+                if count % 1000 == 0:
+                    self.commit()
+                if limit and count >= limit:
+                    break
+        self.commit()
+        return count
+
+    def build_from_dump(self, path: str, limit: int = 0) -> int:
+        """Index main-namespace, non-redirect pages from a MediaWiki XML dump"""
+        opener = bz2.open if path.endswith(".bz2") else open
+        count = 0
+        with opener(path, "rb") as f:
+            title = ns = redirect = None
+            for event, elem in ET.iterparse(f, events=("end",)):
+                tag = elem.tag.rsplit("}", 1)[-1]
+                if tag == "title":
+                    title = elem.text
+                elif tag == "ns":
+                    ns = elem.text
+                elif tag == "redirect":
+                    redirect = True
+                elif tag == "text" and ns == "0" and not redirect and title:
+                    content = clean_wikitext(elem.text or "")
+                    if content:
+                        self.add_article(title, lead_section(content), content)
+                        count += 1
+                        if count % 1000 == 0:
+                            self.commit()
+                            print(f"Indexed {count} articles...")
+                elif tag == "page":
+                    title = ns = redirect = None
+                    elem.clear()
+                    if limit and count >= limit:
+                        break
+        self.commit()
+        return count
+
+
+_wiki_index = None
+_wiki_index_lock = threading.Lock()
+
+
+def get_wiki_index() -> WikiIndex:
+    global _wiki_index
+    with _wiki_index_lock:
+        if _wiki_index is None:
+            _wiki_index = WikiIndex()
+    return _wiki_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local Wikipedia index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Index a MediaWiki XML dump or a JSONL article file")
+    build.add_argument("source")
+    build.add_argument("--limit", type=int, default=0, help="Stop after this many articles")
+    search = sub.add_parser("search", help="Look up a query in offline mode")
+    search.add_argument("query")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        index = WikiIndex()
+        start = time.perf_counter()
+        if args.source.endswith(".jsonl"):
+            count = index.build_from_jsonl(args.source, args.limit)
+        else:
+            count = index.build_from_dump(args.source, args.limit)
+        print(f"Indexed {count} articles in {time.perf_counter() - start:.1f}s into {index.path}")
+    else:
+        index = WikiIndex(mode="offline")
+        start = time.perf_counter()
+        print(index.lookup(args.query))
+        print(f"\n({(time.perf_counter() - start) * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()